@@ -20,6 +20,45 @@ def create_app(config_class=Config):
     bootstrap.init_app(app)
     CORS(app)
     
+    from app.counters import install_counter_triggers
+    install_counter_triggers(app, db)
+    
+    from app.changes import install_tombstone_triggers
+    install_tombstone_triggers(app, db)
+    
+    from app.regions import install_bin_triggers
+    install_bin_triggers(app, db)
+    
+    from app.api.keycache import api_key_cache
+    api_key_cache.init_app(app)
+    
+    from app.api.ratelimit import rate_limiter
+    rate_limiter.init_app(app)
+    
+    from app.annotate import gene_intervals
+    gene_intervals.init_app(app)
+    
+    from app.api.motif import motif_index
+    motif_index.init_app(app)
+    
+    from app.api.similarity import similarity_index
+    similarity_index.init_app(app)
+    
+    from app.api.align import alignment_service
+    alignment_service.init_app(app)
+    
+    from app.writes import write_tracker
+    write_tracker.init_app(app, db.session)
+    
+    from app.api.cache import response_cache
+    response_cache.init_app(app)
+    
+    from app.trigram import name_index
+    name_index.init_app(app, db.session)
+    
+    from app.suggest import suggest_index
+    suggest_index.init_app(app, db.session)
+    
     # 注册蓝图
     from app.main import bp as main_bp
     app.register_blueprint(main_bp)
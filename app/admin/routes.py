@@ -9,6 +9,7 @@ import re
 from Bio import SeqIO
 from io import StringIO
 from sqlalchemy.exc import IntegrityError, DatabaseError
+from app.api.keycache import invalidate_user_api_key
 
 def check_admin_access():
     """检查用户是否有管理员权限"""
@@ -46,6 +47,7 @@ def toggle_user_active(id):
     user = Users.query.get_or_404(id)
     user.is_active = not user.is_active
     db.session.commit()
+    invalidate_user_api_key(user)
     flash(f'用户 {user.username} 状态已更新')
     return redirect(url_for('admin.user_list'))
 
@@ -0,0 +1,232 @@
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+import numpy as np
+from sqlalchemy import select, func
+from app.models import Genes
+
+# BED 批量注释：把某物种全部基因的坐标载入内存，按染色体建区间索引，整块输入向量化求重叠。
+# 每条染色体的基因按起点排序后拆成若干“无包含层”（扁平化的嵌套包含列表 NCList）：
+# 同一层内起点、终点都单调不减，与 [qs, qe] 重叠的基因恰好是一段连续下标
+#   [searchsorted(终点, qs), searchsorted(起点, qe, 'right'))，
+# 整块查询每层只需两次 searchsorted，层数等于基因的最大嵌套深度（通常个位数）。
+# 基因坐标为 1 起始闭区间；BED 为 0 起始半开区间，读入时转换。
+
+# 注释输出追加的列
+OUTPUT_COLUMNS = ['gene_count', 'gene_ids', 'gene_symbols']
+NEAREST_COLUMNS = ['nearest_gene_id', 'nearest_gene_symbol', 'nearest_distance']
+
+def chromosome_key(name):
+    """染色体名规范化：chr7 / Chr7 / 7 视为同一条"""
+    name = name.strip().lower()
+    return name[3:] if name.startswith('chr') else name
+
+class ChromosomeIndex:
+    """单条染色体的基因区间索引"""
+
+    def __init__(self, starts, ends, rows):
+        # 按起点升序、同起点按终点降序排列，使包含者先于被包含者
+        order = np.lexsort((-ends, starts))
+        starts, ends, rows = starts[order], ends[order], rows[order]
+        # 分层：每个基因放入第一个“末尾终点 <= 本基因终点”的层；各层末尾终点从左到右递减，可二分
+        # 存末尾终点的相反数，使之从左到右递增
+        tails, members = [], []
+        for i, end in enumerate(ends.tolist()):
+            layer = bisect_left(tails, -end)
+            if layer == len(tails):
+                tails.append(-end)
+                members.append([i])
+            else:
+                tails[layer] = -end
+                members[layer].append(i)
+        self.layers = [(starts[m], ends[m], rows[m]) for m in (np.array(m) for m in members)]
+        # 最近邻查询用：按起点、按终点各排一份
+        self.by_start = (starts, rows)
+        by_end = np.argsort(ends, kind='stable')
+        self.by_end = (ends[by_end], rows[by_end])
+
+    def overlaps(self, qs, qe):
+        """返回 (查询下标, 基因行号) 两个数组，每对表示一次重叠"""
+        query_parts, row_parts = [], []
+        for starts, ends, rows in self.layers:
+            lo = np.searchsorted(ends, qs, 'left')
+            hi = np.searchsorted(starts, qe, 'right')
+            counts = np.maximum(hi - lo, 0)
+            total = int(counts.sum())
+            if not total:
+                continue
+            # 把每个查询的 [lo, hi) 展开成连续下标
+            first = np.repeat(np.cumsum(counts) - counts, counts)
+            positions = np.repeat(lo, counts) + np.arange(total) - first
+            query_parts.append(np.repeat(np.arange(len(qs)), counts))
+            row_parts.append(rows[positions])
+        if not query_parts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate(query_parts), np.concatenate(row_parts)
+
+    def nearest(self, qs, qe):
+        """每个查询最近的非重叠基因：返回 (基因行号, 距离)，没有时行号为 -1"""
+        ends, end_rows = self.by_end
+        starts, start_rows = self.by_start
+        up = np.searchsorted(ends, qs, 'left') - 1
+        down = np.searchsorted(starts, qe, 'right')
+        up_distance = np.where(up >= 0, qs - ends[np.maximum(up, 0)], np.iinfo(np.int64).max)
+        down_distance = np.where(down < len(starts), starts[np.minimum(down, len(starts) - 1)] - qe,
+                                 np.iinfo(np.int64).max)
+        use_up = up_distance <= down_distance
+        rows = np.where(use_up, end_rows[np.maximum(up, 0)], start_rows[np.minimum(down, len(starts) - 1)])
+        distance = np.where(use_up, up_distance, down_distance)
+        missing = (up < 0) & (down >= len(starts))
+        return np.where(missing, -1, rows), distance
+
+class SpeciesIndex:
+    """某物种全部有坐标的基因：ids / symbols 按行号存放，chromosomes 为染色体 -> ChromosomeIndex"""
+
+    def __init__(self, rows):
+        self.ids = np.array([row.gene_id for row in rows], dtype=np.int64)
+        self.symbols = [row.gene_symbol or row.gene_name for row in rows]
+        groups = {}
+        for i, row in enumerate(rows):
+            groups.setdefault(chromosome_key(row.chromosome), []).append(i)
+        self.starts = starts = np.array([row.start_position for row in rows], dtype=np.int64)
+        ends = np.array([row.end_position for row in rows], dtype=np.int64)
+        self.chromosomes = {}
+        for chrom, members in groups.items():
+            members = np.array(members, dtype=np.int64)
+            self.chromosomes[chrom] = ChromosomeIndex(starts[members], ends[members], members)
+
+    def annotate(self, chroms, starts, ends, nearest=False):
+        """整块注释：chroms 为规范化后的染色体名列表，starts / ends 为 1 起始闭区间
+
+        返回每个查询追加的列（字符串列表）。
+        """
+        chroms = np.array(chroms, dtype=object)
+        hits = [[] for _ in range(len(chroms))]
+        closest = [None] * len(chroms)
+        for chrom in set(chroms.tolist()):
+            index = self.chromosomes.get(chrom)
+            if index is None:
+                continue
+            members = np.flatnonzero(chroms == chrom)
+            qs, qe = starts[members], ends[members]
+            query, rows = index.overlaps(qs, qe)
+            # 同一查询的命中按基因起点排序输出
+            order = np.lexsort((rows, self.starts[rows], query))
+            for q, row in zip(members[query[order]].tolist(), rows[order].tolist()):
+                hits[q].append(row)
+            if nearest:
+                near_rows, distance = index.nearest(qs, qe)
+                for q, row, d in zip(members.tolist(), near_rows.tolist(), distance.tolist()):
+                    if row >= 0:
+                        closest[q] = (row, d)
+        columns = []
+        for rows, near in zip(hits, closest):
+            if rows:
+                values = [str(len(rows)), ','.join(str(self.ids[row]) for row in rows),
+                          ','.join(self.symbols[row] or '.' for row in rows)]
+            else:
+                values = ['0', '.', '.']
+            if nearest:
+                if rows or near is None:
+                    values += ['.', '.', '.']
+                else:
+                    values += [str(self.ids[near[0]]), self.symbols[near[0]] or '.', str(near[1])]
+            columns.append(values)
+        return columns
+
+class BedError(ValueError):
+    pass
+
+def parse_bed_line(line):
+    """解析一行 BED，返回 (字段列表, 染色体, 起点, 终点)，起止已转换为 1 起始闭区间"""
+    fields = line.rstrip('\r\n').split('\t')
+    if len(fields) < 3:
+        fields = line.split()
+    if len(fields) < 3:
+        raise BedError('至少需要 chrom、start、end 三列')
+    try:
+        start, end = int(fields[1]), int(fields[2])
+    except ValueError:
+        raise BedError('start / end 必须为整数')
+    if start < 0 or end < start:
+        raise BedError('区间无效：要求 0 <= start <= end')
+    # 长度为 0 的 BED 区间（插入位点）按其后一个碱基处理
+    return fields, fields[0], start + 1, max(end, start + 1)
+
+def annotate_lines(index, lines, chunk_rows, nearest=False):
+    """逐块注释 BED 行，产出输出行（不含换行符）
+
+    注释行（#、track、browser 开头）与空行原样输出；无法解析的行输出为以 # 开头的错误说明。
+    """
+    pending = []
+
+    def flush():
+        chroms = [chromosome_key(item[1]) for item in pending]
+        starts = np.array([item[2] for item in pending], dtype=np.int64)
+        ends = np.array([item[3] for item in pending], dtype=np.int64)
+        for item, extra in zip(pending, index.annotate(chroms, starts, ends, nearest)):
+            yield '\t'.join(item[0] + extra)
+        pending.clear()
+
+    for number, line in enumerate(lines, 1):
+        if not line.strip() or line.startswith(('#', 'track', 'browser')):
+            yield from flush()
+            yield line.rstrip('\r\n')
+            continue
+        try:
+            pending.append(parse_bed_line(line))
+        except BedError as e:
+            yield from flush()
+            yield f'# 第 {number} 行无法解析: {e}'
+            continue
+        if len(pending) >= chunk_rows:
+            yield from flush()
+    yield from flush()
+
+def header(nearest=False):
+    return '#' + '\t'.join(['bed_fields'] + OUTPUT_COLUMNS + (NEAREST_COLUMNS if nearest else []))
+
+def _signature(session, species_id):
+    """基因数与最后更新时间；任一变化即重建该物种的索引（多进程部署下同样有效）"""
+    return tuple(session.execute(
+        select(func.count(Genes.gene_id), func.max(Genes.updated_at)).where(Genes.species_id == species_id)
+    ).one())
+
+class GeneIntervalIndex:
+    """按物种缓存的基因区间索引，最多保留 ANNOTATE_CACHE_SPECIES 个物种"""
+
+    def __init__(self):
+        self.capacity = 8
+        self._indexes = OrderedDict()  # species_id -> (签名, SpeciesIndex)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.capacity = app.config.get('ANNOTATE_CACHE_SPECIES', self.capacity)
+
+    def get(self, session, species_id):
+        signature = _signature(session, species_id)
+        with self._lock:
+            cached = self._indexes.get(species_id)
+            if cached is not None and cached[0] == signature:
+                self._indexes.move_to_end(species_id)
+                return cached[1]
+        rows = session.execute(select(
+            Genes.gene_id, Genes.gene_name, Genes.gene_symbol, Genes.chromosome,
+            Genes.start_position, Genes.end_position
+        ).where(
+            Genes.species_id == species_id, Genes.chromosome.isnot(None),
+            Genes.start_position.isnot(None), Genes.end_position.isnot(None)
+        )).all()
+        index = SpeciesIndex(rows)
+        with self._lock:
+            self._indexes[species_id] = (signature, index)
+            self._indexes.move_to_end(species_id)
+            while len(self._indexes) > self.capacity:
+                self._indexes.popitem(last=False)
+        return index
+
+    def stats(self):
+        with self._lock:
+            return {species_id: len(index.ids) for species_id, (_, index) in self._indexes.items()}
+
+gene_intervals = GeneIntervalIndex()
@@ -0,0 +1,379 @@
+import os
+from sqlalchemy import select, func
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route
+from werkzeug.http import parse_accept_header, parse_date, parse_etags
+from config import Config
+from app.fulltext import publication_fulltext
+from app.models import Species, Genes, Proteins, Publications, Experimental_Data, Gene_Publications, Users, Readers
+from app.api.keycache import api_key_cache, ApiPrincipal, MISSING
+from app.api.ratelimit import rate_limiter, rate_limit_headers
+from app.api.pagination import InvalidCursor, encode_cursor, decode_cursor, after_cursor
+from app.api.queries import (int_arg, species_rows, gene_rows, protein_rows, publication_rows,
+                             experiment_rows, filter_species, filter_genes, filter_proteins,
+                             filter_publications, filter_experiments)
+from app.api.conditional import (Validators, fingerprint_query, species_state, gene_state, protein_state,
+                                 publication_state, experiment_state)
+from app.api.serializers import (dumps, compress_body, COMPRESS_ENCODINGS, SPECIES_ITEM, SPECIES_DETAIL,
+                                 GENE_ITEM, GENE_DETAIL, PROTEIN_ITEM, PROTEIN_DETAIL, PUBLICATION_ITEM,
+                                 PUBLICATION_DETAIL, EXPERIMENT_ITEM, EXPERIMENT_DETAIL)
+
+# 只读 API 的异步服务模式（ASGI）：Starlette + SQLAlchemy AsyncSession + aiomysql。
+# 等待 MySQL 时事件循环可以继续处理其他请求，并发不再受 worker 数限制，上限由连接池决定。
+# 覆盖 /api/status（含 /api/status/details）与五类实体的列表、详情接口，路径、参数与输出和同步接口一致
+# （含文献全文检索 q、详情的 include_* 展开与 ETag / 304 条件请求、按 Accept-Encoding 压缩）；
+# 搜索、导出、批量查询、序列下载、写操作仍由 Flask 同步服务提供。
+# 启动：uvicorn asgi:app --workers 4
+
+def async_database_url(config):
+    """ASYNC_DATABASE_URL 未配置时，把同步连接串的驱动换成对应的异步驱动"""
+    if getattr(config, 'ASYNC_DATABASE_URL', None):
+        return config.ASYNC_DATABASE_URL
+    url = make_url(config.SQLALCHEMY_DATABASE_URI)
+    if url.get_backend_name() == 'mysql':
+        return url.set(drivername='mysql+aiomysql')
+    if url.get_backend_name() == 'sqlite':
+        return url.set(drivername='sqlite+aiosqlite')
+    return url
+
+# 实体 -> (模型, 主键, 过滤函数, 追加关联列函数, 列表序列化器)
+LIST_ENTITIES = {
+    'species': (Species, Species.species_id, filter_species, species_rows, SPECIES_ITEM),
+    'genes': (Genes, Genes.gene_id, filter_genes, gene_rows, GENE_ITEM),
+    'proteins': (Proteins, Proteins.protein_id, filter_proteins, protein_rows, PROTEIN_ITEM),
+    'publications': (Publications, Publications.publication_id, filter_publications, publication_rows,
+                     PUBLICATION_ITEM),
+    'experiments': (Experimental_Data, Experimental_Data.experiment_id, filter_experiments, experiment_rows,
+                    EXPERIMENT_ITEM)
+}
+
+def _list_order(entity, args):
+    """与同步接口相同的排序：返回 (游标排序键, 排序列, 是否倒序)"""
+    if entity == 'species':
+        return 'scientific_name', Species.scientific_name, False
+    if entity == 'genes':
+        sort_by = args.get('sort_by', 'gene_name')
+        if sort_by not in ['gene_id', 'gene_name', 'gene_symbol', 'created_at']:
+            sort_by = 'gene_name'
+        sort_order = args.get('sort_order', 'asc')
+        if sort_order not in ['asc', 'desc']:
+            sort_order = 'asc'
+        return f'{sort_by}:{sort_order}', getattr(Genes, sort_by), sort_order == 'desc'
+    if entity == 'proteins':
+        return 'protein_name', Proteins.protein_name, False
+    if entity == 'publications':
+        return 'publication_year:desc', Publications.publication_year, True
+    return 'created_at:desc', Experimental_Data.created_at, True
+
+def _gene_detail_rows(query):
+    return query.outerjoin(Species, Genes.species_id == Species.species_id).add_columns(
+        Species.scientific_name.label('species_name'))
+
+def _protein_detail_rows(query):
+    return query.outerjoin(Genes, Proteins.gene_id == Genes.gene_id).add_columns(
+        Genes.gene_name.label('gene_name'), Genes.gene_symbol.label('gene_symbol'))
+
+def _experiment_detail_rows(query):
+    return experiment_rows(query).add_columns(Genes.gene_symbol.label('gene_symbol'))
+
+# 实体 -> (模型, 主键, 追加关联列函数, 详情序列化器, 可选的延迟加载列, 条件请求指纹)
+DETAIL_ENTITIES = {
+    'species': (Species, Species.species_id, species_rows, SPECIES_DETAIL, None, species_state),
+    'genes': (Genes, Genes.gene_id, _gene_detail_rows, GENE_DETAIL, Genes.sequence, gene_state),
+    'proteins': (Proteins, Proteins.protein_id, _protein_detail_rows, PROTEIN_DETAIL,
+                 Proteins.amino_acid_sequence, protein_state),
+    'publications': (Publications, Publications.publication_id, lambda query: query, PUBLICATION_DETAIL, None,
+                     publication_state),
+    'experiments': (Experimental_Data, Experimental_Data.experiment_id, _experiment_detail_rows,
+                    EXPERIMENT_DETAIL, None, experiment_state)
+}
+
+def _experiment_list(condition):
+    return select(Experimental_Data.experiment_id, Experimental_Data.experiment_type,
+                  Experimental_Data.conditions, Experimental_Data.results).where(condition).order_by(
+        Experimental_Data.experiment_id)
+
+# 详情接口的展开项：实体 -> [(include 参数, 输出键, 按主键生成查询的函数)]，输出字段与同步接口相同
+DETAIL_INCLUDES = {
+    'species': [
+        ('include_genes', 'genes', lambda id: select(
+            Genes.gene_id, Genes.gene_name, Genes.gene_symbol, Genes.chromosome
+        ).where(Genes.species_id == id).order_by(Genes.gene_id))
+    ],
+    'genes': [
+        ('include_proteins', 'proteins', lambda id: select(
+            Proteins.protein_id, Proteins.protein_name, Proteins.uniprot_id
+        ).where(Proteins.gene_id == id).order_by(Proteins.protein_id)),
+        ('include_publications', 'publications', lambda id: select(
+            Publications.publication_id, Publications.title, Publications.authors, Publications.journal,
+            Publications.publication_year, Publications.doi
+        ).join(Gene_Publications, Gene_Publications.publication_id == Publications.publication_id).where(
+            Gene_Publications.gene_id == id).order_by(Publications.publication_id)),
+        ('include_experiments', 'experiments', lambda id: _experiment_list(Experimental_Data.gene_id == id))
+    ],
+    'publications': [
+        ('include_genes', 'genes', lambda id: select(
+            Genes.gene_id, Genes.gene_name, Genes.gene_symbol, Species.scientific_name.label('species_name')
+        ).join(Gene_Publications, Gene_Publications.gene_id == Genes.gene_id).outerjoin(
+            Species, Genes.species_id == Species.species_id
+        ).where(Gene_Publications.publication_id == id).order_by(Genes.gene_id)),
+        ('include_experiments', 'experiments',
+         lambda id: _experiment_list(Experimental_Data.publication_id == id))
+    ]
+}
+
+# 对应的同步接口端点名：准入控制按相同的 API_RATE_LIMIT_COSTS 扣令牌
+LIST_ENDPOINTS = {entity: f'api.get_{entity}_list' for entity in LIST_ENTITIES}
+DETAIL_ENDPOINTS = {
+    'species': 'api.get_species',
+    'genes': 'api.get_gene',
+    'proteins': 'api.get_protein',
+    'publications': 'api.get_publication',
+    'experiments': 'api.get_experiment'
+}
+
+def _fields(args):
+    fields = args.get('fields')
+    if not fields:
+        return None
+    return {name.strip() for name in fields.split(',') if name.strip()}
+
+def _project(item, fields):
+    if fields is None:
+        return item
+    return {key: value for key, value in item.items() if key in fields}
+
+class AsyncReadApi:
+    """异步只读 API：持有异步引擎与会话工厂，路由处理函数为其方法"""
+
+    def __init__(self, config_class=Config):
+        self.config = config_class
+        self.engine = create_async_engine(
+            async_database_url(config_class),
+            pool_size=getattr(config_class, 'ASYNC_POOL_SIZE', 20),
+            max_overflow=getattr(config_class, 'ASYNC_MAX_OVERFLOW', 20),
+            pool_recycle=3600,
+            pool_pre_ping=True
+        )
+        self.sessionmaker = async_sessionmaker(self.engine, expire_on_commit=False)
+        api_key_cache.maxsize = getattr(config_class, 'API_KEY_CACHE_SIZE', api_key_cache.maxsize)
+        api_key_cache.ttl = getattr(config_class, 'API_KEY_CACHE_TTL', api_key_cache.ttl)
+        # 与 Flask 应用相同的 instance 目录，disk 后端时两种服务共享同一份限流计数
+        instance_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                     'instance')
+        rate_limiter.configure({key: getattr(config_class, key) for key in dir(config_class) if key.isupper()},
+                               instance_path)
+
+    def json(self, data, status=200):
+        backend = getattr(self.config, 'API_JSON_BACKEND', 'auto')
+        return Response(dumps(data, backend), status_code=status, media_type='application/json')
+
+    def error(self, message, status):
+        return self.json({'error': message}, status)
+
+    def payload(self, request, data, validators=None):
+        """200 响应：与同步接口的 compress_response 相同地按 Accept-Encoding 压缩，并附带条件请求的验证头"""
+        body = dumps(data, getattr(self.config, 'API_JSON_BACKEND', 'auto'))
+        headers = {'Vary': 'Accept-Encoding'}
+        encoding = None
+        if len(body) >= getattr(self.config, 'API_COMPRESS_MIN_SIZE', 1024):
+            encoding = parse_accept_header(request.headers.get('accept-encoding')).best_match(
+                list(COMPRESS_ENCODINGS))
+        if encoding is not None:
+            body = compress_body(body, encoding, getattr(self.config, 'API_COMPRESS_LEVEL', 6))
+            headers['Content-Encoding'] = encoding
+        if validators is not None:
+            headers.update(validators.headers(f'{validators.etag}-{encoding}' if encoding else None))
+        return Response(body, headers=headers, media_type='application/json')
+
+    async def authenticate(self, request, session):
+        """与同步接口的 require_api_key 相同：先查进程内缓存，未命中再查库并回填"""
+        api_key = request.headers.get('X-API-KEY')
+        if not api_key:
+            return self.error('缺少API密钥', 401)
+        principal = api_key_cache.get(api_key)
+        if principal is MISSING:
+            row = (await session.execute(
+                select(Users.user_id, Users.username, Users.user_type, Readers.subscription_type).outerjoin(
+                    Readers, Readers.user_id == Users.user_id).where(
+                    Users.api_key == api_key, Users.is_active.is_(True))
+            )).first()
+            principal = ApiPrincipal(*row) if row else None
+            api_key_cache.set(api_key, principal)
+        if principal is None:
+            return self.error('API密钥无效或已禁用', 401)
+        request.state.api_principal = principal
+        return None
+
+    def admit(self, request, endpoint):
+        """与同步接口相同的准入控制，endpoint 为对应的同步端点名；返回 (admission, 拒绝时的 429 响应)"""
+        admission = rate_limiter.admit(request.state.api_principal, endpoint)
+        if admission.allowed:
+            return admission, None
+        response = self.error('请求过于频繁，请稍后重试', 429)
+        response.headers.update(rate_limit_headers(admission))
+        return admission, response
+
+    def finish(self, response, admission):
+        """响应生成后归还并发名额并附加限流响应头"""
+        admission.release()
+        response.headers.update(rate_limit_headers(admission))
+        return response
+
+    async def status(self, request):
+        return self.json({
+            'status': 'online',
+            'version': '1.0.0',
+            'database': 'GenoBase',
+            'mode': 'async'
+        })
+
+    async def status_details(self, request):
+        """运行统计，与同步接口相同仅管理员可见"""
+        async with self.sessionmaker() as session:
+            denied = await self.authenticate(request, session)
+        if denied is not None:
+            return denied
+        if request.state.api_principal.user_type != 'manager':
+            return self.error('只有管理员可以查看运行统计', 403)
+        return self.json({
+            'api_key_cache': api_key_cache.stats(),
+            'rate_limiter': rate_limiter.stats(),
+            'pool': self.engine.pool.status()
+        })
+
+    async def list_entities(self, request):
+        entity = request.path_params['entity']
+        if entity not in LIST_ENTITIES:
+            return self.error('接口不存在', 404)
+        model, key_column, filter_query, extend, serializer = LIST_ENTITIES[entity]
+        args = request.query_params
+        async with self.sessionmaker() as session:
+            denied = await self.authenticate(request, session)
+            if denied is not None:
+                return denied
+            admission, denied = self.admit(request, LIST_ENDPOINTS[entity])
+            if denied is not None:
+                return denied
+            stmt = filter_query(select(model), args)
+            sort_key, sort_column, descending = _list_order(entity, args)
+            select_columns = lambda query: serializer.select(extend(query))
+            try:
+                # 全文检索：与同步接口相同，q 走全文索引并按相关度倒序，游标绑定检索词
+                text_query = args.get('q') if entity == 'publications' else None
+                if text_query:
+                    mode = args.get('mode', 'natural')
+                    condition, relevance = await session.run_sync(
+                        lambda sync_session: publication_fulltext(text_query, mode, sync_session.get_bind()))
+                    stmt = stmt.where(condition)
+                    sort_key, sort_column, descending = f'relevance:{mode}:{text_query}', relevance, True
+                    select_columns = lambda query: serializer.select(
+                        publication_rows(query).add_columns(relevance.label('relevance')))
+                rows, meta = await self.paginate(session, stmt, sort_key, sort_column, key_column,
+                                                 descending, select_columns, args)
+            except InvalidCursor as e:
+                return self.finish(self.error(str(e), 400), admission)
+            except BaseException:
+                admission.release()
+                raise
+        fields = _fields(args)
+        return self.finish(self.payload(request, {'items': [_project(item, fields) for item in serializer.rows(rows)],
+                                                  **meta}), admission)
+
+    async def paginate(self, session, stmt, sort_key, sort_column, key_column, descending, extend, args):
+        """paginate_list 的异步版本，参数与返回值一致"""
+        max_per_page = self.config.API_MAX_PER_PAGE
+        per_page = max(1, min(int_arg(args, 'per_page') or 10, max_per_page))
+        cursor = args.get('cursor')
+        total_mode = args.get('total', 'none' if cursor is not None else 'exact')
+
+        if descending:
+            ordered = stmt.order_by(sort_column.desc(), key_column.desc())
+        else:
+            ordered = stmt.order_by(sort_column, key_column)
+
+        meta = {'per_page': per_page}
+        if total_mode != 'none':
+            # 异步模式不读取 information_schema 估算值，approx 按精确 COUNT 处理
+            count = stmt.with_only_columns(func.count(), maintain_column_froms=True).order_by(None)
+            meta['total'] = (await session.execute(count)).scalar()
+
+        if cursor is not None:
+            if cursor:
+                value, key = decode_cursor(cursor, sort_key, sort_column)
+                ordered = ordered.where(after_cursor(sort_column, key_column, descending, value, key))
+            page_stmt = extend(ordered).add_columns(
+                sort_column.label('_cursor_value'), key_column.label('_cursor_key')
+            ).limit(per_page + 1)
+            rows = (await session.execute(page_stmt)).all()
+            next_cursor = None
+            if len(rows) > per_page:
+                rows = rows[:per_page]
+                next_cursor = encode_cursor(sort_key, rows[-1]._cursor_value, rows[-1]._cursor_key)
+            meta['next_cursor'] = next_cursor
+            return rows, meta
+
+        page = max(int_arg(args, 'page') or 1, 1)
+        rows = (await session.execute(extend(ordered).limit(per_page).offset((page - 1) * per_page))).all()
+        meta['page'] = page
+        if 'total' in meta:
+            meta['pages'] = (meta['total'] + per_page - 1) // per_page
+        return rows, meta
+
+    async def get_entity(self, request):
+        entity = request.path_params['entity']
+        id = request.path_params['id']
+        if entity not in DETAIL_ENTITIES:
+            return self.error('接口不存在', 404)
+        model, key_column, extend, serializer, sequence, state = DETAIL_ENTITIES[entity]
+        args = request.query_params
+        fields = _fields(args)
+        async with self.sessionmaker() as session:
+            denied = await self.authenticate(request, session)
+            if denied is not None:
+                return denied
+            admission, denied = self.admit(request, DETAIL_ENDPOINTS[entity])
+            if denied is not None:
+                return denied
+            try:
+                # 条件请求：资源未变化时只执行一条时间戳查询即返回 304
+                parts = state(id, args)
+                fingerprint = (await session.execute(fingerprint_query(parts))).first()
+                if fingerprint is None:
+                    return self.finish(self.error('资源不存在', 404), admission)
+                validators = Validators(request.url.path, fingerprint, args.multi_items(), parts)
+                if validators.matches(parse_etags(request.headers.get('if-none-match')),
+                                      parse_date(request.headers.get('if-modified-since'))):
+                    return self.finish(Response(status_code=304, headers=validators.headers(validators.matched_etag)),
+                                       admission)
+                stmt = serializer.select(extend(select(model))).where(key_column == id)
+                # 序列只在 include_sequence 或 fields 点名时读取
+                if sequence is not None and (args.get('include_sequence') or (fields and sequence.key in fields)):
+                    stmt = stmt.add_columns(sequence)
+                rows = (await session.execute(stmt)).all()
+                if not rows:
+                    return self.finish(self.error('资源不存在', 404), admission)
+                item = serializer.rows(rows)[0]
+                for flag, key, query in DETAIL_INCLUDES.get(entity, ()):
+                    if args.get(flag):
+                        item[key] = [dict(row._mapping) for row in (await session.execute(query(id))).all()]
+            except BaseException:
+                admission.release()
+                raise
+        return self.finish(self.payload(request, _project(item, fields), validators), admission)
+
+def create_async_app(config_class=Config):
+    api = AsyncReadApi(config_class)
+    entities = '{entity:str}'
+    routes = [
+        Route('/api/status', api.status),
+        Route('/api/status/details', api.status_details),
+        Route(f'/api/{entities}', api.list_entities),
+        Route(f'/api/{entities}/{{id:int}}', api.get_entity),
+    ]
+    app = Starlette(routes=routes, on_shutdown=[api.engine.dispose])
+    app.state.api = api
+    return app
@@ -0,0 +1,204 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+# Smith-Waterman 局部比对（Gotoh 仿射空位），NumPy 向量化。
+# 同一批的多条目标序列按长度补齐成二维数组，查询序列逐行推进，每一行对整批所有列同时计算（序列间向量化）：
+#   E（纵向空位）与 H 的对角项逐元素计算；
+#   F（横向空位）依赖同一行左侧，改写为前缀最大值：F[j] = max_{k<j}(H'[k] + k·ext) - first - (j-1)·ext，
+#   由 np.maximum.accumulate 一次求出（first >= ext 时与逐格递推等价）。
+# 补齐位置的打分为极小值，不会进入任何比对。空位罚分按 BLAST 惯例：长度为 L 的空位扣 open + L·extend。
+# 多批之间相互独立，总计算量较大时分发到进程池；结果按 (打分方案, 查询哈希, 目标哈希) 缓存。
+
+# BLOSUM62，行列顺序同 BLOSUM62_ALPHABET
+BLOSUM62_ALPHABET = 'ARNDCQEGHILKMFPSTWYVBZX*'
+BLOSUM62 = '''
+ 4 -1 -2 -2  0 -1 -1  0 -2 -1 -1 -1 -1 -2 -1  1  0 -3 -2  0 -2 -1  0 -4
+-1  5  0 -2 -3  1  0 -2  0 -3 -2  2 -1 -3 -2 -1 -1 -3 -2 -3 -1  0 -1 -4
+-2  0  6  1 -3  0  0  0  1 -3 -3  0 -2 -3 -2  1  0 -4 -2 -3  3  0 -1 -4
+-2 -2  1  6 -3  0  2 -1 -1 -3 -4 -1 -3 -3 -1  0 -1 -4 -3 -3  4  1 -1 -4
+ 0 -3 -3 -3  9 -3 -4 -3 -3 -1 -1 -3 -1 -2 -3 -1 -1 -2 -2 -1 -3 -3 -2 -4
+-1  1  0  0 -3  5  2 -2  0 -3 -2  1  0 -3 -1  0 -1 -2 -1 -2  0  3 -1 -4
+-1  0  0  2 -4  2  5 -2  0 -3 -3  1 -2 -3 -1  0 -1 -3 -2 -2  1  4 -1 -4
+ 0 -2  0 -1 -3 -2 -2  6 -2 -4 -4 -2 -3 -3 -2  0 -2 -2 -3 -3 -1 -2 -1 -4
+-2  0  1 -1 -3  0  0 -2  8 -3 -3 -1 -2 -1 -2 -1 -2 -2  2 -3  0  0 -1 -4
+-1 -3 -3 -3 -1 -3 -3 -4 -3  4  2 -3  1  0 -3 -2 -1 -3 -1  3 -3 -3 -1 -4
+-1 -2 -3 -4 -1 -2 -3 -4 -3  2  4 -2  2  0 -3 -2 -1 -2 -1  1 -4 -3 -1 -4
+-1  2  0 -1 -3  1  1 -2 -1 -3 -2  5 -1 -3 -1  0 -1 -3 -2 -2  0  1 -1 -4
+-1 -1 -2 -3 -1  0 -2 -3 -2  1  2 -1  5  0 -2 -1 -1 -1 -1  1 -3 -1 -1 -4
+-2 -3 -3 -3 -2 -3 -3 -3 -1  0  0 -3  0  6 -4 -2 -2  1  3 -1 -3 -3 -1 -4
+-1 -2 -2 -1 -3 -1 -1 -2 -2 -3 -3 -1 -2 -4  7 -1 -1 -4 -3 -2 -2 -1 -2 -4
+ 1 -1  1  0 -1  0  0  0 -1 -2 -2  0 -1 -2 -1  4  1 -3 -2 -2  0  0  0 -4
+ 0 -1  0 -1 -1 -1 -1 -2 -2 -1 -1 -1 -1 -2 -1  1  5 -2 -2  0 -1 -1  0 -4
+-3 -3 -4 -4 -2 -2 -3 -2 -2 -3 -2 -3 -1  1 -4 -3 -2 11  2 -3 -4 -3 -2 -4
+-2 -2 -2 -3 -2 -1 -2 -3  2 -1 -1 -2 -1  3 -3 -2 -2  2  7 -1 -3 -2 -1 -4
+ 0 -3 -3 -3 -1 -2 -2 -3 -3  3  1 -2  1 -1 -2 -2  0 -3 -1  4 -3 -2 -1 -4
+-2 -1  3  4 -3  0  1 -1  0 -3 -4  0 -3 -3 -2  0 -1 -4 -3 -3  4  1 -1 -4
+-1  0  0  1 -3  3  4 -2  0 -3 -3  1 -1 -3 -1  0 -1 -3 -2 -2  1  4 -1 -4
+ 0 -1 -1 -1 -2 -1 -1 -1 -1 -1 -1 -1 -1 -1 -2  0  0 -2 -1 -1 -1 -1 -1 -4
+-4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4  1
+'''
+
+# 补齐位置的打分，远小于任何可能的比对得分
+PAD_SCORE = -(1 << 20)
+
+# 打分方案：alphabet 为字符顺序，unknown 为字母表外字符的替代字符，matrix 为打分矩阵
+Scheme = namedtuple('Scheme', 'alphabet unknown matrix gap_open gap_extend')
+
+def _nucleotide_matrix(match, mismatch, ambiguous):
+    matrix = np.full((5, 5), mismatch, dtype=np.int32)
+    np.fill_diagonal(matrix, match)
+    matrix[4, :] = matrix[:, 4] = ambiguous
+    return matrix
+
+SCHEMES = {
+    # BLASTP 默认参数
+    'proteins': Scheme(BLOSUM62_ALPHABET, 'X',
+                       np.array(BLOSUM62.split(), dtype=np.int32).reshape(24, 24), 11, 1),
+    # BLASTN 默认参数
+    'genes': Scheme('ACGTN', 'N', _nucleotide_matrix(2, -3, -1), 5, 2)
+}
+
+def encode(sequence, scheme):
+    """序列 -> 字母表下标数组；小写同大写，字母表外的字符按 unknown 处理，核酸中 U 视为 T"""
+    table = np.full(256, scheme.alphabet.index(scheme.unknown), dtype=np.int32)
+    for i, letter in enumerate(scheme.alphabet):
+        table[ord(letter)] = table[ord(letter.lower())] = i
+    if scheme.alphabet == 'ACGTN':
+        table[ord('U')] = table[ord('u')] = scheme.alphabet.index('T')
+    return table[np.frombuffer(sequence.encode('ascii', 'replace'), dtype=np.uint8)]
+
+def align_batch(scheme_name, query, targets):
+    """查询与一批目标序列的局部比对，返回每条目标的 (得分, 查询终点, 目标终点)，终点为 1 起始位置
+
+    query / targets 为 encode 后的下标数组；得分为 0 时终点为 0。
+    """
+    scheme = SCHEMES[scheme_name]
+    size = len(scheme.alphabet)
+    first, extend = scheme.gap_open + scheme.gap_extend, scheme.gap_extend
+    count = len(targets)
+    width = max((len(target) for target in targets), default=0)
+    if not count or not width or not len(query):
+        return [(0, 0, 0)] * count
+    # 打分矩阵多加一列给补齐字符
+    matrix = np.full((size, size + 1), PAD_SCORE, dtype=np.int32)
+    matrix[:, :size] = scheme.matrix
+    padded = np.full((count, width), size, dtype=np.int32)
+    for row, target in enumerate(targets):
+        padded[row, :len(target)] = target
+
+    h_prev = np.zeros((count, width + 1), dtype=np.int32)
+    e = np.full((count, width), PAD_SCORE, dtype=np.int32)
+    f = np.full((count, width), PAD_SCORE, dtype=np.int32)
+    ramp = np.arange(width, dtype=np.int32) * extend
+    best = np.zeros(count, dtype=np.int32)
+    best_query = np.zeros(count, dtype=np.int64)
+    best_target = np.zeros(count, dtype=np.int64)
+    for i, code in enumerate(query.tolist()):
+        scores = matrix[code][padded]
+        e = np.maximum(h_prev[:, 1:] - first, e - extend)
+        h = np.maximum(np.maximum(h_prev[:, :-1] + scores, e), 0)
+        # F[j] = max_{k<j}(H'[k] + k·ext) - first - (j-1)·ext
+        prefix = np.maximum.accumulate(h + ramp, axis=1)
+        f[:, 1:] = prefix[:, :-1] - first - ramp[:-1]
+        np.maximum(h, f, out=h)
+        row_best = h.max(axis=1)
+        improved = row_best > best
+        if improved.any():
+            best[improved] = row_best[improved]
+            best_query[improved] = i + 1
+            best_target[improved] = h[improved].argmax(axis=1) + 1
+        h_prev[:, 1:] = h
+    return list(zip(best.tolist(), best_query.tolist(), best_target.tolist()))
+
+def sequence_hash(sequence):
+    return hashlib.sha1(sequence.encode('ascii', 'replace')).hexdigest()
+
+# 一条比对结果：target 为调用方传入的键（如主键），query_end / target_end 为 1 起始终点
+Alignment = namedtuple('Alignment', 'target score query_end target_end')
+
+class AlignmentService:
+    """批量比对：缓存命中的直接返回，其余按长度分批，计算量大时分发到进程池"""
+
+    def __init__(self):
+        self.workers = 0
+        self.batch_size = 32
+        self.parallel_min_cells = 5_000_000
+        self.cache_size = 100000
+        self._cache = OrderedDict()  # (方案, 查询哈希, 目标哈希) -> (得分, 查询终点, 目标终点)
+        self._pool = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.workers = app.config.get('ALIGN_WORKERS', self.workers)
+        self.batch_size = app.config.get('ALIGN_BATCH_SIZE', self.batch_size)
+        self.parallel_min_cells = app.config.get('ALIGN_PARALLEL_MIN_CELLS', self.parallel_min_cells)
+        self.cache_size = app.config.get('ALIGN_CACHE_SIZE', self.cache_size)
+
+    def _executor(self):
+        # 进程池在首次并行比对时创建；工作进程只做 NumPy 计算
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers or os.cpu_count())
+            return self._pool
+
+    def _batches(self, scheme_name, query_codes, pending):
+        """按目标长度排序后分批，相近长度放在一起以减少补齐"""
+        pending = sorted(pending, key=lambda item: len(item[2]))
+        for i in range(0, len(pending), self.batch_size):
+            batch = pending[i:i + self.batch_size]
+            yield batch, (scheme_name, query_codes, [encode(sequence, SCHEMES[scheme_name])
+                                                     for _, _, sequence in batch])
+
+    def align(self, scheme_name, query, targets, parallel=None):
+        """query 与 targets（[(键, 序列)]）逐一比对，按得分降序返回 Alignment 列表
+
+        parallel 为 None 时按计算量（查询长度 × 目标总长）自动决定是否使用进程池。
+        """
+        query_key = sequence_hash(query)
+        results, pending = {}, []
+        with self._lock:
+            for key, sequence in targets:
+                cache_key = (scheme_name, query_key, sequence_hash(sequence))
+                cached = self._cache.get(cache_key)
+                if cached is not None:
+                    self._cache.move_to_end(cache_key)
+                    results[key] = cached
+                    self.hits += 1
+                else:
+                    pending.append((key, cache_key, sequence))
+                    self.misses += 1
+
+        query_codes = encode(query, SCHEMES[scheme_name])
+        if parallel is None:
+            cells = len(query) * sum(len(sequence) for _, _, sequence in pending)
+            parallel = self.workers > 0 and cells >= self.parallel_min_cells
+        batches = list(self._batches(scheme_name, query_codes, pending))
+        if parallel and len(batches) > 1:
+            executor = self._executor()
+            outputs = [executor.submit(align_batch, *args) for _, args in batches]
+            outputs = [future.result() for future in outputs]
+        else:
+            outputs = [align_batch(*args) for _, args in batches]
+
+        with self._lock:
+            for (batch, _), output in zip(batches, outputs):
+                for (key, cache_key, _), result in zip(batch, output):
+                    results[key] = result
+                    self._cache[cache_key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        alignments = [Alignment(key, *results[key]) for key, _ in targets]
+        alignments.sort(key=lambda item: -item.score)
+        return alignments
+
+    def stats(self):
+        with self._lock:
+            return {'workers': self.workers, 'cached': len(self._cache), 'hits': self.hits, 'misses': self.misses}
+
+alignment_service = AlignmentService()
@@ -0,0 +1,46 @@
+import json
+import os
+import shutil
+from datetime import datetime
+import numpy as np
+
+# 离线构建的 NumPy 索引文件：每次构建写入 path/<版本>/（各数组一个 .npy 加 meta.json），
+# 写完后原子替换 path/current 指向新版本；查询进程读取 current，变化时以只读内存映射打开新版本。
+# 基序 FM 索引与 k-mer 相似度索引共用。
+
+# 保留的历史版本数，正在读取旧版本的进程不会因重建而失去文件
+KEEP_VERSIONS = 2
+
+def publish(path, arrays, meta):
+    """写入新版本并切换 current，返回版本名"""
+    os.makedirs(path, exist_ok=True)
+    version = datetime.utcnow().strftime('%Y%m%d%H%M%S%f')
+    directory = os.path.join(path, version)
+    os.makedirs(directory)
+    for name, array in arrays.items():
+        np.save(os.path.join(directory, f'{name}.npy'), array)
+    with open(os.path.join(directory, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+    # 先写临时文件再原子替换，读取方看到的 current 总是完整的
+    pointer = os.path.join(path, 'current.tmp')
+    with open(pointer, 'w') as f:
+        f.write(version)
+    os.replace(pointer, os.path.join(path, 'current'))
+    for old in sorted(name for name in os.listdir(path) if name.isdigit())[:-KEEP_VERSIONS]:
+        shutil.rmtree(os.path.join(path, old), ignore_errors=True)
+    return version
+
+def current_version(path):
+    """当前版本名，尚未构建时返回 None"""
+    try:
+        with open(os.path.join(path, 'current')) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def load_array(directory, name):
+    return np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+
+def load_meta(directory):
+    with open(os.path.join(directory, 'meta.json')) as f:
+        return json.load(f)
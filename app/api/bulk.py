@@ -0,0 +1,183 @@
+import re
+from collections import namedtuple
+from sqlalchemy import insert, select, func
+from sqlalchemy.exc import DBAPIError
+from app.models import Species, Genes, Proteins, Publications, Experimental_Data
+from app.writes import write_tracker, RowChange
+
+# 批量写入：先整批校验字段，再把外键存在性检查（即 before_protein_insert / before_experiment_insert
+# 触发器与外键约束的语义）改成每块一条 IN 查询，通过校验的行按块多行插入，每块一个 SAVEPOINT。
+# 触发器仍在库内兜底：校验之后外键被并发删除时该块插入失败，回滚到 SAVEPOINT 后逐行重试，
+# 只有这种情况才逐行往返，并把触发器的报错归到具体的行上。
+# 插入后按主键读回新行的名称列补报给写入追踪，名称索引与补全索引增量更新，不必整体重建。
+
+# kind：str / text 为字符串（str 限制长度），dna / protein 为去除空白的序列，int 为整数，tuple 为枚举
+Field = namedtuple('Field', 'name kind required max_length')
+
+# 序列允许的字符（不区分大小写）：IUPAC 核苷酸（含简并碱基）与氨基酸（含 B/Z/X/U/O/J 与终止符 *）
+SEQUENCE_PATTERNS = {
+    'dna': re.compile(r'^[ACGTUNRYKMSWBDHV]+$', re.IGNORECASE),
+    'protein': re.compile(r'^[ACDEFGHIKLMNPQRSTVWYBZXUOJ*]+$', re.IGNORECASE)
+}
+
+def _field(name, kind, required=False, max_length=None):
+    return Field(name, kind, required, max_length)
+
+# 实体 -> (模型, 字段列表, {外键字段: (被引用主键, 不存在时的错误信息)})
+BULK_ENTITIES = {
+    'genes': (Genes, [
+        _field('gene_name', 'str', True, 100),
+        _field('gene_symbol', 'str', max_length=50),
+        _field('sequence', 'dna', True),
+        _field('chromosome', 'str', max_length=50),
+        _field('start_position', 'int'),
+        _field('end_position', 'int'),
+        _field('strand', ('+', '-')),
+        _field('species_id', 'int')
+    ], {'species_id': (Species.species_id, '物种不存在')}),
+    'proteins': (Proteins, [
+        _field('protein_name', 'str', True, 100),
+        _field('uniprot_id', 'str', True, 50),
+        # 触发器 before_protein_insert 要求基因存在，gene_id 为空同样会被拒绝
+        _field('gene_id', 'int', True),
+        _field('amino_acid_sequence', 'protein', True)
+    ], {'gene_id': (Genes.gene_id, '关联基因不存在')}),
+    'experiments': (Experimental_Data, [
+        _field('experiment_type', 'str', True, 100),
+        _field('conditions', 'text', True),
+        _field('results', 'text', True),
+        # 触发器 before_experiment_insert 只检查非空的 gene_id
+        _field('gene_id', 'int'),
+        _field('publication_id', 'int')
+    ], {'gene_id': (Genes.gene_id, '关联基因不存在'),
+        'publication_id': (Publications.publication_id, '关联文献不存在')})
+}
+
+# 校验结果：rows 为通过校验、待插入的行，errors 为逐行错误
+BulkResult = namedtuple('BulkResult', 'rows errors')
+
+def _clean(field, value):
+    """校验并规范化单个字段，返回 (值, 错误信息)"""
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None, ('不能为空' if field.required else None)
+    if field.kind == 'int':
+        if isinstance(value, bool):
+            return None, '必须为整数'
+        try:
+            return int(value), None
+        except (TypeError, ValueError):
+            return None, '必须为整数'
+    if not isinstance(value, str):
+        return None, '必须为字符串'
+    if isinstance(field.kind, tuple):
+        return (value, None) if value in field.kind else (None, f'只能取 {" / ".join(field.kind)}')
+    if field.kind in SEQUENCE_PATTERNS:
+        value = re.sub(r'\s+', '', value)
+        if not SEQUENCE_PATTERNS[field.kind].match(value):
+            return None, '含有非法的序列字符'
+        return value, None
+    if field.kind == 'str':
+        value = value.strip()
+        if field.max_length and len(value) > field.max_length:
+            return None, f'长度不能超过 {field.max_length}'
+    return value, None
+
+def validate(entity, items):
+    """逐行校验字段，返回 BulkResult；rows 中每项为 (输入序号, 规范化后的行)"""
+    fields = BULK_ENTITIES[entity][1]
+    known = {field.name for field in fields}
+    rows, errors = [], []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({'index': index, 'errors': {'_': '每一项必须是对象'}})
+            continue
+        row, row_errors = {}, {}
+        for name in item.keys() - known:
+            row_errors[name] = '未知字段'
+        for field in fields:
+            value, error = _clean(field, item.get(field.name))
+            if error:
+                row_errors[field.name] = error
+            else:
+                row[field.name] = value
+        # 行级约束：基因起点不能大于终点
+        start, end = row.get('start_position'), row.get('end_position')
+        if start is not None and end is not None and start > end:
+            row_errors['end_position'] = '不能小于 start_position'
+        if row_errors:
+            errors.append({'index': index, 'errors': row_errors})
+        else:
+            rows.append((index, row))
+    return BulkResult(rows, errors)
+
+def check_references(session, entity, rows, chunk_size):
+    """外键存在性检查：每个外键每块一条 IN 查询，返回 (通过的行, 逐行错误)"""
+    references = BULK_ENTITIES[entity][2]
+    missing = {}
+    for name, (key_column, message) in references.items():
+        values = list({row[name] for _, row in rows if row.get(name) is not None})
+        existing = set()
+        for i in range(0, len(values), chunk_size):
+            existing.update(session.execute(
+                select(key_column).where(key_column.in_(values[i:i + chunk_size]))
+            ).scalars())
+        for index, row in rows:
+            if row.get(name) is not None and row[name] not in existing:
+                missing.setdefault(index, {})[name] = message
+    passed = [(index, row) for index, row in rows if index not in missing]
+    errors = [{'index': index, 'errors': row_errors} for index, row_errors in missing.items()]
+    return passed, errors
+
+def _error_message(error):
+    """数据库错误信息：触发器 SIGNAL 的消息在 orig 的参数里"""
+    orig = getattr(error, 'orig', None)
+    return str(orig.args[-1] if orig is not None and orig.args else error)
+
+def insert_rows(session, entity, rows, chunk_size):
+    """按块多行插入，每块一个 SAVEPOINT；返回 (插入行数, 逐行错误)
+
+    某块被触发器或约束拒绝时回滚该块，再逐行插入定位出错的行，其余行照常写入。
+    """
+    # 新行由 report_inserted 补报，批量 INSERT 不必把整张表标记为无法追踪
+    stmt = insert(BULK_ENTITIES[entity][0]).execution_options(report_rows=True)
+    inserted, errors = 0, []
+    for i in range(0, len(rows), chunk_size):
+        chunk = rows[i:i + chunk_size]
+        try:
+            with session.begin_nested():
+                session.execute(stmt, [row for _, row in chunk])
+            inserted += len(chunk)
+            continue
+        except DBAPIError:
+            pass
+        for index, row in chunk:
+            try:
+                with session.begin_nested():
+                    session.execute(stmt, [row])
+                inserted += 1
+            except DBAPIError as e:
+                errors.append({'index': index, 'errors': {'_': _error_message(e)}})
+    return inserted, errors
+
+def _key_column(entity):
+    return BULK_ENTITIES[entity][0].__mapper__.primary_key[0]
+
+def last_key(session, entity):
+    """插入前的最大主键"""
+    return session.execute(select(func.max(_key_column(entity)))).scalar() or 0
+
+def report_inserted(session, entity, after_key):
+    """读回主键大于 after_key 的新行，把名称索引与补全索引关注的列补报给写入追踪
+
+    自增主键单调递增，本事务插入的行都在其中；同时读到的其他已提交新行重复应用不影响结果，
+    回滚的 SAVEPOINT 中的行读不到。只读名称列，不读序列。
+    """
+    model = BULK_ENTITIES[entity][0]
+    columns = write_tracker.watched(model)
+    if not columns:
+        return
+    key_column = _key_column(entity)
+    rows = session.execute(select(key_column, *[getattr(model, name) for name in columns]).where(
+        key_column > after_key))
+    write_tracker.record(session, [RowChange(model.__tablename__, row[0], dict(zip(columns, row[1:])))
+                                   for row in rows])
@@ -0,0 +1,239 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+from flask import request, make_response
+from app.writes import write_tracker, ALL_TABLES
+
+# API 响应缓存：以“接口 + 规范化查询参数”为键缓存 200 响应体，每条缓存带若干实体标签（表名）。
+# 会话提交后根据本次写入涉及的表（见 app.writes）失效对应标签，admin / main 蓝图中的增删改都会触发。
+# 为避免“读到旧数据的请求在失效之后才写入缓存”，写入前核对标签版本号，版本变化则放弃写入。
+
+ALL_TAGS = ALL_TABLES
+
+class MemoryBackend:
+    """进程内 LRU 后端，适合单进程部署；多进程时各进程只能失效自己的缓存"""
+
+    def __init__(self, maxsize=2048):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # key -> (过期时间, 值, 标签)
+        self._tag_keys = {}            # tag -> {key}
+        self._versions = {}            # tag -> 版本号
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def versions(self, tags):
+        with self._lock:
+            return tuple(self._versions.get(tag, 0) for tag in tags)
+
+    def set(self, key, value, tags, ttl, versions):
+        with self._lock:
+            if tuple(self._versions.get(tag, 0) for tag in tags) != versions:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.time() + ttl, value, tags)
+            for tag in tags:
+                self._tag_keys.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+                for key in list(self._tag_keys.get(tag, ())):
+                    self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tag_keys.clear()
+
+    def size(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tag_keys.get(tag)
+            if keys is not None:
+                keys.discard(key)
+
+class DiskBackend:
+    """基于 SQLite 文件的共享后端，同一台机器上的多个 worker 共用缓存与失效信息"""
+
+    def __init__(self, path, maxsize=2048):
+        self.path = path
+        self.maxsize = maxsize
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL NOT NULL, created REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS entry_tags (
+                tag TEXT NOT NULL, key TEXT NOT NULL, PRIMARY KEY (tag, key));
+            CREATE TABLE IF NOT EXISTS tag_versions (
+                tag TEXT PRIMARY KEY, version INTEGER NOT NULL);
+            CREATE INDEX IF NOT EXISTS idx_entries_created ON entries(created);
+        ''')
+        conn.commit()
+
+    def _conn(self):
+        # 每个线程独立连接；WAL 模式下读写互不阻塞
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute(
+            'SELECT value FROM entries WHERE key = ? AND expires > ?', (key, time.time())).fetchone()
+        return bytes(row[0]) if row else None
+
+    def versions(self, tags):
+        rows = dict(self._conn().execute(
+            f'SELECT tag, version FROM tag_versions WHERE tag IN ({",".join("?" * len(tags))})',
+            tuple(tags)).fetchall()) if tags else {}
+        return tuple(rows.get(tag, 0) for tag in tags)
+
+    def set(self, key, value, tags, ttl, versions):
+        conn = self._conn()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if self.versions(tags) != versions:
+                conn.execute('ROLLBACK')
+                return
+            conn.execute('INSERT OR REPLACE INTO entries (key, value, expires, created) VALUES (?, ?, ?, ?)',
+                         (key, value, now + ttl, now))
+            conn.executemany('INSERT OR IGNORE INTO entry_tags (tag, key) VALUES (?, ?)',
+                             [(tag, key) for tag in tags])
+            overflow = conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0] - self.maxsize
+            if overflow > 0:
+                conn.execute('DELETE FROM entry_tags WHERE key IN '
+                             '(SELECT key FROM entries ORDER BY created LIMIT ?)', (overflow,))
+                conn.execute('DELETE FROM entries WHERE key IN '
+                             '(SELECT key FROM entries ORDER BY created LIMIT ?)', (overflow,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def invalidate(self, tags):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for tag in tags:
+                conn.execute('INSERT INTO tag_versions (tag, version) VALUES (?, 1) '
+                             'ON CONFLICT(tag) DO UPDATE SET version = version + 1', (tag,))
+                conn.execute('DELETE FROM entries WHERE key IN (SELECT key FROM entry_tags WHERE tag = ?)', (tag,))
+            conn.execute('DELETE FROM entry_tags WHERE key NOT IN (SELECT key FROM entries)')
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def clear(self):
+        conn = self._conn()
+        conn.execute('DELETE FROM entries')
+        conn.execute('DELETE FROM entry_tags')
+
+    def size(self):
+        return self._conn().execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+class ResponseCache:
+    """API 响应缓存，后端由 API_CACHE_BACKEND 选择：memory / disk / none"""
+
+    def __init__(self):
+        self.backend = None
+        self.ttl = 300
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        backend = app.config.get('API_CACHE_BACKEND', 'memory')
+        maxsize = app.config.get('API_CACHE_SIZE', 2048)
+        self.ttl = app.config.get('API_CACHE_TTL', self.ttl)
+        if backend == 'memory':
+            self.backend = MemoryBackend(maxsize)
+        elif backend == 'disk':
+            path = app.config.get('API_CACHE_PATH') or os.path.join(app.instance_path, 'api_cache.sqlite')
+            self.backend = DiskBackend(path, maxsize)
+        else:
+            self.backend = None
+        if self.backend is not None:
+            write_tracker.subscribe(self.invalidate_written)
+
+    def invalidate(self, tags):
+        if self.backend is not None and tags:
+            self.backend.invalidate(sorted(tags))
+
+    def invalidate_written(self, writes):
+        tags = writes.tables & set(ALL_TAGS)
+        # 基因与文献的多对多关联通过 relationship 写入 Gene_Publications
+        if tags & {'Genes', 'Publications'}:
+            tags.add('Gene_Publications')
+        self.invalidate(tags)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__ if self.backend else None,
+            'size': self.backend.size() if self.backend else 0,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0
+        }
+
+    def cached(self, *tags):
+        """缓存 GET 接口的 200 JSON 响应；tags 为响应所依赖的表"""
+        tags = tuple(sorted(tags))
+
+        def decorator(view_function):
+            @wraps(view_function)
+            def decorated_function(*args, **kwargs):
+                if self.backend is None:
+                    return view_function(*args, **kwargs)
+                key = _cache_key()
+                body = self.backend.get(key)
+                if body is not None:
+                    self.hits += 1
+                    response = make_response(body)
+                    response.mimetype = 'application/json'
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+                self.misses += 1
+                versions = self.backend.versions(tags)
+                response = make_response(view_function(*args, **kwargs))
+                if response.status_code == 200 and response.mimetype == 'application/json':
+                    self.backend.set(key, response.get_data(), tags, self.ttl, versions)
+                response.headers['X-Cache'] = 'MISS'
+                return response
+            return decorated_function
+        return decorator
+
+def _cache_key():
+    """接口路径 + 排序后的查询参数；保留空值并重新编码，避免不同请求落到同一个键"""
+    return request.path + '?' + urlencode(sorted(request.args.items(multi=True)))
+
+response_cache = ResponseCache()
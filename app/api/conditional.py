@@ -0,0 +1,169 @@
+import hashlib
+from datetime import datetime, timezone
+from flask import abort, request, make_response
+from werkzeug.http import http_date, quote_etag
+from sqlalchemy import select, func, true
+from app import db
+from app.models import Species, Genes, Proteins, Publications, Experimental_Data, Gene_Publications
+from app.api.serializers import COMPRESS_ENCODINGS
+
+# 详情接口的条件请求支持：先用一条只含时间戳/计数的轻量查询算出资源指纹，
+# 与 If-None-Match / If-Modified-Since 比较，未变化时直接返回 304，不再加载实体和序列。
+# 指纹查询与比较逻辑（Validators）由同步接口和异步接口（app/api/aio.py）共用。
+# 关联数据的删除不会留下更新时间，含关联指纹的资源只按 ETag 验证，不输出 Last-Modified。
+
+# 关联指纹中行数列的标签，用于识别含关联数据的资源
+CHILD_ROWS = 'child_rows'
+
+def _flag(args, name):
+    """与 request.args.get(name, type=bool) 相同：非空即为真；args 为 None 时读取当前请求"""
+    return bool((request.args if args is None else args).get(name))
+
+def _entity(column, key_column, id):
+    """主实体的更新时间；实体不存在时该子查询无行，整条指纹查询返回空"""
+    return select(column).where(key_column == id)
+
+def _aggregate(updated_column, key_column, *where, joins=()):
+    """关联数据指纹：(最大更新时间, 行数, 主键和)，行数与主键和用于发现删除和关联变化"""
+    stmt = select(func.max(updated_column), func.count(key_column).label(CHILD_ROWS),
+                  func.sum(key_column)).select_from(updated_column.class_)
+    for target, onclause in joins:
+        stmt = stmt.join(target, onclause)
+    return stmt.where(*where)
+
+def _parent(updated_column, *where, joins=()):
+    """被引用的父实体（如基因所属物种）的更新时间，用 MAX 保证总有一行"""
+    stmt = select(func.max(updated_column)).select_from(updated_column.class_)
+    for target, onclause in joins:
+        stmt = stmt.join(target, onclause)
+    return stmt.where(*where)
+
+def species_state(id, args=None):
+    parts = [_entity(Species.updated_at, Species.species_id, id),
+             # gene_count 始终输出，基因列表只在 include_genes 时输出
+             _aggregate(Genes.updated_at, Genes.gene_id, Genes.species_id == id)]
+    return parts
+
+def gene_state(id, args=None):
+    parts = [_entity(Genes.updated_at, Genes.gene_id, id),
+             _parent(Species.updated_at, Genes.gene_id == id,
+                     joins=[(Genes, Genes.species_id == Species.species_id)])]
+    if _flag(args, 'include_proteins'):
+        parts.append(_aggregate(Proteins.updated_at, Proteins.protein_id, Proteins.gene_id == id))
+    if _flag(args, 'include_publications'):
+        parts.append(_aggregate(
+            Publications.updated_at, Gene_Publications.publication_id, Gene_Publications.gene_id == id,
+            joins=[(Gene_Publications, Gene_Publications.publication_id == Publications.publication_id)]))
+    if _flag(args, 'include_experiments'):
+        parts.append(_aggregate(
+            Experimental_Data.updated_at, Experimental_Data.experiment_id, Experimental_Data.gene_id == id))
+    return parts
+
+def protein_state(id, args=None):
+    return [_entity(Proteins.updated_at, Proteins.protein_id, id),
+            _parent(Genes.updated_at, Proteins.protein_id == id,
+                    joins=[(Proteins, Proteins.gene_id == Genes.gene_id)])]
+
+def publication_state(id, args=None):
+    parts = [_entity(Publications.updated_at, Publications.publication_id, id)]
+    if _flag(args, 'include_genes'):
+        link = [(Gene_Publications, Gene_Publications.gene_id == Genes.gene_id)]
+        parts.append(_aggregate(Genes.updated_at, Gene_Publications.gene_id,
+                                Gene_Publications.publication_id == id, joins=link))
+        # 基因列表中带有物种名称
+        parts.append(_parent(Species.updated_at, Gene_Publications.publication_id == id,
+                             joins=[(Genes, Genes.species_id == Species.species_id)] + link))
+    if _flag(args, 'include_experiments'):
+        parts.append(_aggregate(
+            Experimental_Data.updated_at, Experimental_Data.experiment_id,
+            Experimental_Data.publication_id == id))
+    return parts
+
+def experiment_state(id, args=None):
+    return [_entity(Experimental_Data.updated_at, Experimental_Data.experiment_id, id),
+            _parent(Genes.updated_at, Experimental_Data.experiment_id == id,
+                    joins=[(Experimental_Data, Experimental_Data.gene_id == Genes.gene_id)]),
+            _parent(Publications.updated_at, Experimental_Data.experiment_id == id,
+                    joins=[(Experimental_Data, Experimental_Data.publication_id == Publications.publication_id)])]
+
+def fingerprint_query(parts):
+    """把各部分作为单行派生表交叉连接，一条 SQL 取回全部指纹值"""
+    subqueries = [part.subquery() for part in parts]
+    joined = subqueries[0]
+    for subquery in subqueries[1:]:
+        joined = joined.join(subquery, true())
+    columns = [column for subquery in subqueries for column in subquery.c]
+    return select(*columns).select_from(joined)
+
+class Validators:
+    """由指纹算出 ETag / Last-Modified，并与条件请求头比较
+
+    path 与 args（(名称, 值) 序列）参与 ETag；state 为指纹查询返回的一行。
+    """
+
+    def __init__(self, path, state, args, parts):
+        # ETag 同时取决于指纹和查询参数（include_*、fields 等）
+        digest = hashlib.sha1(repr((path, tuple(state), sorted(args))).encode('utf-8'))
+        self.etag = digest.hexdigest()
+        self.matched_etag = None
+        # 关联行被删除时最大更新时间可能不变，这类资源不提供 Last-Modified，If-Modified-Since 随之失效
+        has_children = any(CHILD_ROWS in part.selected_columns for part in parts)
+        timestamps = [value for value in state if isinstance(value, datetime)]
+        self.last_modified = None
+        if timestamps and not has_children:
+            self.last_modified = max(timestamps).replace(tzinfo=timezone.utc, microsecond=0)
+
+    def matches(self, if_none_match, if_modified_since):
+        """if_none_match 为 werkzeug 的 ETags，if_modified_since 为 datetime 或 None"""
+        # 有 If-None-Match 时以 ETag 为准，忽略 If-Modified-Since；
+        # 压缩响应的 ETag 带编码后缀（"...-gzip"），与不带后缀的形式一样有效，304 回送客户端持有的那个
+        if if_none_match:
+            if if_none_match.star_tag:
+                return True
+            for etag in [self.etag] + [f'{self.etag}-{encoding}' for encoding in COMPRESS_ENCODINGS]:
+                if if_none_match.contains_weak(etag):
+                    self.matched_etag = etag
+                    return True
+            return False
+        if if_modified_since and self.last_modified:
+            if if_modified_since.tzinfo is None:
+                if_modified_since = if_modified_since.replace(tzinfo=timezone.utc)
+            return self.last_modified <= if_modified_since
+        return False
+
+    def headers(self, etag=None):
+        """验证相关的响应头；etag 未指定时使用不带编码后缀的 ETag"""
+        headers = {'ETag': quote_etag(etag or self.etag)}
+        if self.last_modified:
+            headers['Last-Modified'] = http_date(self.last_modified)
+        # 允许客户端缓存，但每次使用前必须重新验证
+        headers['Cache-Control'] = 'private, no-cache'
+        return headers
+
+class Conditional(Validators):
+    """详情接口的条件请求处理
+
+    用法：
+        cond = Conditional(gene_state(id))      # 资源不存在时 404
+        if cond.not_modified():
+            return cond.respond()                # 304
+        ...
+        return cond.respond(jsonify(result))     # 200，附带 ETag / Last-Modified
+    """
+
+    def __init__(self, parts):
+        state = db.session.execute(fingerprint_query(parts)).first()
+        if state is None:
+            abort(404)
+        super().__init__(request.path, state, request.args.items(multi=True), parts)
+
+    def not_modified(self):
+        return self.matches(request.if_none_match, request.if_modified_since)
+
+    def respond(self, response=None):
+        if response is None:
+            response = make_response('', 304)
+            response.headers.update(self.headers(self.matched_etag))
+        else:
+            response.headers.update(self.headers())
+        return response
@@ -0,0 +1,76 @@
+import zlib
+from flask import Response, request, stream_with_context
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+from app import db
+from app.api.serializers import dumps
+
+# 服务端游标每批读取的行数，导出过程中内存占用只与该值有关
+EXPORT_BATCH_SIZE = 1000
+# 累积到该字节数再向客户端写出一块
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+def _record(row, fields=None):
+    """把 (实体, 关联列...) 行转换为字典，fields 为 None 时包含全部列"""
+    obj = row[0]
+    record = {attr.key: getattr(obj, attr.key) for attr in inspect(obj).mapper.column_attrs
+              if fields is None or attr.key in fields}
+    record.update((key, value) for key, value in zip(row._fields[1:], row[1:])
+                  if fields is None or key in fields)
+    return record
+
+def snapshot_rows(build_query):
+    """在一致性快照事务中用服务端游标逐批读取 build_query(session) 的结果
+
+    使用独立连接：MySQL 下以 REPEATABLE READ 开启 WITH CONSISTENT SNAPSHOT 事务，
+    整个导出期间看到的是同一时刻的数据；读取完毕或客户端断开后回滚并归还连接。
+    """
+    with db.engine.connect() as conn:
+        if conn.dialect.name == 'mysql':
+            conn.execution_options(isolation_level='REPEATABLE READ')
+            conn.exec_driver_sql('START TRANSACTION WITH CONSISTENT SNAPSHOT')
+        session = Session(bind=conn)
+        try:
+            query = build_query(session).execution_options(stream_results=True)
+            for row in query.yield_per(EXPORT_BATCH_SIZE):
+                yield row
+        finally:
+            session.close()
+
+def stream_response(chunks, mimetype, filename):
+    """把文本或字节块流式输出为附件，累积到 EXPORT_CHUNK_SIZE 再写出；客户端接受 gzip 时边读边压缩"""
+    # 按质量值协商，gzip;q=0 视为拒绝
+    use_gzip = request.accept_encodings['gzip'] > 0
+
+    def generate():
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if use_gzip else None
+        buffer = []
+        size = 0
+        for data in chunks:
+            data = data.encode('utf-8') if isinstance(data, str) else data
+            buffer.append(data)
+            size += len(data)
+            if size >= EXPORT_CHUNK_SIZE:
+                chunk = b''.join(buffer)
+                buffer, size = [], 0
+                chunk = compressor.compress(chunk) if compressor else chunk
+                if chunk:
+                    yield chunk
+        chunk = b''.join(buffer)
+        if compressor:
+            chunk = compressor.compress(chunk) + compressor.flush()
+        if chunk:
+            yield chunk
+
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    response.headers['Vary'] = 'Accept-Encoding'
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+def ndjson_response(rows, filename, fields=None):
+    """把行流式输出为 NDJSON"""
+    # 与 API 响应共用编码器（Decimal、日期等类型的处理一致）
+    lines = (dumps(_record(row, fields)) + b'\n' for row in rows)
+    return stream_response(lines, 'application/x-ndjson', filename)
@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+# 缓存中的 API 调用方信息，只保留鉴权与限流需要的字段，不持有 ORM 实例
+# subscription_type 仅读者有值（free / premium），决定限流档位
+ApiPrincipal = namedtuple('ApiPrincipal', ['user_id', 'username', 'user_type', 'subscription_type'],
+                          defaults=(None,))
+
+# 区分“未缓存”和“已缓存为无效密钥”
+MISSING = object()
+
+class ApiKeyCache:
+    """API 密钥 -> 调用方信息的进程内缓存（LRU 淘汰 + TTL 过期）
+
+    无效密钥同样缓存（值为 None），避免错误密钥反复打到数据库。
+    修改用户密钥或启用状态时必须调用 invalidate_user / invalidate_key；
+    多进程部署时其他进程依赖 TTL 过期，TTL 即最长的状态不一致时间。
+    """
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # api_key -> (过期时间, principal 或 None)
+        self._keys_by_user = {}        # user_id -> api_key
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.maxsize = app.config.get('API_KEY_CACHE_SIZE', self.maxsize)
+        self.ttl = app.config.get('API_KEY_CACHE_TTL', self.ttl)
+        self.clear()
+
+    def get(self, api_key):
+        """返回缓存的 principal（无效密钥为 None），未命中或已过期返回 MISSING"""
+        with self._lock:
+            entry = self._entries.get(api_key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(api_key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                self._remove(api_key)
+            self.misses += 1
+            return MISSING
+
+    def set(self, api_key, principal):
+        with self._lock:
+            if api_key in self._entries:
+                self._remove(api_key)
+            self._entries[api_key] = (time.monotonic() + self.ttl, principal)
+            if principal is not None:
+                self._keys_by_user[principal.user_id] = api_key
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_key(self, api_key):
+        if not api_key:
+            return
+        with self._lock:
+            if api_key in self._entries:
+                self._remove(api_key)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            api_key = self._keys_by_user.get(user_id)
+            if api_key is not None:
+                self._remove(api_key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0
+            }
+
+    def _remove(self, api_key):
+        _, principal = self._entries.pop(api_key)
+        if principal is not None and self._keys_by_user.get(principal.user_id) == api_key:
+            del self._keys_by_user[principal.user_id]
+
+api_key_cache = ApiKeyCache()
+
+def invalidate_user_api_key(user):
+    """用户密钥或启用状态变更后调用，清除该用户旧密钥与当前密钥的缓存"""
+    api_key_cache.invalidate_user(user.user_id)
+    api_key_cache.invalidate_key(user.api_key)
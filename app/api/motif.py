@@ -0,0 +1,281 @@
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import select, func
+from app.models import Genes, Deleted_Records
+from app.api.sequences import reverse_complement
+from app.api.arraystore import publish, current_version, load_array, load_meta
+
+# 基因序列精确基序搜索：离线构建的 FM 索引（后缀数组 + BWT + 分段 Occ 表），以 .npy 文件内存映射加载。
+# 全部基因序列转为大写后依次拼接，每条之后接分隔符 1，末尾为哨兵 0；基序不含分隔符，匹配不会跨基因。
+# 计数为反向搜索：每个字符两次 rank，rank = 检查点 + 至多 OCC_STEP 字节的扫描，耗时只与基序长度有关；
+# 定位直接读取后缀数组区间，再按各基因起点二分得到 (gene_id, 偏移)。
+# 构建之后新增或修改的基因由“增量侧索引”补充：按 updated_at 取出这些基因的序列在内存中扫描，
+# 同时屏蔽主索引中这些基因及已删除基因（墓碑）的命中，定期重建主索引即可把侧索引清空。
+# 屏蔽后的命中数 = 区间大小 - 被屏蔽基因构建时的序列中的出现次数：主索引另存拼接文本，
+# 只扫描这些基因的旧序列，计数仍与命中总数无关。
+
+SENTINEL = 0
+SEPARATOR = 1
+# Occ 检查点间隔（字节）
+OCC_STEP = 128
+
+MOTIF_PATTERN = re.compile(r'^[ACGTN]+$')
+
+def normalize_motif(motif):
+    """基序规范化：去空白、转大写、U 视为 T；含其他字符时返回 None"""
+    motif = re.sub(r'\s+', '', motif or '').upper().replace('U', 'T')
+    return motif if MOTIF_PATTERN.match(motif) else None
+
+def suffix_array(text):
+    """前缀倍增构建后缀数组（NumPy 向量化，O(n log² n)），text 末尾须为唯一最小的哨兵"""
+    n = len(text)
+    rank = text.astype(np.int64)
+    k = 1
+    while True:
+        second = np.full(n, -1, dtype=np.int64)
+        second[:n - k] = rank[k:]
+        sa = np.lexsort((second, rank))
+        first_sorted, second_sorted = rank[sa], second[sa]
+        boundary = np.empty(n, dtype=bool)
+        boundary[0] = True
+        boundary[1:] = (first_sorted[1:] != first_sorted[:-1]) | (second_sorted[1:] != second_sorted[:-1])
+        new_rank = np.cumsum(boundary) - 1
+        rank = np.empty(n, dtype=np.int64)
+        rank[sa] = new_rank
+        if new_rank[-1] == n - 1 or k >= n:
+            return sa.astype(np.int32 if n < 2 ** 31 else np.int64)
+        k *= 2
+
+def build_arrays(text):
+    """由拼接后的文本构建 FM 索引的各数组"""
+    alphabet, codes = np.unique(text, return_inverse=True)
+    codes = codes.astype(np.uint8)
+    sa = suffix_array(codes)
+    bwt = codes[sa - 1]  # sa 为 0 时取到末尾的哨兵
+    counts = np.bincount(codes, minlength=len(alphabet))
+    c_table = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64)
+    # occ[j, c] 为 bwt[:j * OCC_STEP] 中字符 c 的个数
+    blocks = (len(bwt) + OCC_STEP - 1) // OCC_STEP
+    padded = np.full(blocks * OCC_STEP, 255, dtype=np.uint8)
+    padded[:len(bwt)] = bwt
+    padded = padded.reshape(blocks, OCC_STEP)
+    occ = np.zeros((blocks + 1, len(alphabet)), dtype=np.int64)
+    for code in range(len(alphabet)):
+        occ[1:, code] = np.cumsum(np.count_nonzero(padded == code, axis=1))
+    return {'alphabet': alphabet, 'sa': sa, 'bwt': bwt, 'c_table': c_table, 'occ': occ}
+
+def build_index(session, path, settle_seconds=0, log=None):
+    """从数据库读取全部基因序列构建 FM 索引，发布为 path 下的新版本
+
+    snapshot_at 取读取开始前的时间（再减去沉淀秒数）：此后更新的基因都会进入侧索引，
+    即使主索引中已包含它们也只是被屏蔽，不会漏掉。
+    """
+    snapshot_at = datetime.utcnow() - timedelta(seconds=settle_seconds)
+    started = time.time()
+    parts, doc_ids, doc_starts = [], [], []
+    offset = 0
+    query = select(Genes.gene_id, Genes.sequence).where(Genes.sequence.isnot(None)).order_by(Genes.gene_id)
+    for gene_id, sequence in session.execute(query.execution_options(yield_per=1000)):
+        data = sequence.upper().encode('ascii', 'replace')
+        doc_ids.append(gene_id)
+        doc_starts.append(offset)
+        parts.append(data)
+        offset += len(data) + 1
+    text = np.frombuffer(b'\x01'.join(parts) + (b'\x01' if parts else b'') + b'\x00', dtype=np.uint8)
+    if log:
+        log(f'读取 {len(doc_ids)} 条基因序列，共 {len(text)} 字节，用时 {time.time() - started:.1f}s')
+
+    started = time.time()
+    arrays = build_arrays(text)
+    arrays['doc_ids'] = np.array(doc_ids, dtype=np.int64)
+    arrays['doc_starts'] = np.array(doc_starts, dtype=np.int64)
+    arrays['text'] = text
+    if log:
+        log(f'构建后缀数组与 FM 索引用时 {time.time() - started:.1f}s')
+
+    meta = {'snapshot_at': snapshot_at.isoformat(), 'genes': len(doc_ids), 'length': int(len(text))}
+    publish(path, arrays, meta)
+    return meta
+
+class FMIndex:
+    """已构建的一个版本，数组以只读内存映射打开"""
+
+    def __init__(self, directory):
+        self.sa = load_array(directory, 'sa')
+        self.bwt = load_array(directory, 'bwt')
+        self.occ = load_array(directory, 'occ')
+        self.c_table = np.asarray(load_array(directory, 'c_table'))
+        self.doc_ids = np.asarray(load_array(directory, 'doc_ids'))
+        self.doc_starts = np.asarray(load_array(directory, 'doc_starts'))
+        # 拼接文本；早期版本未保存时为 None，屏蔽计数退回逐个定位
+        text_path = os.path.join(directory, 'text.npy')
+        self.text = load_array(directory, 'text') if os.path.exists(text_path) else None
+        # 字节 -> 字符编码，不在字母表中的字节为 -1
+        self.codes = np.full(256, -1, dtype=np.int64)
+        alphabet = np.asarray(load_array(directory, 'alphabet'))
+        self.codes[alphabet] = np.arange(len(alphabet))
+        self.meta = load_meta(directory)
+        self.snapshot_at = datetime.fromisoformat(self.meta['snapshot_at'])
+
+    def _rank(self, code, i):
+        """bwt[:i] 中字符 code 的个数"""
+        block = i // OCC_STEP
+        start = block * OCC_STEP
+        return int(self.occ[block, code]) + int(np.count_nonzero(self.bwt[start:i] == code))
+
+    def interval(self, motif):
+        """反向搜索，返回后缀数组区间 [lo, hi)"""
+        lo, hi = 0, len(self.bwt)
+        for byte in reversed(motif.encode('ascii')):
+            code = self.codes[byte]
+            if code < 0:
+                return 0, 0
+            lo = int(self.c_table[code]) + self._rank(code, lo)
+            hi = int(self.c_table[code]) + self._rank(code, hi)
+            if lo >= hi:
+                return 0, 0
+        return lo, hi
+
+    def document(self, gene_id):
+        """构建时该基因的序列；不在主索引中或未保存文本时返回 None"""
+        i = int(np.searchsorted(self.doc_ids, gene_id))
+        if self.text is None or i == len(self.doc_ids) or self.doc_ids[i] != gene_id:
+            return None
+        start = int(self.doc_starts[i])
+        # 每条序列之后是分隔符，末尾另有哨兵
+        end = int(self.doc_starts[i + 1]) - 1 if i + 1 < len(self.doc_ids) else len(self.text) - 2
+        return self.text[start:end].tobytes().decode('ascii')
+
+    def locate(self, lo, hi):
+        """后缀数组区间 -> (gene_id 数组, 偏移数组)"""
+        positions = np.asarray(self.sa[lo:hi], dtype=np.int64)
+        docs = np.searchsorted(self.doc_starts, positions, 'right') - 1
+        return self.doc_ids[docs], positions - self.doc_starts[docs]
+
+def _find_all(sequence, motif):
+    """序列中 motif 的全部（可重叠）出现位置"""
+    positions = []
+    i = sequence.find(motif)
+    while i >= 0:
+        positions.append(i)
+        i = sequence.find(motif, i + 1)
+    return positions
+
+class MotifIndex:
+    """基序搜索入口：主 FM 索引 + 增量侧索引；主索引在 current 指向新版本后自动切换"""
+
+    def __init__(self):
+        self.path = None
+        self._index = None
+        self._version = None
+        # (签名, {gene_id: 序列}, 已删除的 gene_id 集合, {被屏蔽的 gene_id: 构建时的序列} 或 None)
+        self._side = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.path = app.config.get('MOTIF_INDEX_PATH') or os.path.join(app.instance_path, 'motif_index')
+
+    def _current(self):
+        """当前版本的主索引，未构建时返回 None"""
+        version = current_version(self.path)
+        if version is None:
+            return None
+        with self._lock:
+            if version != self._version:
+                self._index = FMIndex(os.path.join(self.path, version))
+                self._version = version
+                self._side = None
+            return self._index
+
+    def _side_index(self, session, index):
+        """构建之后变化的基因：签名（行数、最后更新时间、墓碑数）变化时重新读取"""
+        snapshot_at = index.snapshot_at
+        signature = tuple(session.execute(select(
+            func.count(Genes.gene_id), func.max(Genes.updated_at)
+        ).where(Genes.updated_at > snapshot_at)).one()) + (session.execute(select(
+            func.count(Deleted_Records.tombstone_id)
+        ).where(Deleted_Records.entity_type == 'genes', Deleted_Records.deleted_at > snapshot_at)).scalar(),)
+        side = self._side
+        if side is not None and side[0] == signature:
+            return side
+        sequences = {gene_id: (sequence or '').upper() for gene_id, sequence in session.execute(
+            select(Genes.gene_id, Genes.sequence).where(Genes.updated_at > snapshot_at))}
+        deleted = set(session.execute(select(Deleted_Records.entity_id).where(
+            Deleted_Records.entity_type == 'genes', Deleted_Records.deleted_at > snapshot_at)).scalars())
+        indexed = None
+        if index.text is not None:
+            indexed = {gene_id: index.document(gene_id) for gene_id in deleted | sequences.keys()}
+            indexed = {gene_id: sequence for gene_id, sequence in indexed.items() if sequence is not None}
+        side = (signature, sequences, deleted, indexed)
+        with self._lock:
+            if index is self._index:
+                self._side = side
+        return side
+
+    def search(self, session, motif, max_hits):
+        """正反两条链搜索 motif，返回 dict；未构建主索引时返回 None
+
+        hits 为 (gene_id, 偏移, 链) 列表，按基因、偏移排序，至多 max_hits 条；偏移为匹配在存储序列上的
+        0 起始位置（负链匹配即反向互补序列出现的位置）；counts 为各链的精确命中数。
+        """
+        index = self._current()
+        if index is None:
+            return None
+        _, side_sequences, deleted, indexed = self._side_index(session, index)
+        masked = np.array(sorted(deleted | side_sequences.keys()), dtype=np.int64)
+        reverse = reverse_complement(motif)
+        strands = [('+', motif)] + ([('-', reverse)] if reverse != motif else [])
+
+        counts, hits = {}, []
+        for strand, pattern in strands:
+            lo, hi = index.interval(pattern)
+            if hi == lo:
+                gene_ids, offsets, count = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), 0
+            elif not masked.size:
+                gene_ids, offsets = index.locate(lo, min(hi, lo + max_hits))
+                count = hi - lo
+            elif indexed is None:
+                # 未保存文本的旧版本：逐个定位才能精确计数
+                gene_ids, offsets = index.locate(lo, hi)
+                keep = ~np.isin(gene_ids, masked)
+                gene_ids, offsets = gene_ids[keep], offsets[keep]
+                count = len(gene_ids)
+            else:
+                # 只扫描被屏蔽基因的旧序列求出被屏蔽的命中数；多读这么多项就足以凑满 max_hits
+                masked_count = sum(len(_find_all(sequence, pattern)) for sequence in indexed.values())
+                gene_ids, offsets = index.locate(lo, min(hi, lo + max_hits + masked_count))
+                keep = ~np.isin(gene_ids, masked)
+                gene_ids, offsets = gene_ids[keep], offsets[keep]
+                count = hi - lo - masked_count
+            hits.extend((gene_id, offset, strand) for gene_id, offset in
+                        zip(gene_ids[:max_hits].tolist(), offsets[:max_hits].tolist()))
+            for gene_id, sequence in side_sequences.items():
+                found = _find_all(sequence, pattern)
+                count += len(found)
+                hits.extend((gene_id, offset, strand) for offset in found[:max_hits])
+            counts[strand] = count
+        hits.sort()
+        return {
+            'counts': counts,
+            'hits': hits[:max_hits],
+            'truncated': sum(counts.values()) > max_hits,
+            'index': {'built_at': index.meta['snapshot_at'], 'genes': index.meta['genes'],
+                      'side_genes': len(side_sequences)}
+        }
+
+    def stats(self):
+        with self._lock:
+            if self._index is None:
+                return {'version': None}
+            return {
+                'version': self._version,
+                'genes': self._index.meta['genes'],
+                'length': self._index.meta['length'],
+                'side_genes': len(self._side[1]) if self._side else None
+            }
+
+motif_index = MotifIndex()
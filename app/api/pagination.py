@@ -0,0 +1,143 @@
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+from flask import current_app, request
+from sqlalchemy import and_, or_, text
+from app import db
+
+class InvalidCursor(ValueError):
+    """游标无法解析，或与当前排序方式不匹配"""
+
+def get_per_page():
+    """读取 per_page 参数并限制在 [1, API_MAX_PER_PAGE] 区间内"""
+    max_per_page = current_app.config['API_MAX_PER_PAGE']
+    per_page = request.args.get('per_page', 10, type=int)
+    return max(1, min(per_page, max_per_page))
+
+def encode_cursor(sort_key, value, key):
+    """把 (排序列取值, 主键) 编码成不透明的游标字符串"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps([sort_key, value, key], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def _scalar_types(sort_column):
+    """排序列取值在 JSON 中允许的类型；表达式（如全文相关度）无法推断时接受任意数字或字符串"""
+    try:
+        python_type = sort_column.type.python_type
+    except NotImplementedError:
+        return (int, float, str)
+    if python_type is datetime:
+        return (str,)
+    if python_type is int:
+        return (int,)
+    if python_type in (float, Decimal):
+        return (int, float)
+    if python_type is str:
+        return (str,)
+    return (int, float, str)
+
+def _is_instance(value, types):
+    # bool 是 int 的子类，JSON 中的 true / false 不能当作整数
+    return isinstance(value, types) and not isinstance(value, bool)
+
+def decode_cursor(cursor, sort_key, sort_column, key_type=int):
+    """解析游标，返回 (排序列取值, 主键)
+
+    排序列取值按列类型、主键按 key_type 校验，被篡改成对象或数组的游标报 InvalidCursor，不会进入 SQL。
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_sort_key, value, key = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError):
+        raise InvalidCursor('游标格式无效')
+    if cursor_sort_key != sort_key:
+        raise InvalidCursor('游标与当前排序方式不匹配')
+    if not _is_instance(key, key_type):
+        raise InvalidCursor('游标格式无效')
+    if value is not None:
+        if not _is_instance(value, _scalar_types(sort_column)):
+            raise InvalidCursor('游标格式无效')
+        if isinstance(sort_column.type, db.DateTime):
+            try:
+                value = datetime.fromisoformat(value)
+            except (ValueError, TypeError):
+                raise InvalidCursor('游标格式无效')
+    return value, key
+
+def after_cursor(sort_column, key_column, descending, value, key):
+    """生成“位于游标之后”的条件；MySQL 升序时 NULL 在前、降序时 NULL 在后"""
+    if descending:
+        if value is None:
+            return and_(sort_column.is_(None), key_column < key)
+        return or_(
+            sort_column < value,
+            sort_column.is_(None),
+            and_(sort_column == value, key_column < key)
+        )
+    if value is None:
+        return or_(
+            and_(sort_column.is_(None), key_column > key),
+            sort_column.isnot(None)
+        )
+    return or_(sort_column > value, and_(sort_column == value, key_column > key))
+
+def _count(query, mode):
+    """统计总数：exact 精确 COUNT；approx 对无过滤条件的 MySQL 表读取 information_schema 估算值"""
+    if mode == 'approx' and query.whereclause is None and db.session.get_bind().dialect.name == 'mysql':
+        table = query.column_descriptions[0]['entity'].__tablename__
+        estimate = db.session.execute(text(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+        ), {'table': table}).scalar()
+        if estimate is not None:
+            return int(estimate)
+    return query.order_by(None).count()
+
+def paginate_list(query, sort_key, sort_column, key_column, descending, extend):
+    """按请求参数选择分页方式并执行查询，返回 (rows, 分页元信息)
+
+    - 传入 cursor 参数（首页可为空字符串）时使用游标分页：按 (排序列, 主键) 定位，
+      不做 OFFSET，默认不统计总数，响应中返回 next_cursor；
+    - 否则沿用 page 页码分页，默认返回精确总数。
+    total 参数可取 exact / approx / none。extend 用于给数据页追加关联列。
+    游标模式下数据页额外选出 _cursor_value / _cursor_key 两列用于生成 next_cursor，
+    排序列可以是任意表达式（如全文相关度），也不要求结果行首是 ORM 实体。
+    """
+    per_page = get_per_page()
+    cursor = request.args.get('cursor')
+    total_mode = request.args.get('total', 'none' if cursor is not None else 'exact')
+    if total_mode not in ['exact', 'approx', 'none']:
+        total_mode = 'exact'
+
+    if descending:
+        ordered = query.order_by(sort_column.desc(), key_column.desc())
+    else:
+        ordered = query.order_by(sort_column, key_column)
+
+    meta = {'per_page': per_page}
+    if total_mode != 'none':
+        meta['total'] = _count(query, total_mode)
+
+    if cursor is not None:
+        if cursor:
+            value, key = decode_cursor(cursor, sort_key, sort_column)
+            ordered = ordered.filter(after_cursor(sort_column, key_column, descending, value, key))
+        rows = extend(ordered).add_columns(
+            sort_column.label('_cursor_value'), key_column.label('_cursor_key')
+        ).limit(per_page + 1).all()
+        next_cursor = None
+        if len(rows) > per_page:
+            rows = rows[:per_page]
+            last = rows[-1]
+            next_cursor = encode_cursor(sort_key, last._cursor_value, last._cursor_key)
+        meta['next_cursor'] = next_cursor
+        return rows, meta
+
+    page = max(request.args.get('page', 1, type=int), 1)
+    rows = extend(ordered).limit(per_page).offset((page - 1) * per_page).all()
+    meta['page'] = page
+    if 'total' in meta:
+        meta['pages'] = (meta['total'] + per_page - 1) // per_page
+    return rows, meta
@@ -0,0 +1,128 @@
+from sqlalchemy import func, or_
+from app.models import Species, Genes, Proteins, Publications, Experimental_Data
+
+# 列表类接口共用的查询片段。既可作用于 Query（Flask 同步接口），也可作用于 select()（异步接口），
+# 过滤函数从传入的 args（request.args 或 Starlette 的 query_params）读取参数，不依赖 Flask 请求上下文。
+
+def int_arg(args, name):
+    """读取整数参数，缺失或非法时返回 None"""
+    try:
+        return int(args.get(name))
+    except (TypeError, ValueError):
+        return None
+
+# 列表接口的计数读取冗余计数列（见 app/counters.py），关联名称用外连接在同一条 SELECT 中取出，
+# 避免逐行访问 gene.proteins.count()、len(gene.publications)、gene.species 造成 N+1。
+# 每个列表接口的查询预算（不含 API 密钥校验）：COUNT 1 条 + 数据页 1 条，与每页条数无关；
+# 游标分页默认不做 COUNT，只需数据页 1 条。
+def species_rows(query):
+    """物种查询追加基因数量列"""
+    return query.add_columns(Species.gene_count)
+
+def gene_rows(query):
+    """基因查询追加物种名称、蛋白质数量、文献数量列"""
+    return query.outerjoin(Species, Genes.species_id == Species.species_id).add_columns(
+        Species.scientific_name.label('species_name'),
+        Genes.protein_count,
+        Genes.publication_count
+    )
+
+def protein_rows(query):
+    """蛋白质查询追加基因名称与序列长度列（序列为 ASCII，LENGTH 即字符数，序列本身不出库）"""
+    return query.outerjoin(Genes, Proteins.gene_id == Genes.gene_id).add_columns(
+        Genes.gene_name.label('gene_name'),
+        func.coalesce(func.length(Proteins.amino_acid_sequence), 0).label('sequence_length')
+    )
+
+def publication_rows(query):
+    """文献查询追加基因数量列"""
+    return query.add_columns(Publications.gene_count)
+
+def experiment_rows(query):
+    """实验数据查询追加基因名称、文献标题列"""
+    return query.outerjoin(
+        Genes, Experimental_Data.gene_id == Genes.gene_id
+    ).outerjoin(
+        Publications, Experimental_Data.publication_id == Publications.publication_id
+    ).add_columns(
+        Genes.gene_name.label('gene_name'),
+        Publications.title.label('publication_title')
+    )
+
+def filter_species(query, args):
+    """按请求参数过滤物种查询（列表与导出接口共用）"""
+    name_filter = args.get('name')
+    if name_filter:
+        query = query.filter(
+            or_(
+                Species.scientific_name.contains(name_filter),
+                Species.common_name.contains(name_filter)
+            )
+        )
+    return query
+
+def filter_genes(query, args):
+    """按请求参数过滤基因查询（列表与导出接口共用）"""
+    name_filter = args.get('name')
+    if name_filter:
+        query = query.filter(
+            or_(
+                Genes.gene_name.contains(name_filter),
+                Genes.gene_symbol.contains(name_filter)
+            )
+        )
+    
+    species_id = int_arg(args, 'species_id')
+    if species_id:
+        query = query.filter(Genes.species_id == species_id)
+    return query
+
+def filter_proteins(query, args):
+    """按请求参数过滤蛋白质查询（列表与导出接口共用）"""
+    name_filter = args.get('name')
+    if name_filter:
+        query = query.filter(
+            or_(
+                Proteins.protein_name.contains(name_filter),
+                Proteins.uniprot_id.contains(name_filter)
+            )
+        )
+    
+    gene_id = int_arg(args, 'gene_id')
+    if gene_id:
+        query = query.filter(Proteins.gene_id == gene_id)
+    return query
+
+def filter_publications(query, args):
+    """按请求参数过滤文献查询（列表与导出接口共用）"""
+    title_filter = args.get('title')
+    if title_filter:
+        query = query.filter(Publications.title.contains(title_filter))
+    
+    author_filter = args.get('author')
+    if author_filter:
+        query = query.filter(Publications.authors.contains(author_filter))
+    
+    year_filter = int_arg(args, 'year')
+    if year_filter:
+        query = query.filter(Publications.publication_year == year_filter)
+    
+    journal_filter = args.get('journal')
+    if journal_filter:
+        query = query.filter(Publications.journal.contains(journal_filter))
+    return query
+
+def filter_experiments(query, args):
+    """按请求参数过滤实验数据查询（列表与导出接口共用）"""
+    type_filter = args.get('type')
+    if type_filter:
+        query = query.filter(Experimental_Data.experiment_type.contains(type_filter))
+    
+    gene_id = int_arg(args, 'gene_id')
+    if gene_id:
+        query = query.filter(Experimental_Data.gene_id == gene_id)
+    
+    publication_id = int_arg(args, 'publication_id')
+    if publication_id:
+        query = query.filter(Experimental_Data.publication_id == publication_id)
+    return query
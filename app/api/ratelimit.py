@@ -0,0 +1,181 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+# API 准入控制：每个 API 密钥一个令牌桶（限制平均速率与突发量）加一个并发请求上限。
+# 档位由调用方信息决定：订阅类型为 premium 的读者使用 premium 档，其余用户使用 standard 档。
+# 后端：memory 为进程内；disk 为本机 SQLite 文件，多个 worker 共享同一份桶与并发计数。
+
+DEFAULT_LIMITS = {
+    'standard': {'rate': 5.0, 'burst': 20, 'concurrency': 4},
+    'premium': {'rate': 20.0, 'burst': 60, 'concurrency': 16}
+}
+
+# 并发租约的最长持有时间（秒）：worker 异常退出时未释放的名额到期自动回收
+LEASE_TTL = 300
+
+class Admission:
+    """一次准入判定；allowed 为 False 时 retry_after 为建议等待秒数"""
+
+    def __init__(self, allowed, limits, remaining=0, retry_after=0, release=None):
+        self.allowed = allowed
+        self.limits = limits
+        self.remaining = remaining
+        self.retry_after = retry_after
+        self._release = release
+
+    def release(self):
+        if self._release is not None:
+            release, self._release = self._release, None
+            release()
+
+def _refill(tokens, updated, now, limits):
+    return min(float(limits['burst']), tokens + (now - updated) * limits['rate'])
+
+class MemoryStore:
+    """进程内后端"""
+
+    def __init__(self):
+        self._buckets = {}   # key -> (令牌数, 更新时间)
+        self._inflight = {}  # key -> 进行中的请求数
+        self._lock = threading.Lock()
+
+    def admit(self, key, limits, cost):
+        now = time.monotonic()
+        with self._lock:
+            if self._inflight.get(key, 0) >= limits['concurrency']:
+                return Admission(False, limits, retry_after=1)
+            tokens, updated = self._buckets.get(key, (float(limits['burst']), now))
+            tokens = _refill(tokens, updated, now, limits)
+            if tokens < cost:
+                self._buckets[key] = (tokens, now)
+                return Admission(False, limits, retry_after=(cost - tokens) / limits['rate'])
+            self._buckets[key] = (tokens - cost, now)
+            self._inflight[key] = self._inflight.get(key, 0) + 1
+        return Admission(True, limits, remaining=int(tokens - cost), release=lambda: self._release(key))
+
+    def _release(self, key):
+        with self._lock:
+            count = self._inflight.get(key, 0) - 1
+            if count > 0:
+                self._inflight[key] = count
+            else:
+                self._inflight.pop(key, None)
+
+class DiskStore:
+    """基于 SQLite 文件的共享后端；并发名额以带过期时间的租约记录，进程崩溃不会永久占用"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn().executescript('''
+            CREATE TABLE IF NOT EXISTS buckets (
+                key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS leases (
+                lease TEXT PRIMARY KEY, key TEXT NOT NULL, expires REAL NOT NULL);
+            CREATE INDEX IF NOT EXISTS idx_leases_key ON leases(key, expires);
+        ''')
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def admit(self, key, limits, cost):
+        conn = self._conn()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM leases WHERE key = ? AND expires <= ?', (key, now))
+            inflight = conn.execute('SELECT COUNT(*) FROM leases WHERE key = ?', (key,)).fetchone()[0]
+            if inflight >= limits['concurrency']:
+                conn.execute('COMMIT')
+                return Admission(False, limits, retry_after=1)
+            row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+            tokens = _refill(*row, now, limits) if row else float(limits['burst'])
+            if tokens < cost:
+                conn.execute('INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                             (key, tokens, now))
+                conn.execute('COMMIT')
+                return Admission(False, limits, retry_after=(cost - tokens) / limits['rate'])
+            lease = uuid.uuid4().hex
+            conn.execute('INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                         (key, tokens - cost, now))
+            conn.execute('INSERT INTO leases (lease, key, expires) VALUES (?, ?, ?)',
+                         (lease, key, now + LEASE_TTL))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return Admission(True, limits, remaining=int(tokens - cost), release=lambda: self._release(lease))
+
+    def _release(self, lease):
+        self._conn().execute('DELETE FROM leases WHERE lease = ?', (lease,))
+
+class RateLimiter:
+    """API 准入控制，后端由 API_RATE_LIMIT_BACKEND 选择：memory / disk / none"""
+
+    def __init__(self):
+        self.store = None
+        self.limits = DEFAULT_LIMITS
+        self.costs = {}
+        self.rejected = 0
+
+    def init_app(self, app):
+        self.configure(app.config, app.instance_path)
+
+    def configure(self, config, instance_path):
+        """config 为 dict 风格的配置；异步服务没有 Flask 应用，直接传入配置"""
+        backend = config.get('API_RATE_LIMIT_BACKEND', 'memory')
+        self.limits = {**DEFAULT_LIMITS, **(config.get('API_RATE_LIMITS') or {})}
+        self.costs = config.get('API_RATE_LIMIT_COSTS') or {}
+        if backend == 'memory':
+            self.store = MemoryStore()
+        elif backend == 'disk':
+            path = config.get('API_RATE_LIMIT_PATH') or os.path.join(instance_path, 'api_ratelimit.sqlite')
+            self.store = DiskStore(path)
+        else:
+            self.store = None
+
+    def tier(self, principal):
+        return 'premium' if principal.subscription_type == 'premium' else 'standard'
+
+    def admit(self, principal, endpoint=None):
+        """判定本次请求能否进入；允许时调用方必须在请求结束后调用 admission.release()"""
+        if self.store is None:
+            return Admission(True, None)
+        limits = self.limits[self.tier(principal)]
+        admission = self.store.admit(f'user:{principal.user_id}', limits, self.costs.get(endpoint, 1))
+        if not admission.allowed:
+            self.rejected += 1
+        return admission
+
+    def stats(self):
+        return {
+            'backend': type(self.store).__name__ if self.store else None,
+            'limits': self.limits,
+            'rejected': self.rejected
+        }
+
+def rate_limit_headers(admission):
+    """限流相关响应头；拒绝时附带 Retry-After（向上取整的秒数）"""
+    if admission.limits is None:
+        return {}
+    headers = {
+        'X-RateLimit-Limit': str(admission.limits['burst']),
+        'X-RateLimit-Remaining': str(max(admission.remaining, 0))
+    }
+    if not admission.allowed:
+        headers['Retry-After'] = str(max(1, int(admission.retry_after + 0.999)))
+    return headers
+
+rate_limiter = RateLimiter()
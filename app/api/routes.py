@@ -1,10 +1,43 @@
-from flask import jsonify, request, current_app, abort
+from flask import jsonify, request, current_app, abort, g, Response, stream_with_context, make_response
 from flask_login import current_user
 from app import db
 from app.api import bp
-from app.models import Species, Genes, Proteins, Publications, Experimental_Data, Gene_Publications, Users
-from sqlalchemy import or_, func
+from app.models import Species, Genes, Proteins, Publications, Experimental_Data, Gene_Publications, Users, Readers
+from app.api.queries import (species_rows, gene_rows, protein_rows, publication_rows, experiment_rows,
+                             filter_species, filter_genes, filter_proteins, filter_publications,
+                             filter_experiments)
+from app.api.pagination import paginate_list, get_per_page, InvalidCursor, encode_cursor, decode_cursor
+from app.search import search
+from app.fulltext import publication_fulltext
+from app.trigram import name_index
+from app.suggest import suggest_index, SUGGEST_CATEGORIES
+from app.api.export import snapshot_rows, ndjson_response, stream_response
+from app.api.bulk import validate, check_references, insert_rows, last_key, report_inserted
+from app.changes import CHANGE_ENTITIES, Position, read_changes, load_data, position_of, retention_horizon
+from app.regions import parse_region, overlapping_genes, upstream_genes, downstream_genes
+from app.annotate import gene_intervals, annotate_lines, header
+from app.api.motif import motif_index, normalize_motif
+from app.api.similarity import similarity_index, METRICS
+from app.api.align import alignment_service, SCHEMES
+from app.api.sequences import (SEQUENCE_SOURCES, describe, plan, restrict, output_length,
+                               read_pieces, read_batches, fasta_header, wrap, reverse_complement)
+from app.api.keycache import api_key_cache, ApiPrincipal, MISSING
+from app.api.ratelimit import rate_limiter, rate_limit_headers
+from app.api.cache import response_cache, ALL_TAGS
+from app.api.conditional import (Conditional, species_state, gene_state, protein_state,
+                                 publication_state, experiment_state)
+from app.api.serializers import (json_response, compress_response, SPECIES_ITEM, SPECIES_DETAIL,
+                                 GENE_ITEM, GENE_DETAIL, PROTEIN_ITEM, PROTEIN_DETAIL, PUBLICATION_ITEM,
+                                 PUBLICATION_DETAIL, EXPERIMENT_ITEM, EXPERIMENT_DETAIL, GENE_REGION_ITEM)
+from sqlalchemy import or_, func, select
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import undefer, joinedload, selectinload
+import gzip
+import io
 import json
+import time
+from datetime import datetime, timedelta, timezone
+from itertools import chain
 
 # API密钥验证装饰器
 def require_api_key(view_function):
@@ -13,121 +46,151 @@ def require_api_key(view_function):
         if not api_key:
             return jsonify({'error': '缺少API密钥'}), 401
         
-        # 验证API密钥
-        user = Users.query.filter_by(api_key=api_key, is_active=True).first()
-        if not user:
+        # 验证API密钥：先查进程内缓存，未命中再查库并回填（无效密钥也缓存）
+        principal = api_key_cache.get(api_key)
+        if principal is MISSING:
+            row = db.session.query(
+                Users.user_id, Users.username, Users.user_type, Readers.subscription_type
+            ).outerjoin(Readers, Readers.user_id == Users.user_id).filter(
+                Users.api_key == api_key, Users.is_active.is_(True)
+            ).first()
+            principal = ApiPrincipal(*row) if row else None
+            api_key_cache.set(api_key, principal)
+        if principal is None:
             return jsonify({'error': 'API密钥无效或已禁用'}), 401
+        g.api_principal = principal
         
-        return view_function(*args, **kwargs)
+        # 准入控制：令牌桶 + 并发上限，超限返回 429 与 Retry-After
+        admission = rate_limiter.admit(principal, request.endpoint)
+        if not admission.allowed:
+            return jsonify({'error': '请求过于频繁，请稍后重试'}), 429, rate_limit_headers(admission)
+        try:
+            response = make_response(view_function(*args, **kwargs))
+        except BaseException:
+            admission.release()
+            raise
+        # 并发名额在响应发送完毕后归还，流式响应在整个传输期间都计入并发
+        response.call_on_close(admission.release)
+        response.headers.extend(rate_limit_headers(admission))
+        return response
     
     # 重命名装饰器的名称，以便Flask正确处理
     decorated_function.__name__ = view_function.__name__
     return decorated_function
 
-# API状态检查端点
+def _select(serializer, extend):
+    """列表与批量查询：追加关联列后只选序列化规格中的列，结果为元组，不构造 ORM 实例"""
+    return lambda query: serializer.select(extend(query))
+
+def requested_fields():
+    """解析 fields 参数（逗号分隔的字段名），未指定时返回 None 表示输出全部字段"""
+    fields = request.args.get('fields')
+    if not fields:
+        return None
+    return {name.strip() for name in fields.split(',') if name.strip()}
+
+def project(item, fields):
+    """按 fields 裁剪输出字段"""
+    if fields is None:
+        return item
+    return {key: value for key, value in item.items() if key in fields}
+
+def _wants(name, fields, flag):
+    """可选字段：显式传入 include_* 参数，或在 fields 中点名时输出"""
+    return bool(request.args.get(flag, type=bool)) or (fields is not None and name in fields)
+
+bp.after_request(compress_response)
+
+@bp.errorhandler(InvalidCursor)
+def handle_invalid_cursor(e):
+    return jsonify({'error': str(e)}), 400
+
+# API状态检查端点：公开接口只返回在线状态
 @bp.route('/status')
 def api_status():
-    return jsonify({
+    return json_response({
         'status': 'online',
         'version': '1.0.0',
         'database': 'GenoBase'
     })
 
+# 运行统计：限流、缓存、各索引与比对缓存的内部状态，仅管理员的 API 密钥可见
+@bp.route('/status/details')
+@require_api_key
+def api_status_details():
+    if g.api_principal.user_type != 'manager':
+        return jsonify({'error': '只有管理员可以查看运行统计'}), 403
+    return json_response({
+        'api_key_cache': api_key_cache.stats(),
+        'rate_limiter': rate_limiter.stats(),
+        'response_cache': response_cache.stats(),
+        'name_index': name_index.stats(),
+        'suggest_index': suggest_index.stats(),
+        'gene_intervals': gene_intervals.stats(),
+        'motif_index': motif_index.stats(),
+        'similarity_index': similarity_index.stats(),
+        'alignment': alignment_service.stats()
+    })
+
 # 物种相关API
 @bp.route('/species')
 @require_api_key
+@response_cache.cached('Species', 'Genes')
 def get_species_list():
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 10, type=int)
-    
-    species_query = Species.query.order_by(Species.scientific_name)
-    
-    # 过滤条件
-    name_filter = request.args.get('name')
-    if name_filter:
-        species_query = species_query.filter(
-            or_(
-                Species.scientific_name.contains(name_filter),
-                Species.common_name.contains(name_filter)
-            )
-        )
-    
-    # 执行分页查询
-    species_paginated = species_query.paginate(
-        page=page, per_page=per_page, error_out=False)
+    fields = requested_fields()
+    species_query = filter_species(Species.query, request.args)
+
+    # 执行分页查询（查询预算：2 条）
+    rows, meta = paginate_list(species_query, 'scientific_name', Species.scientific_name,
+                               Species.species_id, False, _select(SPECIES_ITEM, species_rows))
     
     # 格式化响应
     result = {
-        'items': [{
-            'species_id': sp.species_id,
-            'scientific_name': sp.scientific_name,
-            'common_name': sp.common_name,
-            'taxonomy_id': sp.taxonomy_id,
-            'gene_count': sp.genes.count()
-        } for sp in species_paginated.items],
-        'total': species_paginated.total,
-        'page': page,
-        'per_page': per_page,
-        'pages': species_paginated.pages
+        'items': [project(item, fields) for item in SPECIES_ITEM.rows(rows)],
+        **meta
     }
     
-    return jsonify(result)
+    return json_response(result)
 
 @bp.route('/species/<int:id>')
 @require_api_key
 def get_species(id):
-    species = Species.query.get_or_404(id)
+    fields = requested_fields()
     
-    # 获取关联的基因数量
-    gene_count = species.genes.count()
+    # 条件请求：资源未变化时只执行一条时间戳查询即返回 304
+    cond = Conditional(species_state(id))
+    if cond.not_modified():
+        return cond.respond()
     
-    # 格式化响应
-    result = {
-        'species_id': species.species_id,
-        'scientific_name': species.scientific_name,
-        'common_name': species.common_name,
-        'taxonomy_id': species.taxonomy_id,
-        'description': species.description,
-        'gene_count': gene_count,
-        'created_at': species.created_at.isoformat(),
-        'updated_at': species.updated_at.isoformat()
-    }
+    # 展开项在查询前规划好，基因列表随物种一起批量加载
+    include_genes = request.args.get('include_genes', type=bool)
+    species_query = Species.query
+    if include_genes:
+        species_query = species_query.options(selectinload(Species.gene_list))
+    species = species_query.filter(Species.species_id == id).first_or_404()
+    
+    # 格式化响应（基因数量读冗余计数列）
+    result = SPECIES_DETAIL.dump(species, gene_count=species.gene_count)
     
     # 可选：包含基因列表
-    include_genes = request.args.get('include_genes', type=bool)
     if include_genes:
         result['genes'] = [{
             'gene_id': gene.gene_id,
             'gene_name': gene.gene_name,
             'gene_symbol': gene.gene_symbol,
             'chromosome': gene.chromosome
-        } for gene in species.genes.all()]
+        } for gene in species.gene_list]
     
-    return jsonify(result)
+    return cond.respond(json_response(project(result, fields)))
 
 # 基因相关API
 @bp.route('/genes')
 @require_api_key
+@response_cache.cached('Genes', 'Species', 'Proteins', 'Gene_Publications')
 def get_genes_list():
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 10, type=int)
-    
-    genes_query = Genes.query
-    
-    # 过滤条件
-    name_filter = request.args.get('name')
-    if name_filter:
-        genes_query = genes_query.filter(
-            or_(
-                Genes.gene_name.contains(name_filter),
-                Genes.gene_symbol.contains(name_filter)
-            )
-        )
-    
-    species_id = request.args.get('species_id', type=int)
-    if species_id:
-        genes_query = genes_query.filter(Genes.species_id == species_id)
-    
+    fields = requested_fields()
+    genes_query = filter_genes(Genes.query, request.args)
+
     # 排序
     sort_by = request.args.get('sort_by', 'gene_name')
     if sort_by not in ['gene_id', 'gene_name', 'gene_symbol', 'created_at']:
@@ -137,71 +200,61 @@ def get_genes_list():
     if sort_order not in ['asc', 'desc']:
         sort_order = 'asc'
     
-    if sort_order == 'asc':
-        genes_query = genes_query.order_by(getattr(Genes, sort_by))
-    else:
-        genes_query = genes_query.order_by(getattr(Genes, sort_by).desc())
-    
-    # 执行分页查询
-    genes_paginated = genes_query.paginate(
-        page=page, per_page=per_page, error_out=False)
+    # 执行分页查询（查询预算：2 条）
+    rows, meta = paginate_list(genes_query, f'{sort_by}:{sort_order}', getattr(Genes, sort_by),
+                               Genes.gene_id, sort_order == 'desc', _select(GENE_ITEM, gene_rows))
     
     # 格式化响应
     result = {
-        'items': [{
-            'gene_id': gene.gene_id,
-            'gene_name': gene.gene_name,
-            'gene_symbol': gene.gene_symbol,
-            'chromosome': gene.chromosome,
-            'species_id': gene.species_id,
-            'species_name': gene.species.scientific_name if gene.species else None,
-            'protein_count': gene.proteins.count(),
-            'publication_count': len(gene.publications)
-        } for gene in genes_paginated.items],
-        'total': genes_paginated.total,
-        'page': page,
-        'per_page': per_page,
-        'pages': genes_paginated.pages
+        'items': [project(item, fields) for item in GENE_ITEM.rows(rows)],
+        **meta
     }
     
-    return jsonify(result)
+    return json_response(result)
 
 @bp.route('/genes/<int:id>')
 @require_api_key
 def get_gene(id):
-    gene = Genes.query.get_or_404(id)
+    fields = requested_fields()
+    
+    # 条件请求：资源未变化时只执行一条时间戳查询即返回 304
+    cond = Conditional(gene_state(id))
+    if cond.not_modified():
+        return cond.respond()
+    
+    # 展开项在查询前规划好：物种随主查询 JOIN 取出，各关联列表各用一条 IN 查询批量加载
+    # 序列列为延迟加载，只有请求序列时才随主查询一起取出
+    include_sequence = _wants('sequence', fields, 'include_sequence')
+    include_proteins = request.args.get('include_proteins', type=bool)
+    include_publications = request.args.get('include_publications', type=bool)
+    include_experiments = request.args.get('include_experiments', type=bool)
+    options = [joinedload(Genes.species)]
+    if include_sequence:
+        options.append(undefer(Genes.sequence))
+    if include_proteins:
+        options.append(selectinload(Genes.protein_list))
+    if include_publications:
+        options.append(selectinload(Genes.publications))
+    if include_experiments:
+        options.append(selectinload(Genes.experiment_list))
+    gene = Genes.query.options(*options).filter(Genes.gene_id == id).first_or_404()
     
     # 格式化响应
-    result = {
-        'gene_id': gene.gene_id,
-        'gene_name': gene.gene_name,
-        'gene_symbol': gene.gene_symbol,
-        'chromosome': gene.chromosome,
-        'start_position': gene.start_position,
-        'end_position': gene.end_position,
-        'strand': gene.strand,
-        'species_id': gene.species_id,
-        'species_name': gene.species.scientific_name if gene.species else None,
-        'created_at': gene.created_at.isoformat(),
-        'updated_at': gene.updated_at.isoformat()
-    }
+    result = GENE_DETAIL.dump(gene, species_name=gene.species.scientific_name if gene.species else None)
     
     # 可选：包含序列数据
-    include_sequence = request.args.get('include_sequence', type=bool)
     if include_sequence:
         result['sequence'] = gene.sequence
     
     # 可选：包含蛋白质列表
-    include_proteins = request.args.get('include_proteins', type=bool)
     if include_proteins:
         result['proteins'] = [{
             'protein_id': protein.protein_id,
             'protein_name': protein.protein_name,
             'uniprot_id': protein.uniprot_id
-        } for protein in gene.proteins.all()]
+        } for protein in gene.protein_list]
     
     # 可选：包含文献列表
-    include_publications = request.args.get('include_publications', type=bool)
     if include_publications:
         result['publications'] = [{
             'publication_id': pub.publication_id,
@@ -213,327 +266,849 @@ def get_gene(id):
         } for pub in gene.publications]
     
     # 可选：包含实验数据列表
-    include_experiments = request.args.get('include_experiments', type=bool)
     if include_experiments:
         result['experiments'] = [{
             'experiment_id': exp.experiment_id,
             'experiment_type': exp.experiment_type,
             'conditions': exp.conditions,
             'results': exp.results
-        } for exp in gene.experimental_data.all()]
+        } for exp in gene.experiment_list]
     
-    return jsonify(result)
+    return cond.respond(json_response(project(result, fields)))
+
+# 区间查询：与区间重叠的基因走分箱索引，上下游最近基因分别按终点、起点有序扫描，
+# 三条查询各自只读取返回的行附近的索引项
+@bp.route('/genes/region')
+@require_api_key
+@response_cache.cached('Genes')
+def get_genes_in_region():
+    species_id = request.args.get('species_id', type=int)
+    if species_id is None:
+        return jsonify({'error': '缺少 species_id'}), 400
+    region = request.args.get('region')
+    if region:
+        parsed = parse_region(region)
+        if parsed is None:
+            return jsonify({'error': 'region 格式应为 chr7:1,000,000-1,200,000'}), 400
+        chrom, start, end = parsed
+    else:
+        chrom = (request.args.get('chrom') or '').strip()
+        start = request.args.get('start', type=int)
+        end = request.args.get('end', type=int)
+        if not chrom or start is None or end is None:
+            return jsonify({'error': '需要 chrom、start、end 或 region 参数'}), 400
+    if start < 1 or end < start:
+        return jsonify({'error': '区间无效：要求 1 <= start <= end'}), 400
+    
+    max_neighbors = current_app.config['API_REGION_MAX_NEIGHBORS']
+    neighbors = max(0, min(request.args.get('neighbors', 3, type=int), max_neighbors))
+    max_genes = current_app.config['API_REGION_MAX_GENES']
+    columns = GENE_REGION_ITEM.columns
+    
+    # 多取一行判断是否截断
+    overlapping = overlapping_genes(columns, species_id, chrom, start, end, max_genes + 1)
+    upstream = upstream_genes(columns, species_id, chrom, start, neighbors) if neighbors else []
+    downstream = downstream_genes(columns, species_id, chrom, end, neighbors) if neighbors else []
+    
+    return json_response({
+        'species_id': species_id,
+        'chromosome': chrom,
+        'start': start,
+        'end': end,
+        'overlapping': GENE_REGION_ITEM.rows(overlapping[:max_genes]),
+        'truncated': len(overlapping) > max_genes,
+        # 距离为基因与区间之间的碱基数
+        'upstream': [GENE_REGION_ITEM.dump(row, distance=start - row.end_position) for row in upstream],
+        'downstream': [GENE_REGION_ITEM.dump(row, distance=row.start_position - end) for row in downstream]
+    })
 
 # 蛋白质相关API
 @bp.route('/proteins')
 @require_api_key
+@response_cache.cached('Proteins', 'Genes')
 def get_proteins_list():
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 10, type=int)
-    
-    proteins_query = Proteins.query
-    
-    # 过滤条件
-    name_filter = request.args.get('name')
-    if name_filter:
-        proteins_query = proteins_query.filter(
-            or_(
-                Proteins.protein_name.contains(name_filter),
-                Proteins.uniprot_id.contains(name_filter)
-            )
-        )
-    
-    gene_id = request.args.get('gene_id', type=int)
-    if gene_id:
-        proteins_query = proteins_query.filter(Proteins.gene_id == gene_id)
-    
-    # 排序
-    proteins_query = proteins_query.order_by(Proteins.protein_name)
-    
-    # 执行分页查询
-    proteins_paginated = proteins_query.paginate(
-        page=page, per_page=per_page, error_out=False)
+    fields = requested_fields()
+    proteins_query = filter_proteins(Proteins.query, request.args)
+
+    # 执行分页查询（查询预算：2 条），按蛋白质名称排序
+    rows, meta = paginate_list(proteins_query, 'protein_name', Proteins.protein_name,
+                               Proteins.protein_id, False, _select(PROTEIN_ITEM, protein_rows))
     
     # 格式化响应
     result = {
-        'items': [{
-            'protein_id': protein.protein_id,
-            'protein_name': protein.protein_name,
-            'uniprot_id': protein.uniprot_id,
-            'gene_id': protein.gene_id,
-            'gene_name': protein.gene.gene_name if protein.gene else None,
-            'sequence_length': len(protein.amino_acid_sequence) if protein.amino_acid_sequence else 0
-        } for protein in proteins_paginated.items],
-        'total': proteins_paginated.total,
-        'page': page,
-        'per_page': per_page,
-        'pages': proteins_paginated.pages
+        'items': [project(item, fields) for item in PROTEIN_ITEM.rows(rows)],
+        **meta
     }
     
-    return jsonify(result)
+    return json_response(result)
 
 @bp.route('/proteins/<int:id>')
 @require_api_key
 def get_protein(id):
-    protein = Proteins.query.get_or_404(id)
+    fields = requested_fields()
+    
+    # 条件请求：资源未变化时只执行一条时间戳查询即返回 304
+    cond = Conditional(protein_state(id))
+    if cond.not_modified():
+        return cond.respond()
+    
+    # 序列列为延迟加载，只有请求序列时才随主查询一起取出
+    include_sequence = _wants('amino_acid_sequence', fields, 'include_sequence')
+    protein_query = Proteins.query.options(joinedload(Proteins.gene))
+    if include_sequence:
+        protein_query = protein_query.options(undefer(Proteins.amino_acid_sequence))
+    protein = protein_query.filter(Proteins.protein_id == id).first_or_404()
     
     # 格式化响应
-    result = {
-        'protein_id': protein.protein_id,
-        'protein_name': protein.protein_name,
-        'uniprot_id': protein.uniprot_id,
-        'gene_id': protein.gene_id,
-        'gene_name': protein.gene.gene_name if protein.gene else None,
-        'gene_symbol': protein.gene.gene_symbol if protein.gene else None,
-        'created_at': protein.created_at.isoformat(),
-        'updated_at': protein.updated_at.isoformat()
-    }
+    result = PROTEIN_DETAIL.dump(
+        protein,
+        gene_name=protein.gene.gene_name if protein.gene else None,
+        gene_symbol=protein.gene.gene_symbol if protein.gene else None
+    )
     
     # 可选：包含序列数据
-    include_sequence = request.args.get('include_sequence', type=bool)
     if include_sequence:
         result['amino_acid_sequence'] = protein.amino_acid_sequence
     
-    return jsonify(result)
+    return cond.respond(json_response(project(result, fields)))
 
 # 文献相关API
 @bp.route('/publications')
 @require_api_key
+@response_cache.cached('Publications', 'Gene_Publications')
 def get_publications_list():
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 10, type=int)
-    
-    pub_query = Publications.query
-    
-    # 过滤条件
-    title_filter = request.args.get('title')
-    if title_filter:
-        pub_query = pub_query.filter(Publications.title.contains(title_filter))
-    
-    author_filter = request.args.get('author')
-    if author_filter:
-        pub_query = pub_query.filter(Publications.authors.contains(author_filter))
-    
-    year_filter = request.args.get('year', type=int)
-    if year_filter:
-        pub_query = pub_query.filter(Publications.publication_year == year_filter)
-    
-    journal_filter = request.args.get('journal')
-    if journal_filter:
-        pub_query = pub_query.filter(Publications.journal.contains(journal_filter))
-    
-    # 排序
-    pub_query = pub_query.order_by(Publications.publication_year.desc())
-    
-    # 执行分页查询
-    pub_paginated = pub_query.paginate(
-        page=page, per_page=per_page, error_out=False)
+    fields = requested_fields()
+    pub_query = filter_publications(Publications.query, request.args)
+
+    # 全文检索：q 走全文索引并按相关度倒序，mode 可取 natural / boolean
+    text_query = request.args.get('q')
+    if text_query:
+        mode = request.args.get('mode', 'natural')
+        condition, relevance = publication_fulltext(text_query, mode)
+        pub_query = pub_query.filter(condition)
+        # 游标绑定检索词，换了检索词的旧游标会被拒绝
+        rows, meta = paginate_list(
+            pub_query, f'relevance:{mode}:{text_query}', relevance, Publications.publication_id, True,
+            _select(PUBLICATION_ITEM,
+                    lambda query: publication_rows(query).add_columns(relevance.label('relevance'))))
+    else:
+        # 执行分页查询（查询预算：2 条），按发表年份倒序
+        rows, meta = paginate_list(pub_query, 'publication_year:desc', Publications.publication_year,
+                                   Publications.publication_id, True, _select(PUBLICATION_ITEM, publication_rows))
     
     # 格式化响应
     result = {
-        'items': [{
-            'publication_id': pub.publication_id,
-            'title': pub.title,
-            'authors': pub.authors,
-            'journal': pub.journal,
-            'publication_year': pub.publication_year,
-            'doi': pub.doi,
-            'gene_count': len(pub.genes)
-        } for pub in pub_paginated.items],
-        'total': pub_paginated.total,
-        'page': page,
-        'per_page': per_page,
-        'pages': pub_paginated.pages
+        'items': [project(item, fields) for item in PUBLICATION_ITEM.rows(rows)],
+        **meta
     }
     
-    return jsonify(result)
+    return json_response(result)
 
 @bp.route('/publications/<int:id>')
 @require_api_key
 def get_publication(id):
-    publication = Publications.query.get_or_404(id)
+    fields = requested_fields()
+    
+    # 条件请求：资源未变化时只执行一条时间戳查询即返回 304
+    cond = Conditional(publication_state(id))
+    if cond.not_modified():
+        return cond.respond()
+    
+    # 展开项在查询前规划好：关联基因及其物种批量加载，不再逐个基因查询物种
+    include_genes = request.args.get('include_genes', type=bool)
+    include_experiments = request.args.get('include_experiments', type=bool)
+    options = []
+    if include_genes:
+        options.append(selectinload(Publications.gene_list).joinedload(Genes.species))
+    if include_experiments:
+        options.append(selectinload(Publications.experiment_list))
+    publication = Publications.query.options(*options).filter(Publications.publication_id == id).first_or_404()
     
     # 格式化响应
-    result = {
-        'publication_id': publication.publication_id,
-        'title': publication.title,
-        'authors': publication.authors,
-        'journal': publication.journal,
-        'publication_year': publication.publication_year,
-        'doi': publication.doi,
-        'created_at': publication.created_at.isoformat(),
-        'updated_at': publication.updated_at.isoformat()
-    }
+    result = PUBLICATION_DETAIL.dump(publication)
     
     # 可选：包含关联的基因
-    include_genes = request.args.get('include_genes', type=bool)
     if include_genes:
         result['genes'] = [{
             'gene_id': gene.gene_id,
             'gene_name': gene.gene_name,
             'gene_symbol': gene.gene_symbol,
             'species_name': gene.species.scientific_name if gene.species else None
-        } for gene in publication.genes]
+        } for gene in publication.gene_list]
     
     # 可选：包含实验数据
-    include_experiments = request.args.get('include_experiments', type=bool)
     if include_experiments:
         result['experiments'] = [{
             'experiment_id': exp.experiment_id,
             'experiment_type': exp.experiment_type,
             'conditions': exp.conditions,
             'results': exp.results
-        } for exp in publication.experimental_data.all()]
+        } for exp in publication.experiment_list]
     
-    return jsonify(result)
+    return cond.respond(json_response(project(result, fields)))
 
 # 实验数据相关API
 @bp.route('/experiments')
 @require_api_key
+@response_cache.cached('Experimental_Data', 'Genes', 'Publications')
 def get_experiments_list():
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 10, type=int)
-    
-    exp_query = Experimental_Data.query
-    
-    # 过滤条件
-    type_filter = request.args.get('type')
-    if type_filter:
-        exp_query = exp_query.filter(Experimental_Data.experiment_type.contains(type_filter))
-    
-    gene_id = request.args.get('gene_id', type=int)
-    if gene_id:
-        exp_query = exp_query.filter(Experimental_Data.gene_id == gene_id)
-    
-    publication_id = request.args.get('publication_id', type=int)
-    if publication_id:
-        exp_query = exp_query.filter(Experimental_Data.publication_id == publication_id)
-    
-    # 排序
-    exp_query = exp_query.order_by(Experimental_Data.created_at.desc())
-    
-    # 执行分页查询
-    exp_paginated = exp_query.paginate(
-        page=page, per_page=per_page, error_out=False)
+    fields = requested_fields()
+    exp_query = filter_experiments(Experimental_Data.query, request.args)
+
+    # 执行分页查询（查询预算：2 条），按创建时间倒序
+    rows, meta = paginate_list(exp_query, 'created_at:desc', Experimental_Data.created_at,
+                               Experimental_Data.experiment_id, True, _select(EXPERIMENT_ITEM, experiment_rows))
     
     # 格式化响应
     result = {
-        'items': [{
-            'experiment_id': exp.experiment_id,
-            'experiment_type': exp.experiment_type,
-            'gene_id': exp.gene_id,
-            'gene_name': exp.gene.gene_name if exp.gene else None,
-            'publication_id': exp.publication_id,
-            'publication_title': exp.publication.title if exp.publication else None
-        } for exp in exp_paginated.items],
-        'total': exp_paginated.total,
-        'page': page,
-        'per_page': per_page,
-        'pages': exp_paginated.pages
+        'items': [project(item, fields) for item in EXPERIMENT_ITEM.rows(rows)],
+        **meta
     }
     
-    return jsonify(result)
+    return json_response(result)
 
 @bp.route('/experiments/<int:id>')
 @require_api_key
 def get_experiment(id):
-    experiment = Experimental_Data.query.get_or_404(id)
+    fields = requested_fields()
+    
+    # 条件请求：资源未变化时只执行一条时间戳查询即返回 304
+    cond = Conditional(experiment_state(id))
+    if cond.not_modified():
+        return cond.respond()
+    
+    experiment = Experimental_Data.query.options(
+        joinedload(Experimental_Data.gene), joinedload(Experimental_Data.publication)
+    ).filter(Experimental_Data.experiment_id == id).first_or_404()
     
     # 格式化响应
+    result = EXPERIMENT_DETAIL.dump(
+        experiment,
+        gene_name=experiment.gene.gene_name if experiment.gene else None,
+        gene_symbol=experiment.gene.gene_symbol if experiment.gene else None,
+        publication_title=experiment.publication.title if experiment.publication else None
+    )
+    
+    return cond.respond(json_response(project(result, fields)))
+
+# 批量查询API：实体 -> (模型, 追加关联列函数, 序列化器, {查询键: 列})
+# 自然键分别走 idx_genes_symbol / idx_proteins_uniprot / idx_publications_doi
+BATCH_ENTITIES = {
+    'genes': (Genes, gene_rows, GENE_ITEM,
+              {'id': Genes.gene_id, 'gene_symbol': Genes.gene_symbol}),
+    'proteins': (Proteins, protein_rows, PROTEIN_ITEM,
+                 {'id': Proteins.protein_id, 'uniprot_id': Proteins.uniprot_id}),
+    'publications': (Publications, publication_rows, PUBLICATION_ITEM,
+                     {'id': Publications.publication_id, 'doi': Publications.doi})
+}
+
+@bp.route('/<any(genes, proteins, publications):entity>/batch', methods=['POST'])
+@require_api_key
+def batch_lookup(entity):
+    model, extend, serializer, keys = BATCH_ENTITIES[entity]
+    fields = requested_fields()
+    data = request.get_json(silent=True) or {}
+    
+    key_name = data.get('by', 'id')
+    if key_name not in keys:
+        return jsonify({'error': f'不支持的查询键：{key_name}，可选：{", ".join(keys)}'}), 400
+    
+    values = data.get('values')
+    if not isinstance(values, list) or not values:
+        return jsonify({'error': 'values 必须是非空数组'}), 400
+    max_keys = current_app.config['API_BATCH_MAX_KEYS']
+    if len(values) > max_keys:
+        return jsonify({'error': f'单次最多查询 {max_keys} 个键'}), 400
+    
+    # 规范化并去重（保持输入顺序）
+    try:
+        if key_name == 'id':
+            values = [int(v) for v in values]
+        else:
+            values = [str(v).strip() for v in values]
+    except (TypeError, ValueError):
+        return jsonify({'error': 'id 必须为整数'}), 400
+    values = list(dict.fromkeys(v for v in values if v != ''))
+    
+    # 分块执行 IN (...) 查询，每块一条 SQL
+    key_column = keys[key_name]
+    chunk_size = current_app.config['API_BATCH_CHUNK_SIZE']
+    matches = {}
+    for i in range(0, len(values), chunk_size):
+        chunk = values[i:i + chunk_size]
+        rows = _select(serializer, extend)(model.query.filter(key_column.in_(chunk))).all()
+        for item in serializer.rows(rows):
+            matches.setdefault(_match_key(item[key_column.key]), []).append(item)
+    
+    # 自然键可能不唯一，按输入顺序输出全部匹配
+    items = []
+    not_found = []
+    for value in values:
+        if _match_key(value) in matches:
+            items.extend(_with_key(project(item, fields), value)
+                         for item in matches[_match_key(value)])
+        else:
+            not_found.append(value)
+    
+    return json_response({
+        'by': key_name,
+        'total': len(items),
+        'items': items,
+        'not_found': not_found
+    })
+
+def _match_key(value):
+    """自然键按大小写不敏感比较，与 MySQL 默认排序规则一致"""
+    return value.lower() if isinstance(value, str) else value
+
+def _with_key(item, value):
+    """在批量查询结果中标注对应的查询键（同一行可能被大小写不同的多个键命中，复制后再标注）"""
+    return {**item, 'key': value}
+
+# 批量写入API：仅创建者与管理员可用
+# mode=atomic（默认）时任一行出错则整批不写入；mode=partial 时写入通过的行并报告出错的行
+@bp.route('/<any(genes, proteins, experiments):entity>/bulk', methods=['POST'])
+@require_api_key
+def bulk_insert(entity):
+    if g.api_principal.user_type not in ('creator', 'manager'):
+        return jsonify({'error': '只有创建者和管理员可以写入数据'}), 403
+    data = request.get_json(silent=True)
+    items = data.get('items') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'items 必须是非空数组'}), 400
+    max_rows = current_app.config['API_BULK_MAX_ROWS']
+    if len(items) > max_rows:
+        return jsonify({'error': f'单次最多写入 {max_rows} 行'}), 400
+    mode = data.get('mode', 'atomic')
+    if mode not in ('atomic', 'partial'):
+        return jsonify({'error': 'mode 只能取 atomic / partial'}), 400
+    chunk_size = current_app.config['API_BULK_CHUNK_SIZE']
+    
+    # 字段校验在内存中完成；外键存在性每块一条 IN 查询
+    checked = validate(entity, items)
+    rows, errors = check_references(db.session, entity, checked.rows, chunk_size)
+    errors = checked.errors + errors
+    
+    inserted = 0
+    if not (errors and mode == 'atomic'):
+        try:
+            after_key = last_key(db.session, entity)
+            inserted, insert_errors = insert_rows(db.session, entity, rows, chunk_size)
+            errors += insert_errors
+            # 新行补报给写入追踪，提交后名称索引与补全索引增量更新
+            if inserted and not (errors and mode == 'atomic'):
+                report_inserted(db.session, entity, after_key)
+        except Exception:
+            db.session.rollback()
+            raise
+    if errors and mode == 'atomic':
+        db.session.rollback()
+        inserted = 0
+    elif inserted:
+        db.session.commit()
+    
     result = {
-        'experiment_id': experiment.experiment_id,
-        'experiment_type': experiment.experiment_type,
-        'conditions': experiment.conditions,
-        'results': experiment.results,
-        'gene_id': experiment.gene_id,
-        'gene_name': experiment.gene.gene_name if experiment.gene else None,
-        'gene_symbol': experiment.gene.gene_symbol if experiment.gene else None,
-        'publication_id': experiment.publication_id,
-        'publication_title': experiment.publication.title if experiment.publication else None,
-        'created_at': experiment.created_at.isoformat(),
-        'updated_at': experiment.updated_at.isoformat()
+        'mode': mode,
+        'received': len(items),
+        'inserted': inserted,
+        'errors': sorted(errors, key=lambda error: error['index'])
     }
-    
-    return jsonify(result)
+    if errors and mode == 'atomic':
+        return json_response(result, 422)
+    return json_response(result, 201 if inserted else 200)
+
+# 增量变更流：按 (变更时间, 来源, 主键) 顺序返回新增/修改（upsert）与删除（delete）
+# 首次同步不带参数或带 since=ISO时间，之后每次带上一页的 next_cursor，只拉取增量
+@bp.route('/changes')
+@require_api_key
+def get_changes():
+    entities = request.args.get('entities')
+    entities = [name.strip() for name in entities.split(',') if name.strip()] if entities else list(CHANGE_ENTITIES)
+    unknown = [name for name in entities if name not in CHANGE_ENTITIES]
+    if unknown or not entities:
+        return jsonify({'error': f'entities 可选：{", ".join(CHANGE_ENTITIES)}'}), 400
+    max_limit = current_app.config['API_CHANGES_MAX_LIMIT']
+    limit = max(1, min(request.args.get('limit', 100, type=int), max_limit))
+    include_data = request.args.get('include_data', '1').lower() not in ('0', 'false', 'no')
+    
+    settle_seconds = current_app.config['CHANGES_SETTLE_SECONDS']
+    cursor = request.args.get('cursor')
+    since = request.args.get('since')
+    position = None
+    # synced_at：此刻之后的删除都尚未送达（首次同步的时间、since 或上次追上时的时间），随游标传递
+    cutoff = datetime.utcnow() - timedelta(seconds=settle_seconds)
+    synced_at = cutoff
+    if cursor:
+        value, key = decode_cursor(cursor, 'changes', Species.updated_at, key_type=list)
+        if value is None or not (len(key) in (2, 3) and all(type(part) is int for part in key)):
+            raise InvalidCursor('游标格式无效')
+        position = Position(value, *key[:2])
+        # 旧格式的游标没有 synced_at，只按位置判断
+        synced_at = datetime.fromtimestamp(key[2], timezone.utc).replace(tzinfo=None) if len(key) == 3 else value
+    elif since:
+        try:
+            since = datetime.fromisoformat(since)
+        except ValueError:
+            return jsonify({'error': 'since 必须是 ISO 8601 时间'}), 400
+        # 库中时间为不带时区的 UTC；来源序号 -1 排在所有来源之前，即包含 since 时刻本身的变更
+        if since.tzinfo is not None:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        position = Position(since, -1, 0)
+        synced_at = since
+    
+    # 尚未送达的删除都在 max(位置, synced_at) 之后；早于保留期的墓碑可能已被清理，只能全量重新同步
+    horizon = retention_horizon(current_app.config['CHANGES_TOMBSTONE_RETENTION_DAYS'])
+    if horizon is not None and position is not None and max(position.changed_at, synced_at) < horizon:
+        return jsonify({'error': '游标早于墓碑保留期，部分删除已无法送达，请不带游标全量重新同步'}), 410
+    
+    rows, has_more = read_changes(entities, position, limit, settle_seconds)
+    data = load_data(rows) if include_data else {}
+    
+    items = []
+    for row in rows:
+        item = {'entity': row.entity, 'id': row.id, 'op': row.op, 'changed_at': row.changed_at}
+        if include_data and row.op == 'upsert':
+            # 读取期间已被删除的行跳过，其墓碑会出现在后面的页中
+            if (row.entity, row.id) not in data:
+                continue
+            item['data'] = data[(row.entity, row.id)]
+        items.append(item)
+    
+    # 没有新变更时返回原游标，客户端下次仍从同一位置继续
+    if rows:
+        position = position_of(rows[-1])
+    if not has_more:
+        # 已追上：cutoff 之前的删除都已送达
+        synced_at = max(synced_at, cutoff)
+    synced = int(synced_at.replace(tzinfo=timezone.utc).timestamp())
+    next_cursor = encode_cursor('changes', position.changed_at,
+                                [position.source, position.key, synced]) if position else None
+    return json_response({
+        'items': items,
+        'next_cursor': next_cursor,
+        'has_more': has_more
+    })
+
+# BED 批量注释：请求体为 BED 文本（可用 Content-Encoding: gzip 压缩上传），逐块注释后流式返回
+# 每行追加重叠基因数、基因 ID 与符号；nearest=1 时无重叠的行再追加最近基因及距离
+@bp.route('/annotate', methods=['POST'])
+@require_api_key
+def annotate_bed():
+    species_id = request.args.get('species_id', type=int)
+    if species_id is None:
+        return jsonify({'error': '缺少 species_id'}), 400
+    if db.session.get(Species, species_id) is None:
+        return jsonify({'error': '物种不存在'}), 404
+    nearest = request.args.get('nearest', '0').lower() in ('1', 'true', 'yes')
+    
+    # 索引在开始输出前载入，物种基因数变化后自动重建
+    index = gene_intervals.get(db.session, species_id)
+    stream = request.stream
+    if request.content_encoding == 'gzip':
+        stream = gzip.GzipFile(fileobj=stream)
+    lines = io.TextIOWrapper(stream, encoding='utf-8', errors='replace')
+    chunk_rows = current_app.config['ANNOTATE_CHUNK_ROWS']
+    
+    output = chain([header(nearest)], annotate_lines(index, lines, chunk_rows, nearest))
+    return stream_response((line + '\n' for line in output), 'text/plain', f'annotated_{species_id}.bed')
+
+# 批量导出API：实体 -> (模型, 过滤函数, 追加关联列函数, 主键)
+EXPORT_ENTITIES = {
+    'species': (Species, filter_species, species_rows, Species.species_id),
+    'genes': (Genes, filter_genes, gene_rows, Genes.gene_id),
+    'proteins': (Proteins, filter_proteins, protein_rows, Proteins.protein_id),
+    'publications': (Publications, filter_publications, publication_rows, Publications.publication_id),
+    'experiments': (Experimental_Data, filter_experiments, experiment_rows, Experimental_Data.experiment_id)
+}
+
+@bp.route('/export/<entity>')
+@require_api_key
+def export_entity(entity):
+    if entity not in EXPORT_ENTITIES:
+        return jsonify({'error': f'不支持导出的类型：{entity}'}), 404
+    model, filter_query, extend, key_column = EXPORT_ENTITIES[entity]
+    fields = requested_fields()
+    
+    # 导出默认包含序列等延迟加载列，fields 未点名时不取
+    deferred = [attr.class_attribute for attr in sa_inspect(model).column_attrs
+                if attr.deferred and (fields is None or attr.key in fields)]
+    
+    # 过滤条件与列表接口一致，按主键顺序输出
+    def build_query(session):
+        query = filter_query(session.query(model), request.args).options(*[undefer(attr) for attr in deferred])
+        return extend(query).order_by(key_column)
+    
+    return ndjson_response(snapshot_rows(build_query), f'{entity}.ndjson', fields)
+
+# 序列下载API
+def _sequence_args():
+    """解析序列下载参数，返回 (format, start, end, strand) 或错误信息"""
+    output = request.args.get('format', 'fasta')
+    if output not in ['fasta', 'raw']:
+        return None, '不支持的格式，可选：fasta, raw'
+    start = request.args.get('start', type=int)
+    end = request.args.get('end', type=int)
+    if (start is not None and start < 1) or (end is not None and end < 1) \
+            or (start and end and start > end):
+        return None, 'start / end 为从 1 开始的闭区间，且 start 不能大于 end'
+    strand = request.args.get('strand', 'auto')
+    if strand not in ['auto', 'forward', 'reverse']:
+        return None, 'strand 可选：auto, forward, reverse'
+    return (output, start, end, strand), None
+
+def _sequence_mimetype(output):
+    return 'text/x-fasta' if output == 'fasta' else 'text/plain'
+
+@bp.route('/<any(genes, proteins):entity>/<int:id>/sequence')
+@require_api_key
+def get_sequence(entity, id):
+    source = SEQUENCE_SOURCES[entity]
+    args, error = _sequence_args()
+    if error:
+        return jsonify({'error': error}), 400
+    output, start, end, strand = args
+    
+    row = describe(source, [id]).get(id)
+    if row is None:
+        abort(404)
+    item = plan(row, start, end, strand)
+    length = output_length(item)
+    width = current_app.config['FASTA_LINE_WIDTH']
+    
+    # 纯文本格式支持 HTTP Range（针对输出序列的字节偏移），只读取对应片段
+    status = 200
+    content_range = None
+    if output == 'raw' and request.range is not None:
+        bounds = request.range.range_for_length(length)
+        if bounds is None:
+            response = Response(status=416)
+            response.headers['Content-Range'] = f'bytes */{length}'
+            return response
+        item = restrict(item, *bounds)
+        status = 206
+        content_range = f'bytes {bounds[0]}-{bounds[1] - 1}/{length}'
+    
+    pieces = read_pieces(source, item)
+    if output == 'fasta':
+        body = chain([fasta_header(source, item)], wrap(pieces, width))
+    else:
+        body = pieces
+    
+    response = Response(stream_with_context(body), status=status, mimetype=_sequence_mimetype(output))
+    if output == 'raw':
+        response.headers['Accept-Ranges'] = 'bytes'
+        response.headers['Content-Length'] = str(output_length(item))
+    if content_range:
+        response.headers['Content-Range'] = content_range
+    response.headers['Content-Disposition'] = \
+        f'inline; filename={source.label}_{id}.{"fasta" if output == "fasta" else "txt"}'
+    return response
+
+@bp.route('/<any(genes, proteins):entity>/sequences', methods=['GET', 'POST'])
+@require_api_key
+def get_sequences(entity):
+    """多条序列合并为一个 FASTA 文件流式输出：GET ?ids=1,2,3 或 POST {"ids": [...]}"""
+    source = SEQUENCE_SOURCES[entity]
+    args, error = _sequence_args()
+    if error:
+        return jsonify({'error': error}), 400
+    _, start, end, strand = args
+    
+    if request.method == 'POST':
+        ids = (request.get_json(silent=True) or {}).get('ids')
+    else:
+        ids = [v for v in request.args.get('ids', '').split(',') if v.strip()]
+    try:
+        ids = list(dict.fromkeys(int(v) for v in ids or []))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'ids 必须为整数'}), 400
+    if not ids:
+        return jsonify({'error': 'ids 不能为空'}), 400
+    max_keys = current_app.config['API_BATCH_MAX_KEYS']
+    if len(ids) > max_keys:
+        return jsonify({'error': f'单次最多下载 {max_keys} 条序列'}), 400
+    
+    # 元信息分块查询，按输入顺序输出，不存在的主键跳过
+    chunk_size = current_app.config['API_BATCH_CHUNK_SIZE']
+    rows = {}
+    for i in range(0, len(ids), chunk_size):
+        rows.update(describe(source, ids[i:i + chunk_size]))
+    items = [plan(rows[id], start, end, strand) for id in ids if id in rows]
+    width = current_app.config['FASTA_LINE_WIDTH']
+    
+    def generate():
+        for item, pieces in read_batches(source, items):
+            yield fasta_header(source, item)
+            yield from wrap(pieces, width)
+    
+    response = Response(stream_with_context(generate()), mimetype='text/x-fasta')
+    response.headers['Content-Disposition'] = f'attachment; filename={entity}.fasta'
+    not_found = [str(id) for id in ids if id not in rows]
+    if not_found:
+        response.headers['X-Not-Found'] = ','.join(not_found)
+    return response
+
+# 基序搜索：在全部基因序列的正反两条链上精确查找 motif（FM 索引，计数耗时只与基序长度有关）
+# 偏移为存储序列上的 0 起始位置；负链命中表示反向互补序列出现在该位置
+@bp.route('/sequences/search')
+@require_api_key
+def search_motif():
+    min_length = current_app.config['MOTIF_MIN_LENGTH']
+    motif = normalize_motif(request.args.get('motif'))
+    if motif is None:
+        return jsonify({'error': 'motif 只能包含 A、C、G、T（U）、N'}), 400
+    if len(motif) < min_length:
+        return jsonify({'error': f'motif 长度至少为 {min_length}'}), 400
+    max_hits = current_app.config['API_MOTIF_MAX_HITS']
+    
+    result = motif_index.search(db.session, motif, max_hits)
+    if result is None:
+        return jsonify({'error': '基序索引尚未构建，请运行 python scripts/build_motif_index.py'}), 503
+    
+    # 按基因分组输出
+    genes = {}
+    for gene_id, offset, strand in result['hits']:
+        item = genes.setdefault(gene_id, {'gene_id': gene_id, 'forward': [], 'reverse': []})
+        item['forward' if strand == '+' else 'reverse'].append(offset)
+    return json_response({
+        'motif': motif,
+        'reverse_complement': reverse_complement(motif),
+        'total': sum(result['counts'].values()),
+        'counts': {'forward': result['counts']['+'], 'reverse': result['counts'].get('-', 0)},
+        'items': list(genes.values()),
+        'truncated': result['truncated'],
+        'index': result['index']
+    })
+
+def _items_by_id(entity, ids):
+    """按主键一条 IN 查询取回列表项，返回 {主键: 列表项}；已删除的记录不在其中"""
+    if not ids:
+        return {}
+    model, extend, serializer, keys = BATCH_ENTITIES[entity]
+    key_column = keys['id']
+    rows = _select(serializer, extend)(model.query.filter(key_column.in_(ids))).all()
+    return {item[key_column.key]: item for item in serializer.rows(rows)}
+
+# k-mer 相似度搜索：按已有记录（排除自身）或任意序列查找 k-mer 组成最相近的基因 / 蛋白质
+def _similar_response(entity, sequence, exclude=None):
+    metric = request.args.get('metric', 'cosine')
+    if metric not in METRICS:
+        return jsonify({'error': f'metric 可选：{", ".join(METRICS)}'}), 400
+    max_limit = current_app.config['API_SIMILAR_MAX_LIMIT']
+    limit = max(1, min(request.args.get('limit', 10, type=int), max_limit))
+    
+    index, hits = similarity_index.search(db.session, entity, sequence, metric, limit, exclude)
+    if index is None:
+        return jsonify({'error': '相似度索引尚未构建，请运行 python scripts/build_similarity_index.py'}), 503
+    
+    # 侧索引读取之后才删除的记录不再返回
+    found = _items_by_id(entity, [key for key, _ in hits])
+    return json_response({
+        'metric': metric,
+        'k': index.pop('k'),
+        'items': [{**found[key], 'similarity': round(score, 6)} for key, score in hits if key in found],
+        'index': index
+    })
+
+@bp.route('/<any(genes, proteins):entity>/<int:id>/similar')
+@require_api_key
+def similar_to_entity(entity, id):
+    source = SEQUENCE_SOURCES[entity]
+    row = db.session.execute(select(source.column).where(source.key_column == id)).first()
+    if row is None:
+        abort(404)
+    return _similar_response(entity, row[0], exclude=id)
+
+@bp.route('/<any(genes, proteins):entity>/similar', methods=['POST'])
+@require_api_key
+def similar_to_sequence(entity):
+    sequence = (request.get_json(silent=True) or {}).get('sequence')
+    if not isinstance(sequence, str) or not sequence.strip():
+        return jsonify({'error': 'sequence 必须是非空字符串'}), 400
+    return _similar_response(entity, ''.join(sequence.split()))
+
+# 局部比对：查询序列与候选集逐一做 Smith-Waterman 比对，按得分排序
+# 候选集为 ids 指定的记录，或 k-mer 相似度预筛选的前 candidates 条；species_id 限定物种（预筛选只在该物种内进行）
+# 相似度索引尚未构建时，只有指定物种且其序列不超过 candidates 条（即比对全部）才能进行，否则返回 503
+@bp.route('/align', methods=['POST'])
+@require_api_key
+def align_sequences():
+    data = request.get_json(silent=True) or {}
+    entity = data.get('entity', 'proteins')
+    if entity not in SCHEMES:
+        return jsonify({'error': f'entity 可选：{", ".join(SCHEMES)}'}), 400
+    sequence = data.get('sequence')
+    if not isinstance(sequence, str) or not sequence.strip():
+        return jsonify({'error': 'sequence 必须是非空字符串'}), 400
+    sequence = ''.join(sequence.split()).upper()
+    max_query = current_app.config['ALIGN_MAX_QUERY_LENGTH']
+    if len(sequence) > max_query:
+        return jsonify({'error': f'查询序列长度不能超过 {max_query}'}), 400
+    max_candidates = current_app.config['ALIGN_MAX_CANDIDATES']
+    try:
+        limit = max(1, min(int(data.get('limit', 20)), max_candidates))
+        candidates = max(1, min(int(data.get('candidates', 100)), max_candidates))
+        species_id = int(data['species_id']) if data.get('species_id') is not None else None
+        ids = [int(v) for v in data['ids']] if data.get('ids') is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'limit、candidates、species_id、ids 必须为整数'}), 400
+    
+    source = SEQUENCE_SOURCES[entity]
+    conditions = []
+    if species_id is not None:
+        conditions.append(Genes.species_id == species_id)
+    if ids is not None:
+        if len(ids) > max_candidates:
+            return jsonify({'error': f'ids 最多 {max_candidates} 个'}), 400
+        conditions.append(source.key_column.in_(ids))
+    else:
+        keys = None
+        if species_id is not None:
+            # 先限定物种再取前 candidates 条，避免全局候选中该物种所剩无几
+            keys = select(source.key_column).where(Genes.species_id == species_id, source.column.isnot(None))
+            if entity == 'proteins':
+                keys = keys.join(Genes, Genes.gene_id == Proteins.gene_id)
+            keys = db.session.execute(keys).scalars().all()
+        index, hits = similarity_index.search(db.session, entity, sequence, 'cosine', candidates, keys=keys)
+        if index is not None:
+            conditions.append(source.key_column.in_([key for key, _ in hits]))
+        elif species_id is None:
+            return jsonify({'error': '未指定 ids，且相似度索引尚未构建，无法确定候选集；'
+                                     '请指定 ids 或运行 python scripts/build_similarity_index.py'}), 503
+        elif len(keys) > candidates:
+            # 没有索引时无从挑选最相近的候选，只有该物种的序列不超过 candidates 条时才逐一比对全部
+            return jsonify({'error': f'相似度索引尚未构建，该物种有 {len(keys)} 条序列，超过 candidates；'
+                                     '请指定 ids 或运行 python scripts/build_similarity_index.py'}), 503
+    
+    query = select(source.key_column, source.column).where(source.column.isnot(None), *conditions)
+    if entity == 'proteins' and species_id is not None:
+        query = query.join(Genes, Genes.gene_id == Proteins.gene_id)
+    targets = db.session.execute(query.order_by(source.key_column).limit(max_candidates)).all()
+    # 基因同时比对两条链
+    cells = len(sequence) * sum(len(target) for _, target in targets) * (2 if entity == 'genes' else 1)
+    max_cells = current_app.config['ALIGN_MAX_CELLS']
+    if cells > max_cells:
+        return jsonify({'error': f'计算量 {cells} 超过上限 {max_cells}，请缩小候选集或缩短查询序列'}), 400
+    
+    started = time.perf_counter()
+    alignments = alignment_service.align(entity, sequence, targets)
+    strands = {}
+    if entity == 'genes':
+        # 核酸同时比对反向互补序列，每个候选取得分较高的一条链
+        for alignment in alignment_service.align(entity, reverse_complement(sequence), targets):
+            strands[alignment.target] = alignment
+        alignments = sorted((max(item, strands[item.target], key=lambda a: a.score) for item in alignments),
+                            key=lambda a: -a.score)
+    elapsed = time.perf_counter() - started
+    
+    alignments = [item for item in alignments if item.score > 0][:limit]
+    found = _items_by_id(entity, [item.target for item in alignments])
+    lengths = {key: len(target) for key, target in targets}
+    items = []
+    for item in alignments:
+        if item.target not in found:
+            continue
+        result = {**found[item.target], 'score': item.score, 'query_end': item.query_end,
+                  'target_end': item.target_end, 'target_length': lengths[item.target]}
+        if entity == 'genes':
+            # 负链时 query_end 为反向互补查询序列上的位置
+            result['strand'] = '-' if strands[item.target] is item else '+'
+        items.append(result)
+    return json_response({
+        'entity': entity,
+        'query_length': len(sequence),
+        'candidates': len(targets),
+        'items': items,
+        'cells': cells,
+        'elapsed_ms': round(elapsed * 1000, 1),
+        # 每秒单元更新数；缓存命中时偏高
+        'cups': round(cells / elapsed) if elapsed else None
+    })
 
 # 高级搜索API
+def _search_item(result):
+    """搜索结果项，字段与各类别原有输出保持一致，另附相关度"""
+    obj = result['data']
+    if result['type'] == 'gene':
+        item = {
+            'id': obj.gene_id,
+            'name': obj.gene_name,
+            'symbol': obj.gene_symbol,
+            'species': obj.species.scientific_name if obj.species else None
+        }
+    elif result['type'] == 'protein':
+        item = {
+            'id': obj.protein_id,
+            'name': obj.protein_name,
+            'uniprot_id': obj.uniprot_id,
+            'gene': obj.gene.gene_name if obj.gene else None
+        }
+    elif result['type'] == 'species':
+        item = {
+            'id': obj.species_id,
+            'scientific_name': obj.scientific_name,
+            'common_name': obj.common_name,
+            'taxonomy_id': obj.taxonomy_id
+        }
+    else:
+        item = {
+            'id': obj.publication_id,
+            'title': obj.title,
+            'authors': obj.authors,
+            'journal': obj.journal,
+            'year': obj.publication_year
+        }
+    return {'type': result['type'], 'score': result['score'], **item}
+
 @bp.route('/search')
 @require_api_key
+@response_cache.cached(*ALL_TAGS)
 def search_api():
     query = request.args.get('q', '')
     if not query:
         return jsonify({'error': '搜索词为空'}), 400
     
     category = request.args.get('category', 'all')
-    results = []
-    
-    if category == 'gene' or category == 'all':
-        genes = Genes.query.filter(
-            or_(
-                Genes.gene_name.contains(query),
-                Genes.gene_symbol.contains(query)
-            )
-        ).all()
-        results.extend([{
-            'type': 'gene',
-            'id': gene.gene_id,
-            'name': gene.gene_name,
-            'symbol': gene.gene_symbol,
-            'species': gene.species.scientific_name if gene.species else None
-        } for gene in genes])
-    
-    if category == 'protein' or category == 'all':
-        proteins = Proteins.query.filter(
-            or_(
-                Proteins.protein_name.contains(query),
-                Proteins.uniprot_id.contains(query)
-            )
-        ).all()
-        results.extend([{
-            'type': 'protein',
-            'id': protein.protein_id,
-            'name': protein.protein_name,
-            'uniprot_id': protein.uniprot_id,
-            'gene': protein.gene.gene_name if protein.gene else None
-        } for protein in proteins])
-    
-    if category == 'species' or category == 'all':
-        species = Species.query.filter(
-            or_(
-                Species.scientific_name.contains(query),
-                Species.common_name.contains(query),
-                Species.taxonomy_id.contains(query)
-            )
-        ).all()
-        results.extend([{
-            'type': 'species',
-            'id': sp.species_id,
-            'scientific_name': sp.scientific_name,
-            'common_name': sp.common_name,
-            'taxonomy_id': sp.taxonomy_id
-        } for sp in species])
-    
-    if category == 'publication' or category == 'all':
-        publications = Publications.query.filter(
-            or_(
-                Publications.title.contains(query),
-                Publications.authors.contains(query),
-                Publications.journal.contains(query),
-                Publications.doi.contains(query)
-            )
-        ).all()
-        results.extend([{
-            'type': 'publication',
-            'id': pub.publication_id,
-            'title': pub.title,
-            'authors': pub.authors,
-            'journal': pub.journal,
-            'year': pub.publication_year
-        } for pub in publications])
+    page = request.args.get('page', 1, type=int)
+    
+    # 每个类别参与排序的条数上限
+    max_limit = current_app.config['SEARCH_CATEGORY_LIMIT']
+    category_limit = max(1, min(request.args.get('limit', max_limit, type=int), max_limit))
+    
+    found = search(query, category, page=page, per_page=get_per_page(), category_limit=category_limit)
+    fields = requested_fields()
     
-    return jsonify({
+    return json_response({
         'query': query,
         'category': category,
-        'total': len(results),
-        'results': results
-    }) 
\ No newline at end of file
+        'total': found['total'],
+        'counts': found['counts'],
+        'page': found['page'],
+        'per_page': found['per_page'],
+        'pages': found['pages'],
+        'category_limit': category_limit,
+        'results': [project(_search_item(result), fields) for result in found['results']]
+    })
+
+# 输入提示：不需要 API 密钥，前台搜索框直接调用；补全走内存有序数组，不访问数据库
+@bp.route('/suggest')
+def suggest_api():
+    query = request.args.get('q', '')
+    category = request.args.get('category', 'all')
+    if category == 'publication':
+        category = 'journal'  # 搜索表单中的“文献”类别补全期刊名
+    if category == 'all':
+        categories = SUGGEST_CATEGORIES
+    elif category in SUGGEST_CATEGORIES:
+        categories = [category]
+    else:
+        return jsonify({'error': f'不支持的类别: {category}'}), 400
+    
+    max_limit = current_app.config['SUGGEST_MAX_LIMIT']
+    limit = max(1, min(request.args.get('limit', 10, type=int), max_limit))
+    
+    return json_response({
+        'query': query,
+        'category': category,
+        'suggestions': suggest_index.suggest(db.session, query, categories, limit)
+    })
@@ -0,0 +1,134 @@
+from collections import namedtuple
+from sqlalchemy import select, func, case
+from app import db
+from app.models import Genes, Proteins
+
+# 序列下载：FASTA / 纯文本流式输出。
+# 长度与表头字段一条 SQL 取回；序列本身用 SUBSTR 按窗口分段读取，只有请求的片段离开数据库，
+# 进程内同时只持有一个窗口。负链基因默认输出反向互补序列。
+
+# 每次 SUBSTR 读取的最大字符数；多条短序列合并读取时每批的总长度上限
+SEQUENCE_WINDOW = 1024 * 1024
+
+# IUPAC 核苷酸互补（含简并碱基）
+COMPLEMENT = str.maketrans('ACGTUNRYKMSWBDHVacgtunrykmswbdhv', 'TGCAANYRMKSWVHDBtgcaanyrmkswvhdb')
+
+# 实体 -> 序列规格：label 用于 FASTA 表头，strand 为空表示无链方向
+SequenceSource = namedtuple('SequenceSource', 'label model key_column column accession name strand')
+
+SEQUENCE_SOURCES = {
+    'genes': SequenceSource('gene', Genes, Genes.gene_id, Genes.sequence,
+                            Genes.gene_symbol, Genes.gene_name, Genes.strand),
+    'proteins': SequenceSource('protein', Proteins, Proteins.protein_id, Proteins.amino_acid_sequence,
+                               Proteins.uniprot_id, Proteins.protein_name, None)
+}
+
+# 一条序列的输出计划：[first, last] 为存储序列上的 1 起始闭区间，reverse 表示输出反向互补
+SequencePlan = namedtuple('SequencePlan', 'id accession name length first last reverse')
+
+def reverse_complement(sequence):
+    return sequence.translate(COMPLEMENT)[::-1]
+
+def describe(source, ids):
+    """一条 SQL 取回各序列的长度、链方向与表头字段，返回 {主键: 行}"""
+    # 序列为 ASCII，LENGTH 即字符数
+    columns = [source.key_column, func.coalesce(func.length(source.column), 0).label('length'),
+               source.accession.label('accession'), source.name.label('name')]
+    if source.strand is not None:
+        columns.append(source.strand.label('strand'))
+    rows = db.session.execute(select(*columns).where(source.key_column.in_(ids))).all()
+    return {row[0]: row for row in rows}
+
+def plan(row, start=None, end=None, strand='auto'):
+    """根据 start / end（1 起始、闭区间，均针对存储序列）与链方向生成输出计划"""
+    length = row.length
+    first = max(start or 1, 1)
+    last = min(end or length, length)
+    reverse = strand == 'reverse' or (strand == 'auto' and row._mapping.get('strand') == '-')
+    return SequencePlan(row[0], row.accession, row.name, length, first, last, reverse)
+
+def output_length(item):
+    return max(item.last - item.first + 1, 0)
+
+def restrict(item, offset, stop):
+    """按输出序列上的 [offset, stop) 截取（HTTP Range），反向互补时映射回存储坐标"""
+    if item.reverse:
+        return item._replace(first=item.last - stop + 1, last=item.last - offset)
+    return item._replace(first=item.first + offset, last=item.first + stop - 1)
+
+def _read(source, id, first, size):
+    return db.session.execute(
+        select(func.substr(source.column, first, size)).where(source.key_column == id)
+    ).scalar() or ''
+
+def read_pieces(source, item, window=SEQUENCE_WINDOW):
+    """按输出顺序逐窗口读取一条序列；反向互补时从尾部向前读"""
+    if output_length(item) <= 0:
+        return
+    if not item.reverse:
+        position = item.first
+        while position <= item.last:
+            size = min(window, item.last - position + 1)
+            yield _read(source, item.id, position, size)
+            position += size
+    else:
+        position = item.last
+        while position >= item.first:
+            size = min(window, position - item.first + 1)
+            yield reverse_complement(_read(source, item.id, position - size + 1, size))
+            position -= size
+
+def read_batches(source, items, window=SEQUENCE_WINDOW):
+    """多条序列：短序列按总长不超过 window 合并为一条 SQL，长序列单独分窗口读取
+
+    按输入顺序产出 (计划, 片段迭代器)。
+    """
+    batch, batch_size = [], 0
+
+    def flush(batch):
+        # 每条序列的起止位置不同，用 CASE 按主键取对应片段
+        rows = db.session.execute(select(
+            source.key_column,
+            func.substr(source.column,
+                        case({item.id: item.first for item in batch}, value=source.key_column),
+                        case({item.id: output_length(item) for item in batch}, value=source.key_column))
+        ).where(source.key_column.in_([item.id for item in batch]))).all()
+        pieces = dict(rows)
+        for item in batch:
+            sequence = pieces.get(item.id) or ''
+            yield item, iter([reverse_complement(sequence) if item.reverse else sequence])
+
+    for item in items:
+        size = output_length(item)
+        if size > window:
+            if batch:
+                yield from flush(batch)
+                batch, batch_size = [], 0
+            yield item, read_pieces(source, item, window)
+            continue
+        if batch_size + size > window and batch:
+            yield from flush(batch)
+            batch, batch_size = [], 0
+        batch.append(item)
+        batch_size += size
+    if batch:
+        yield from flush(batch)
+
+def fasta_header(source, item):
+    accession = item.accession or ''
+    header = f'>{source.label}|{item.id}|{accession} {item.name or ""} range={item.first}-{item.last}'
+    if item.reverse:
+        header += ' strand=- reverse_complement'
+    return header + '\n'
+
+def wrap(pieces, width):
+    """把片段流按固定宽度折行，跨片段保留余数"""
+    carry = ''
+    for piece in pieces:
+        text = carry + piece
+        full = len(text) - len(text) % width
+        if full:
+            yield '\n'.join(text[i:i + width] for i in range(0, full, width)) + '\n'
+        carry = text[full:]
+    if carry:
+        yield carry + '\n'
@@ -0,0 +1,134 @@
+import gzip
+import json
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from operator import attrgetter
+from flask import current_app, request, Response
+
+try:
+    import orjson  # 可选依赖，安装后 JSON 编码快数倍
+except ImportError:
+    orjson = None
+
+from app.models import Species, Genes, Proteins, Publications, Experimental_Data
+
+# API 序列化层：
+# - 每个模型的输出字段在模块加载时编译成 Serializer，列表接口用 with_entities 只选这些列，
+#   结果是普通元组，不构造 ORM 实例，也不再逐行手写 dict；
+# - JSON 编码优先使用 orjson（可用 API_JSON_BACKEND 指定），datetime 直接编码为 ISO 8601；
+# - 响应体超过 API_COMPRESS_MIN_SIZE 时按 Accept-Encoding 协商 gzip / deflate 压缩。
+
+class Serializer:
+    """按字段规格预编译的序列化器
+
+    columns 为实体列；select(query) 把 (实体, 关联列...) 查询改写为只选这些列加原有关联列，
+    rows(rows) 把结果元组批量转为 dict，dump(obj) 从单个 ORM 实例按同样的字段取值。
+    以下划线开头的列（如分页游标列）只供内部使用，不输出。
+    """
+
+    def __init__(self, *columns):
+        self.columns = columns
+        self.names = tuple(column.key for column in columns)
+        self._getter = attrgetter(*self.names)
+
+    def select(self, query):
+        extras = [description['expr'] for description in query.column_descriptions[1:]]
+        if hasattr(query, 'with_entities'):
+            return query.with_entities(*self.columns, *extras)
+        # select() 语句（异步接口）
+        return query.with_only_columns(*self.columns, *extras)
+
+    def rows(self, rows):
+        if not rows:
+            return []
+        # 同一页的列名相同，只解析一次
+        names = rows[0]._fields
+        public = [i for i, name in enumerate(names) if not name.startswith('_')]
+        if len(public) == len(names):
+            return [dict(zip(names, row)) for row in rows]
+        names = [names[i] for i in public]
+        return [dict(zip(names, [row[i] for i in public])) for row in rows]
+
+    def dump(self, obj, **extra):
+        values = self._getter(obj)
+        item = dict(zip(self.names, values if len(self.names) > 1 else (values,)))
+        item.update(extra)
+        return item
+
+SPECIES_ITEM = Serializer(Species.species_id, Species.scientific_name, Species.common_name,
+                          Species.taxonomy_id)
+SPECIES_DETAIL = Serializer(*SPECIES_ITEM.columns, Species.description,
+                            Species.created_at, Species.updated_at)
+
+GENE_ITEM = Serializer(Genes.gene_id, Genes.gene_name, Genes.gene_symbol, Genes.chromosome,
+                       Genes.species_id)
+GENE_DETAIL = Serializer(Genes.gene_id, Genes.gene_name, Genes.gene_symbol, Genes.chromosome,
+                         Genes.start_position, Genes.end_position, Genes.strand, Genes.species_id,
+                         Genes.created_at, Genes.updated_at)
+GENE_REGION_ITEM = Serializer(Genes.gene_id, Genes.gene_name, Genes.gene_symbol, Genes.chromosome,
+                              Genes.start_position, Genes.end_position, Genes.strand, Genes.species_id)
+
+PROTEIN_ITEM = Serializer(Proteins.protein_id, Proteins.protein_name, Proteins.uniprot_id,
+                          Proteins.gene_id)
+PROTEIN_DETAIL = Serializer(*PROTEIN_ITEM.columns, Proteins.created_at, Proteins.updated_at)
+
+PUBLICATION_ITEM = Serializer(Publications.publication_id, Publications.title, Publications.authors,
+                              Publications.journal, Publications.publication_year, Publications.doi)
+PUBLICATION_DETAIL = Serializer(*PUBLICATION_ITEM.columns, Publications.created_at, Publications.updated_at)
+
+EXPERIMENT_ITEM = Serializer(Experimental_Data.experiment_id, Experimental_Data.experiment_type,
+                             Experimental_Data.gene_id, Experimental_Data.publication_id)
+EXPERIMENT_DETAIL = Serializer(Experimental_Data.experiment_id, Experimental_Data.experiment_type,
+                               Experimental_Data.conditions, Experimental_Data.results,
+                               Experimental_Data.gene_id, Experimental_Data.publication_id,
+                               Experimental_Data.created_at, Experimental_Data.updated_at)
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f'无法序列化类型 {type(value).__name__}')
+
+def dumps(data, backend=None):
+    """编码为 UTF-8 JSON 字节串；backend 未指定时读取当前应用的 API_JSON_BACKEND"""
+    if backend is None:
+        backend = current_app.config.get('API_JSON_BACKEND', 'auto')
+    if orjson is not None and backend in ('auto', 'orjson'):
+        return orjson.dumps(data, default=_json_default)
+    return json.dumps(data, default=_json_default, ensure_ascii=False,
+                      separators=(',', ':')).encode('utf-8')
+
+def json_response(data, status=200):
+    """替代 jsonify 的 JSON 响应"""
+    return Response(dumps(data), status=status, mimetype='application/json')
+
+# 支持的压缩编码；压缩后的响应在强 ETag 后追加 "-编码"
+COMPRESS_ENCODINGS = ('gzip', 'deflate')
+
+def compress_body(body, encoding, level):
+    """按协商出的编码压缩响应体（同步、异步接口共用）"""
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=level, mtime=0)
+    return zlib.compress(body, level)
+
+def compress_response(response):
+    """按 Accept-Encoding 协商压缩较大的响应体（蓝图 after_request 钩子）"""
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(list(COMPRESS_ENCODINGS))
+    if encoding is None:
+        return response
+    body = response.get_data()
+    if len(body) < current_app.config.get('API_COMPRESS_MIN_SIZE', 1024):
+        return response
+    response.set_data(compress_body(body, encoding, current_app.config.get('API_COMPRESS_LEVEL', 6)))
+    response.headers['Content-Encoding'] = encoding
+    # 压缩后字节不同，强 ETag 按编码区分，仍保持强 ETag
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(f'{etag}-{encoding}')
+    return response
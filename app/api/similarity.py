@@ -0,0 +1,280 @@
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import numpy as np
+from sqlalchemy import select, func
+from app.models import Genes, Proteins, Deleted_Records
+from app.api.arraystore import publish, current_version, load_array, load_meta
+
+# k-mer 相似度搜索：离线把每条序列计为 k-mer 计数向量，全部序列存成 CSR 稀疏矩阵
+# （indptr / indices / data 各一个 .npy，内存映射加载），并预存每行的范数与不同 k-mer 数。
+# 查询时把查询向量展开为稠密数组，对全部非零元一次向量化取值，再用前缀和按行求和得到点积 /
+# 交集大小，计算余弦或 Jaccard 相似度后用 argpartition 取前 k 个。
+# 行数较多时可把行区间切成若干分片交给进程池并行扫描（SIMILARITY_WORKERS），各进程自行映射文件。
+# 构建之后修改或删除的记录由“侧索引”处理：按 updated_at 与删除墓碑找出这些记录，矩阵中的旧行屏蔽掉，
+# 现有序列在查询时重新计分后合并，响应中报告变化行数，便于判断是否需要重建。
+
+# 实体 -> k-mer 规格：alphabet 之外的字符所在的 k-mer 跳过
+KmerSpec = namedtuple('KmerSpec', 'model key_column column alphabet k')
+
+KMER_SPECS = {
+    'proteins': KmerSpec(Proteins, Proteins.protein_id, Proteins.amino_acid_sequence,
+                         'ACDEFGHIKLMNPQRSTVWY', 3),
+    'genes': KmerSpec(Genes, Genes.gene_id, Genes.sequence, 'ACGT', 6)
+}
+
+METRICS = ('cosine', 'jaccard')
+
+def _codes(alphabet):
+    """字节 -> 字母表下标，其余为 -1；小写与大写相同，核酸中 U 视为 T"""
+    codes = np.full(256, -1, dtype=np.int64)
+    for i, letter in enumerate(alphabet):
+        codes[ord(letter)] = codes[ord(letter.lower())] = i
+    if alphabet == 'ACGT':
+        codes[ord('U')] = codes[ord('u')] = alphabet.index('T')
+    return codes
+
+def kmer_counts(sequence, spec, codes=None):
+    """序列的 k-mer 计数：返回 (k-mer 编号数组, 计数数组)，编号升序"""
+    codes = _codes(spec.alphabet) if codes is None else codes
+    values = codes[np.frombuffer((sequence or '').encode('ascii', 'replace'), dtype=np.uint8)]
+    k = spec.k
+    if len(values) < k:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    windows = np.lib.stride_tricks.sliding_window_view(values, k)
+    windows = windows[(windows >= 0).all(axis=1)]
+    weights = len(spec.alphabet) ** np.arange(k - 1, -1, -1, dtype=np.int64)
+    return np.unique(windows @ weights, return_counts=True)
+
+def build_index(session, entity, path, log=None):
+    """读取全部序列构建 CSR 矩阵并发布为 path 下的新版本"""
+    spec = KMER_SPECS[entity]
+    codes = _codes(spec.alphabet)
+    started = time.time()
+    # 取读取开始前的时间：此后更新的记录都会进入侧索引
+    snapshot_at = datetime.utcnow()
+    ids, indptr, index_parts, count_parts = [], [0], [], []
+    query = select(spec.key_column, spec.column).where(spec.column.isnot(None)).order_by(spec.key_column)
+    for key, sequence in session.execute(query.execution_options(yield_per=1000)):
+        kmers, counts = kmer_counts(sequence, spec, codes)
+        ids.append(key)
+        index_parts.append(kmers.astype(np.int32))
+        count_parts.append(counts.astype(np.float32))
+        indptr.append(indptr[-1] + len(kmers))
+    indices = np.concatenate(index_parts) if index_parts else np.empty(0, dtype=np.int32)
+    data = np.concatenate(count_parts) if count_parts else np.empty(0, dtype=np.float32)
+    indptr = np.array(indptr, dtype=np.int64)
+    squares = np.concatenate(([0.0], np.cumsum(data.astype(np.float64) ** 2)))
+    arrays = {
+        'ids': np.array(ids, dtype=np.int64),
+        'indptr': indptr,
+        'indices': indices,
+        'data': data,
+        'norms': np.sqrt(squares[indptr[1:]] - squares[indptr[:-1]]).astype(np.float32),
+        'sizes': np.diff(indptr)
+    }
+    meta = {'built_at': datetime.utcnow().isoformat(), 'snapshot_at': snapshot_at.isoformat(), 'entity': entity, 'k': spec.k,
+            'alphabet': spec.alphabet, 'rows': len(ids), 'nnz': int(len(indices))}
+    publish(path, arrays, meta)
+    if log:
+        log(f'{entity}: {len(ids)} 条序列，{len(indices)} 个非零元，用时 {time.time() - started:.1f}s')
+    return meta
+
+class KmerMatrix:
+    """已构建的一个版本"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.ids = load_array(directory, 'ids')
+        self.indptr = load_array(directory, 'indptr')
+        self.indices = load_array(directory, 'indices')
+        self.data = load_array(directory, 'data')
+        self.norms = load_array(directory, 'norms')
+        self.sizes = load_array(directory, 'sizes')
+        self.meta = load_meta(directory)
+        # 旧版本没有 snapshot_at，退而使用 built_at
+        self.snapshot_at = datetime.fromisoformat(self.meta.get('snapshot_at') or self.meta['built_at'])
+
+    def scores(self, start, stop, query_kmers, query_counts, metric):
+        """行 [start, stop) 与查询的相似度"""
+        lo, hi = int(self.indptr[start]), int(self.indptr[stop])
+        dense = np.zeros(len(self.meta['alphabet']) ** self.meta['k'], dtype=np.float64)
+        if metric == 'cosine':
+            dense[query_kmers] = query_counts
+            values = self.data[lo:hi] * dense[self.indices[lo:hi]]
+        else:
+            dense[query_kmers] = 1.0
+            values = dense[self.indices[lo:hi]]
+        # 前缀和之差即各行之和，空行自然为 0
+        sums = np.concatenate(([0.0], np.cumsum(values)))
+        offsets = np.asarray(self.indptr[start:stop + 1]) - lo
+        overlap = sums[offsets[1:]] - sums[offsets[:-1]]
+        if metric == 'cosine':
+            query_norm = np.sqrt(np.dot(query_counts, query_counts))
+            denominator = np.asarray(self.norms[start:stop], dtype=np.float64) * query_norm
+        else:
+            denominator = np.asarray(self.sizes[start:stop], dtype=np.float64) + len(query_kmers) - overlap
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(denominator > 0, overlap / denominator, 0.0)
+
+    def top(self, start, stop, query_kmers, query_counts, metric, limit, exclude=None, keys=None):
+        """行 [start, stop) 中相似度最高的 limit 行：返回 [(主键, 相似度)]；keys 为升序主键数组时只在其中查找"""
+        scores = self.scores(start, stop, query_kmers, query_counts, metric)
+        ids = np.asarray(self.ids[start:stop])
+        if exclude is not None:
+            scores = np.where(ids == exclude, -1.0, scores)
+        if keys is not None:
+            scores = np.where(np.isin(ids, keys, assume_unique=True), scores, -1.0)
+        if limit < len(scores):
+            candidates = np.argpartition(-scores, limit)[:limit]
+        else:
+            candidates = np.arange(len(scores))
+        candidates = candidates[scores[candidates] > 0]
+        return [(int(ids[i]), float(scores[i])) for i in candidates]
+
+def score_rows(rows, query_kmers, query_counts, metric):
+    """少量行在内存中计分：rows 为 {主键: (k-mer 编号数组, 计数数组)}，返回 [(主键, 相似度)]"""
+    scores = []
+    for key, (kmers, counts) in rows.items():
+        _, mine, theirs = np.intersect1d(kmers, query_kmers, assume_unique=True, return_indices=True)
+        if metric == 'cosine':
+            overlap = float(np.dot(counts[mine], query_counts[theirs]))
+            denominator = np.sqrt(np.dot(counts, counts)) * np.sqrt(np.dot(query_counts, query_counts))
+        else:
+            overlap = float(len(mine))
+            denominator = len(kmers) + len(query_kmers) - overlap
+        if denominator > 0 and overlap > 0:
+            scores.append((key, overlap / denominator))
+    return scores
+
+# 工作进程内按目录缓存已映射的矩阵
+_worker_matrices = {}
+
+def _scan_shard(directory, start, stop, query_kmers, query_counts, metric, limit, exclude, keys):
+    matrix = _worker_matrices.get(directory)
+    if matrix is None:
+        matrix = _worker_matrices[directory] = KmerMatrix(directory)
+    return matrix.top(start, stop, query_kmers, query_counts, metric, limit, exclude, keys)
+
+class SimilarityIndex:
+    """各实体的 k-mer 矩阵；current 指向新版本后自动切换"""
+
+    def __init__(self):
+        self.path = None
+        self.workers = 0
+        self.shard_rows = 200000
+        self._matrices = {}  # 实体 -> (版本, KmerMatrix)
+        # 实体 -> (KmerMatrix, 签名, {主键: (k-mer 编号, 计数)}, 已删除的主键集合)
+        self._sides = {}
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.path = app.config.get('SIMILARITY_INDEX_PATH') or os.path.join(app.instance_path, 'similarity_index')
+        self.workers = app.config.get('SIMILARITY_WORKERS', self.workers)
+        self.shard_rows = app.config.get('SIMILARITY_SHARD_ROWS', self.shard_rows)
+
+    def entity_path(self, entity):
+        return os.path.join(self.path, entity)
+
+    def matrix(self, entity):
+        """当前版本的矩阵，尚未构建时返回 None"""
+        version = current_version(self.entity_path(entity))
+        if version is None:
+            return None
+        with self._lock:
+            cached = self._matrices.get(entity)
+            if cached is None or cached[0] != version:
+                matrix = KmerMatrix(os.path.join(self.entity_path(entity), version))
+                cached = self._matrices[entity] = (version, matrix)
+            return cached[1]
+
+    def _side_index(self, session, entity, matrix):
+        """构建之后变化的记录：签名（行数、最后更新时间、墓碑数）变化时重新读取并计数"""
+        spec = KMER_SPECS[entity]
+        updated_at = spec.model.updated_at
+        snapshot_at = matrix.snapshot_at
+        signature = tuple(session.execute(select(
+            func.count(spec.key_column), func.max(updated_at)
+        ).where(updated_at > snapshot_at)).one()) + (session.execute(select(
+            func.count(Deleted_Records.tombstone_id)
+        ).where(Deleted_Records.entity_type == entity, Deleted_Records.deleted_at > snapshot_at)).scalar(),)
+        side = self._sides.get(entity)
+        if side is not None and side[0] is matrix and side[1] == signature:
+            return side
+        codes = _codes(spec.alphabet)
+        # 序列被清空的记录也要屏蔽，只是不参与计分
+        rows = {key: kmer_counts(sequence, spec, codes) for key, sequence in session.execute(
+            select(spec.key_column, spec.column).where(updated_at > snapshot_at))}
+        deleted = set(session.execute(select(Deleted_Records.entity_id).where(
+            Deleted_Records.entity_type == entity, Deleted_Records.deleted_at > snapshot_at)).scalars())
+        side = (matrix, signature, rows, deleted - rows.keys())
+        with self._lock:
+            self._sides[entity] = side
+        return side
+
+    def _executor(self):
+        # 进程池在首次并行查询时创建；工作进程只做 NumPy 计算，不访问数据库
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def search(self, session, entity, sequence, metric='cosine', limit=10, exclude=None, keys=None):
+        """返回 (索引信息, [(主键, 相似度)])，按相似度降序；矩阵尚未构建时为 (None, [])
+
+        keys 不为 None 时只在这些主键中查找（如某物种的记录）。
+        索引信息含 k、built_at、rows 以及构建之后变化（已重新计分）与删除的行数。
+        """
+        matrix = self.matrix(entity)
+        if matrix is None:
+            return None, []
+        _, _, changed, deleted = self._side_index(session, entity, matrix)
+        info = {'k': matrix.meta['k'], 'built_at': matrix.meta['built_at'], 'rows': matrix.meta['rows'],
+                'changed_rows': len(changed), 'deleted_rows': len(deleted)}
+        query_kmers, query_counts = kmer_counts(sequence, KMER_SPECS[entity])
+        if not len(query_kmers):
+            return info, []
+        query_counts = query_counts.astype(np.float64)
+        rows = len(matrix.ids)
+        if keys is not None:
+            keys = np.unique(np.asarray(list(keys), dtype=np.int64))
+            allowed = set(keys.tolist())
+            changed = {key: row for key, row in changed.items() if key in allowed}
+        # 被屏蔽的旧行至多占去这么多名次，多取这些就足以凑满 limit
+        fetch = limit + len(changed) + len(deleted)
+        if self.workers and rows > self.shard_rows:
+            # 每个分片各取前 fetch 个，合并后再取全局前 limit 个
+            executor = self._executor()
+            futures = [executor.submit(_scan_shard, matrix.directory, start, min(start + self.shard_rows, rows),
+                                       query_kmers, query_counts, metric, fetch, exclude, keys)
+                       for start in range(0, rows, self.shard_rows)]
+            hits = [hit for future in futures for hit in future.result()]
+        else:
+            hits = matrix.top(0, rows, query_kmers, query_counts, metric, fetch, exclude, keys)
+        if changed or deleted:
+            hits = [hit for hit in hits if hit[0] not in changed and hit[0] not in deleted]
+            hits += [hit for hit in score_rows(changed, query_kmers, query_counts, metric) if hit[0] != exclude]
+        hits.sort(key=lambda hit: (-hit[1], hit[0]))
+        return info, hits[:limit]
+
+    def _staleness(self, entity, matrix):
+        """最近一次查询时统计的变化行数；该版本尚未查询过时为 None"""
+        side = self._sides.get(entity)
+        if side is None or side[0] is not matrix:
+            return {'changed_rows': None, 'deleted_rows': None}
+        return {'changed_rows': len(side[2]), 'deleted_rows': len(side[3])}
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'matrices': {entity: {'version': version, 'rows': matrix.meta['rows'], 'nnz': matrix.meta['nnz'],
+                                      'built_at': matrix.meta['built_at'], **self._staleness(entity, matrix)}
+                             for entity, (version, matrix) in self._matrices.items()}
+            }
+
+similarity_index = SimilarityIndex()
@@ -6,6 +6,7 @@ from app.auth import bp
 from app.forms import LoginForm, RegistrationForm, CreatorProfileForm, ManagerProfileForm, ReaderProfileForm
 from app.models import Users, Creators, Managers, Readers, Genes, Proteins, Publications
 from app.utils import generate_api_key
+from app.api.keycache import invalidate_user_api_key
 import secrets
 
 @bp.route('/login', methods=['GET', 'POST'])
@@ -119,6 +120,7 @@ def profile():
             if not current_user.reader:
                 db.session.add(reader)
             db.session.commit()
+            invalidate_user_api_key(current_user)  # 订阅类型决定 API 限流档位
             flash('资料已更新')
             return redirect(url_for('main.index'))
         elif request.method == 'GET' and current_user.reader:
@@ -132,8 +134,10 @@ def profile():
 @bp.route('/reset_api_key', methods=['POST'])
 @login_required
 def reset_api_key():
+    invalidate_user_api_key(current_user)  # 旧密钥立即失效
     current_user.api_key = generate_api_key()
     db.session.commit()
+    invalidate_user_api_key(current_user)  # 清除新密钥可能残留的“无效”缓存
     flash('API密钥已重置')
     return redirect(url_for('auth.profile'))
 
@@ -175,6 +179,7 @@ def edit_profile():
             user.reader.organization = form.organization.data
             user.reader.subscription_type = form.subscription_type.data
             db.session.commit()
+            invalidate_user_api_key(user)  # 订阅类型决定 API 限流档位
             flash('资料已更新')
             return redirect(url_for('main.user_profile', user_id=user.user_id))
         elif request.method == 'GET':
@@ -189,7 +194,9 @@ def edit_profile():
 @login_required
 def regenerate_api_key():
     user = current_user
+    invalidate_user_api_key(user)  # 旧密钥立即失效
     user.api_key = secrets.token_hex(32)
     db.session.commit()
+    invalidate_user_api_key(user)  # 清除新密钥可能残留的“无效”缓存
     flash('API Key 已重置')
     return redirect(url_for('main.user_profile', user_id=user.user_id)) 
\ No newline at end of file
@@ -0,0 +1,192 @@
+from collections import namedtuple
+from datetime import datetime, timedelta
+from sqlalchemy import select, delete, func, literal, union_all, and_, or_, tuple_
+from sqlalchemy.exc import SQLAlchemyError
+from app import db
+from app.models import (Species, Genes, Proteins, Publications, Experimental_Data, Gene_Publications,
+                        Deleted_Records)
+from app.api.serializers import (SPECIES_DETAIL, GENE_DETAIL, PROTEIN_DETAIL, PUBLICATION_DETAIL,
+                                 EXPERIMENT_DETAIL)
+
+# 增量变更流：五类实体按 (updated_at, 来源, 主键) 排成一条时间线，删除以墓碑（Deleted_Records）出现。
+# 墓碑由各实体表的 AFTER DELETE 触发器写入，存储过程与后台删除都会留下记录。
+# 只返回早于“当前时间 - CHANGES_SETTLE_SECONDS”的变更：未提交的长事务提交后，其 updated_at
+# 可能早于客户端已读到的位置，留出沉淀窗口避免漏读。
+# 基因-文献关联没有 updated_at，其增删由 AFTER INSERT/DELETE/UPDATE 触发器同样写入 Deleted_Records
+# （entity_id 为 gene_id，related_id 为 publication_id）；读取时按关联当前是否存在给出 upsert 或 delete，
+# 同一关联的多条记录都反映读取时的最终状态，客户端按顺序应用即可收敛。
+# 墓碑保留 CHANGES_TOMBSTONE_RETENTION_DAYS 天，由 prune_tombstones 清理（scripts/reconcile_counters.py）。
+
+# 实体 -> 变更来源：source 为时间线上同一时刻的排序序号，detail 为输出数据的序列化器
+ChangeSource = namedtuple('ChangeSource', 'source model key_column updated_column detail')
+
+CHANGE_SOURCES = {
+    'species': ChangeSource(0, Species, Species.species_id, Species.updated_at, SPECIES_DETAIL),
+    'genes': ChangeSource(1, Genes, Genes.gene_id, Genes.updated_at, GENE_DETAIL),
+    'proteins': ChangeSource(2, Proteins, Proteins.protein_id, Proteins.updated_at, PROTEIN_DETAIL),
+    'publications': ChangeSource(3, Publications, Publications.publication_id, Publications.updated_at,
+                                 PUBLICATION_DETAIL),
+    'experiments': ChangeSource(4, Experimental_Data, Experimental_Data.experiment_id,
+                                Experimental_Data.updated_at, EXPERIMENT_DETAIL)
+}
+
+# 墓碑排在同一时刻所有实体更新之后，按墓碑自增主键排序
+TOMBSTONE_SOURCE = len(CHANGE_SOURCES)
+
+# 只以 Deleted_Records 中的变更记录出现的关联表；id 为 (gene_id, publication_id)
+LINK_ENTITY = 'gene_publications'
+
+CHANGE_ENTITIES = list(CHANGE_SOURCES) + [LINK_ENTITY]
+
+# 一条变更
+Change = namedtuple('Change', 'entity id op changed_at source key')
+
+# 时间线上的位置：(变更时间, 来源序号, 来源内主键)；为 None 时从头开始
+Position = namedtuple('Position', 'changed_at source key')
+
+def _after(position, source, changed_column, key_column):
+    """某个来源中位于 position 之后的条件；来源序号固定，可化简为对 (时间, 主键) 的比较"""
+    if position is None:
+        return None
+    if source < position.source:
+        return changed_column > position.changed_at
+    if source > position.source:
+        return changed_column >= position.changed_at
+    return or_(changed_column > position.changed_at,
+               and_(changed_column == position.changed_at, key_column > position.key))
+
+def _branch(columns, changed_column, key_column, source, position, cutoff, limit, *where):
+    """单个来源的一段：走 updated_at / deleted_at 索引，按 (时间, 主键) 顺序取至多 limit 行"""
+    conditions = [changed_column < cutoff, *where]
+    after = _after(position, source, changed_column, key_column)
+    if after is not None:
+        conditions.append(after)
+    return select(*columns).where(*conditions).order_by(changed_column, key_column).limit(limit).subquery()
+
+def read_changes(entities, position, limit, settle_seconds):
+    """读取 position 之后的至多 limit 条变更，返回 (变更行列表, 是否还有更多)
+
+    每行为 Change：entity、id、op（upsert / delete）、changed_at、source、key。
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=settle_seconds)
+    branches = []
+    for entity in entities:
+        spec = CHANGE_SOURCES.get(entity)
+        if spec is None:
+            continue
+        branches.append(select(_branch(
+            [literal(entity).label('entity'), spec.key_column.label('id'), literal(None).label('related'),
+             literal('upsert').label('op'), spec.updated_column.label('changed_at'),
+             literal(spec.source).label('source'), spec.key_column.label('key')],
+            spec.updated_column, spec.key_column, spec.source, position, cutoff, limit + 1
+        )))
+    branches.append(select(_branch(
+        [Deleted_Records.entity_type.label('entity'), Deleted_Records.entity_id.label('id'),
+         Deleted_Records.related_id.label('related'), literal('delete').label('op'),
+         Deleted_Records.deleted_at.label('changed_at'), literal(TOMBSTONE_SOURCE).label('source'),
+         Deleted_Records.tombstone_id.label('key')],
+        Deleted_Records.deleted_at, Deleted_Records.tombstone_id, TOMBSTONE_SOURCE, position, cutoff,
+        limit + 1, Deleted_Records.entity_type.in_(entities)
+    )))
+    combined = union_all(*branches).subquery()
+    rows = db.session.execute(select(combined).order_by(
+        combined.c.changed_at, combined.c.source, combined.c.key
+    ).limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    # 关联记录按读取时关联是否存在决定 op，一条 IN 查询
+    links = {(row.id, row.related) for row in rows if row.entity == LINK_ENTITY}
+    existing = set()
+    if links:
+        existing = set(db.session.execute(select(Gene_Publications.gene_id, Gene_Publications.publication_id).where(
+            tuple_(Gene_Publications.gene_id, Gene_Publications.publication_id).in_(links))).all())
+    changes = []
+    for row in rows:
+        if row.entity == LINK_ENTITY:
+            link = (row.id, row.related)
+            changes.append(Change(row.entity, link, 'upsert' if link in existing else 'delete',
+                                  row.changed_at, row.source, row.key))
+        else:
+            changes.append(Change(row.entity, row.id, row.op, row.changed_at, row.source, row.key))
+    return changes, has_more
+
+def load_data(rows):
+    """按实体批量取出本页 upsert 的数据，每类实体一条 IN 查询，返回 {(实体, 主键): dict}"""
+    ids = {}
+    data = {}
+    for row in rows:
+        if row.entity == LINK_ENTITY:
+            # 关联本身没有其他字段，存在性已在 read_changes 中确认
+            if row.op == 'upsert':
+                data[(row.entity, row.id)] = {'gene_id': row.id[0], 'publication_id': row.id[1]}
+        elif row.op == 'upsert':
+            ids.setdefault(row.entity, []).append(row.id)
+    for entity, keys in ids.items():
+        spec = CHANGE_SOURCES[entity]
+        items = spec.detail.rows(db.session.execute(
+            select(*spec.detail.columns).where(spec.key_column.in_(keys))
+        ).all())
+        for item in items:
+            data[(entity, item[spec.key_column.key])] = item
+    return data
+
+def position_of(row):
+    return Position(row.changed_at, row.source, row.key)
+
+def retention_horizon(retention_days):
+    """早于该时刻的墓碑可能已被清理；retention_days 为 0 时不清理，返回 None"""
+    if not retention_days:
+        return None
+    return datetime.utcnow() - timedelta(days=retention_days)
+
+def prune_tombstones(session, retention_days, dry_run=False):
+    """删除超出保留期的墓碑与关联变更记录，返回行数；调用方负责提交"""
+    horizon = retention_horizon(retention_days)
+    if horizon is None:
+        return 0
+    if dry_run:
+        return session.execute(select(func.count()).select_from(Deleted_Records).where(
+            Deleted_Records.deleted_at < horizon)).scalar()
+    return session.execute(delete(Deleted_Records).where(
+        Deleted_Records.deleted_at < horizon).execution_options(synchronize_session=False)).rowcount
+
+# 与 SQLAlchemy 在 SQLite 中存储 DateTime 的格式一致（微秒 6 位）；CURRENT_TIMESTAMP 只到秒，
+# 同一秒内的墓碑与游标位置按字符串比较时不相等，分页会漏读
+_SQLITE_NOW = "strftime('%Y-%m-%d %H:%M:%f000', 'now')"
+
+_LINK_VALUES = f"'{LINK_ENTITY}', {{row}}.gene_id, {{row}}.publication_id, {_SQLITE_NOW}"
+
+# 触发器名 -> 触发器定义
+SQLITE_TOMBSTONE_DDL = {
+    f'tombstone_{spec.model.__tablename__}':
+        f"AFTER DELETE ON {spec.model.__tablename__} "
+        f"BEGIN INSERT INTO Deleted_Records (entity_type, entity_id, deleted_at) "
+        f"VALUES ('{entity}', OLD.{spec.key_column.key}, {_SQLITE_NOW}); END"
+    for entity, spec in CHANGE_SOURCES.items()
+}
+SQLITE_TOMBSTONE_DDL.update(
+    (f'tombstone_Gene_Publications_{suffix}',
+     f"AFTER {event} ON Gene_Publications BEGIN "
+     + ''.join(f"INSERT INTO Deleted_Records (entity_type, entity_id, related_id, deleted_at) "
+               f"VALUES ({_LINK_VALUES.format(row=row)}); " for row in rows)
+     + "END")
+    for suffix, event, rows in (('ai', 'INSERT', ('NEW',)), ('ad', 'DELETE', ('OLD',)),
+                                ('au', 'UPDATE', ('OLD', 'NEW')))
+)
+
+def install_tombstone_triggers(app, db):
+    """SQLite 开发库：创建写墓碑的触发器（旧库先补 related_id 列）；MySQL 的触发器随 SQL 脚本部署"""
+    with app.app_context():
+        if db.engine.dialect.name != 'sqlite':
+            return
+        try:
+            with db.engine.begin() as conn:
+                columns = [row[1] for row in conn.exec_driver_sql('PRAGMA table_info(Deleted_Records)')]
+                if columns and 'related_id' not in columns:
+                    conn.exec_driver_sql('ALTER TABLE Deleted_Records ADD COLUMN related_id INTEGER')
+                # 重建而非 IF NOT EXISTS：旧版本的触发器以秒精度写入时间
+                for name, ddl in SQLITE_TOMBSTONE_DDL.items():
+                    conn.exec_driver_sql(f'DROP TRIGGER IF EXISTS {name}')
+                    conn.exec_driver_sql(f'CREATE TRIGGER {name} {ddl}')
+        except SQLAlchemyError as e:
+            app.logger.warning(f'墓碑触发器创建失败（数据表可能尚未建立）: {e}')
@@ -0,0 +1,85 @@
+from collections import namedtuple
+from sqlalchemy import select, update, func
+from sqlalchemy.exc import SQLAlchemyError
+from app.models import Species, Genes, Publications, Proteins, Gene_Publications
+
+# 冗余计数列：物种的基因数、基因的蛋白质数与文献数、文献的基因数。
+# MySQL 由 sql/advanced_features.sql 中的 AFTER INSERT/DELETE/UPDATE 触发器维护；
+# SQLite 开发库在启动时创建等价触发器。列表与详情接口直接读这些列，不再逐行 COUNT。
+# 触发器之外的写入（如直接导入、手工修改）造成的偏差由 reconcile 批量修复：
+#     python scripts/reconcile_counters.py
+
+# column 为计数列，parent_key 为父表主键，child_fk 为子表中指向父表的外键
+Counter = namedtuple('Counter', 'column parent_key child_fk')
+
+COUNTERS = [
+    Counter(Species.gene_count, Species.species_id, Genes.species_id),
+    Counter(Genes.protein_count, Genes.gene_id, Proteins.gene_id),
+    Counter(Genes.publication_count, Genes.gene_id, Gene_Publications.gene_id),
+    Counter(Publications.gene_count, Publications.publication_id, Gene_Publications.publication_id)
+]
+
+def actual_count(counter):
+    """按子表实际行数计算的计数（相关子查询）"""
+    return select(func.count()).select_from(counter.child_fk.class_).where(
+        counter.child_fk == counter.parent_key
+    ).correlate(counter.parent_key.class_).scalar_subquery()
+
+def reconcile(session, dry_run=False):
+    """找出计数列与实际行数不一致的行并批量修复，返回 {计数列: 偏差行数}
+
+    每个计数列一条 UPDATE ... WHERE 计数 <> 实际数，只改有偏差的行；
+    updated_at 保持原值，计数修复不算作实体变更。调用方负责提交。
+    """
+    drift = {}
+    for counter in COUNTERS:
+        model = counter.parent_key.class_
+        name = f'{model.__tablename__}.{counter.column.key}'
+        expected = actual_count(counter)
+        if dry_run:
+            drift[name] = session.execute(
+                select(func.count()).select_from(model).where(counter.column != expected)
+            ).scalar()
+            continue
+        result = session.execute(
+            update(model).where(counter.column != expected).values(
+                {counter.column: expected, model.updated_at: model.updated_at}
+            ).execution_options(synchronize_session=False)
+        )
+        drift[name] = result.rowcount
+    return drift
+
+def _sqlite_triggers(counter):
+    parent = counter.parent_key.class_.__tablename__
+    child = counter.child_fk.class_.__tablename__
+    column, key, fk = counter.column.key, counter.parent_key.key, counter.child_fk.key
+    prefix = f'counter_{child}_{fk}'
+    return [
+        f'CREATE TRIGGER IF NOT EXISTS {prefix}_ai AFTER INSERT ON {child} BEGIN '
+        f'UPDATE {parent} SET {column} = {column} + 1 WHERE {key} = NEW.{fk}; END',
+        f'CREATE TRIGGER IF NOT EXISTS {prefix}_ad AFTER DELETE ON {child} BEGIN '
+        f'UPDATE {parent} SET {column} = {column} - 1 WHERE {key} = OLD.{fk}; END',
+        f'CREATE TRIGGER IF NOT EXISTS {prefix}_au AFTER UPDATE OF {fk} ON {child} '
+        f'WHEN OLD.{fk} IS NOT NEW.{fk} BEGIN '
+        f'UPDATE {parent} SET {column} = {column} - 1 WHERE {key} = OLD.{fk}; '
+        f'UPDATE {parent} SET {column} = {column} + 1 WHERE {key} = NEW.{fk}; END'
+    ]
+
+def install_counter_triggers(app, db):
+    """SQLite 开发库：创建计数触发器，并在首次创建时校正已有数据；MySQL 的触发器随 SQL 脚本部署"""
+    with app.app_context():
+        if db.engine.dialect.name != 'sqlite':
+            return
+        try:
+            with db.engine.begin() as conn:
+                exists = conn.exec_driver_sql(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'counter_%'").first()
+                for counter in COUNTERS:
+                    for ddl in _sqlite_triggers(counter):
+                        conn.exec_driver_sql(ddl)
+            if not exists:
+                reconcile(db.session)
+                db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            app.logger.warning(f'计数触发器创建失败（数据表可能尚未建立）: {e}')
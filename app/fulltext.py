@@ -0,0 +1,116 @@
+import re
+import threading
+from sqlalchemy import select, func, literal_column, or_, table, column
+from sqlalchemy.dialects.mysql import match as mysql_match
+from app import db
+from app.models import Publications
+
+# 文献全文检索：MySQL 使用 FULLTEXT 索引 ft_publications（见 sql/GenoBase.sql），
+# 本地 SQLite 使用 FTS5 外部内容表 Publications_fts（首次使用时自动创建并由触发器同步），
+# 其他数据库退化为 LIKE 子串匹配。
+# 统一返回 (过滤条件, 相关度表达式)，两者都与 Publications 相关联，可直接用于 filter / add_columns。
+
+MODES = ['natural', 'boolean']
+
+FULLTEXT_COLUMNS = [Publications.title, Publications.authors, Publications.journal, Publications.doi]
+
+SQLITE_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS Publications_fts USING fts5("
+    "title, authors, journal, doi, content='Publications', content_rowid='publication_id')",
+    "CREATE TRIGGER IF NOT EXISTS Publications_fts_ai AFTER INSERT ON Publications BEGIN "
+    "INSERT INTO Publications_fts(rowid, title, authors, journal, doi) "
+    "VALUES (new.publication_id, new.title, new.authors, new.journal, new.doi); END",
+    "CREATE TRIGGER IF NOT EXISTS Publications_fts_ad AFTER DELETE ON Publications BEGIN "
+    "INSERT INTO Publications_fts(Publications_fts, rowid, title, authors, journal, doi) "
+    "VALUES ('delete', old.publication_id, old.title, old.authors, old.journal, old.doi); END",
+    "CREATE TRIGGER IF NOT EXISTS Publications_fts_au AFTER UPDATE ON Publications BEGIN "
+    "INSERT INTO Publications_fts(Publications_fts, rowid, title, authors, journal, doi) "
+    "VALUES ('delete', old.publication_id, old.title, old.authors, old.journal, old.doi); "
+    "INSERT INTO Publications_fts(rowid, title, authors, journal, doi) "
+    "VALUES (new.publication_id, new.title, new.authors, new.journal, new.doi); END",
+]
+
+_sqlite_ready = set()
+_sqlite_lock = threading.Lock()
+
+def ensure_sqlite_fts(engine):
+    """SQLite 下创建 FTS5 表与同步触发器，新建时从 Publications 重建索引"""
+    key = str(engine.url)
+    if key in _sqlite_ready:
+        return
+    with _sqlite_lock:
+        if key in _sqlite_ready:
+            return
+        with engine.begin() as conn:
+            exists = conn.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE name = 'Publications_fts'").first()
+            for ddl in SQLITE_FTS_DDL:
+                conn.exec_driver_sql(ddl)
+            if not exists:
+                conn.exec_driver_sql("INSERT INTO Publications_fts(Publications_fts) VALUES ('rebuild')")
+        _sqlite_ready.add(key)
+
+def _tokens(query):
+    return re.findall(r'[+\-]?"[^"]+"\*?|[+\-]?[^\s"]+', query)
+
+def _fts5_term(token):
+    """把单个词转成 FTS5 短语，保留末尾 * 前缀匹配"""
+    prefix = token.endswith('*')
+    word = token.rstrip('*').strip('"')
+    return '"' + word.replace('"', '""') + '"' + ('*' if prefix else '')
+
+def to_fts5_query(query, mode):
+    """把 MySQL 风格的查询串转成 FTS5 语法
+
+    natural：任一词命中即可（OR）；
+    boolean：+词 必须出现，-词 不得出现，其余为可选词。
+    """
+    required, excluded, optional = [], [], []
+    for token in _tokens(query):
+        if mode == 'boolean' and token[0] == '+' and len(token) > 1:
+            required.append(_fts5_term(token[1:]))
+        elif mode == 'boolean' and token[0] == '-' and len(token) > 1:
+            excluded.append(_fts5_term(token[1:]))
+        else:
+            optional.append(_fts5_term(token.lstrip('+-') or token))
+    if required:
+        expression = ' AND '.join(required)
+    elif optional:
+        expression = ' OR '.join(optional)
+    else:
+        return None
+    for term in excluded:
+        expression = f'({expression}) NOT {term}'
+    return expression
+
+def publication_fulltext(query, mode='natural', engine=None):
+    """返回 (过滤条件, 相关度表达式)；相关度越大越相关
+
+    engine 为同步引擎，未指定时取 Flask 会话的引擎；异步接口在 run_sync 中传入会话的引擎。
+    """
+    if mode not in MODES:
+        mode = 'natural'
+    if engine is None:
+        engine = db.session.get_bind()
+    dialect = engine.dialect.name
+
+    if dialect == 'mysql':
+        expression = mysql_match(*FULLTEXT_COLUMNS, against=query)
+        expression = expression.in_boolean_mode() if mode == 'boolean' else expression.in_natural_language_mode()
+        return expression, expression
+
+    if dialect == 'sqlite':
+        fts_query = to_fts5_query(query, mode)
+        if fts_query is not None:
+            ensure_sqlite_fts(engine)
+            fts_table = table('Publications_fts', column('rowid'))
+            fts = literal_column('Publications_fts')
+            matched = select(fts_table.c.rowid).where(fts.op('MATCH')(fts_query))
+            # bm25 越小越相关，取负数与 MySQL 保持“越大越相关”
+            score = select(-func.bm25(fts)).select_from(fts_table).where(
+                fts.op('MATCH')(fts_query), fts_table.c.rowid == Publications.publication_id
+            ).correlate(Publications).scalar_subquery()
+            return Publications.publication_id.in_(matched), score
+
+    condition = or_(*[col.contains(query, autoescape=True) for col in FULLTEXT_COLUMNS])
+    return condition, literal_column('1.0')
@@ -4,7 +4,9 @@ from app import db
 from app.main import bp
 from app.forms import SearchForm, SpeciesForm, GeneForm, ProteinForm, PublicationForm, ExperimentalDataForm
 from app.models import Species, Genes, Proteins, Publications, Experimental_Data, Gene_Publications, Users
+from app.search import search as unified_search
 from sqlalchemy import or_, func, text
+from sqlalchemy.orm import undefer, joinedload, selectinload
 
 @bp.route('/')
 @bp.route('/index')
@@ -30,63 +32,21 @@ def index():
 @bp.route('/search', methods=['GET', 'POST'])
 def search():
     form = SearchForm()
-    results = []
     
     if form.validate_on_submit() or request.args.get('query'):
         query = form.query.data or request.args.get('query')
         category = form.category.data or request.args.get('category', 'all')
         page = request.args.get('page', 1, type=int)
         
-        if category == 'gene' or category == 'all':
-            genes = Genes.query.filter(
-                or_(
-                    Genes.gene_name.contains(query),
-                    Genes.gene_symbol.contains(query)
-                )
-            ).all()
-            results.extend([{'type': 'gene', 'data': gene} for gene in genes])
-        
-        if category == 'protein' or category == 'all':
-            proteins = Proteins.query.filter(
-                or_(
-                    Proteins.protein_name.contains(query),
-                    Proteins.uniprot_id.contains(query)
-                )
-            ).all()
-            results.extend([{'type': 'protein', 'data': protein} for protein in proteins])
-        
-        if category == 'species' or category == 'all':
-            species = Species.query.filter(
-                or_(
-                    Species.scientific_name.contains(query),
-                    Species.common_name.contains(query),
-                    Species.taxonomy_id.contains(query)
-                )
-            ).all()
-            results.extend([{'type': 'species', 'data': sp} for sp in species])
-        
-        if category == 'publication' or category == 'all':
-            publications = Publications.query.filter(
-                or_(
-                    Publications.title.contains(query),
-                    Publications.authors.contains(query),
-                    Publications.journal.contains(query),
-                    Publications.doi.contains(query)
-                )
-            ).all()
-            results.extend([{'type': 'publication', 'data': pub} for pub in publications])
-        
-        # 分页
-        total = len(results)
+        # 排序与分页在 SQL 中完成，只加载当前页的实体
         per_page = current_app.config['POSTS_PER_PAGE']
-        start = (page - 1) * per_page
-        end = min(start + per_page, total)
-        paginated_results = results[start:end]
+        found = unified_search(query, category, page=page, per_page=per_page,
+                       category_limit=current_app.config['SEARCH_CATEGORY_LIMIT'])
         
         return render_template('main/search_results.html', title='搜索结果',
-                               form=form, results=paginated_results, query=query,
-                               category=category, total=total, page=page,
-                               per_page=per_page, total_pages=(total + per_page - 1) // per_page)
+                               form=form, results=found['results'], query=query,
+                               category=category, total=found['total'], counts=found['counts'],
+                               page=found['page'], per_page=per_page, total_pages=found['pages'])
     
     return render_template('main/search.html', title='搜索', form=form)
 
@@ -100,8 +60,9 @@ def species_list():
 
 @bp.route('/species/<int:id>')
 def species_detail(id):
-    species = Species.query.get_or_404(id)
-    genes = species.genes.all()
+    species = Species.query.options(selectinload(Species.gene_list)).filter(
+        Species.species_id == id).first_or_404()
+    genes = species.gene_list
     return render_template('main/species_detail.html', title=species.scientific_name, species=species, genes=genes)
 
 # 基因相关路由
@@ -114,10 +75,14 @@ def gene_list():
 
 @bp.route('/genes/<int:id>')
 def gene_detail(id):
-    gene = Genes.query.get_or_404(id)
-    proteins = gene.proteins.all()
+    # 关联列表各用一条 IN 查询批量加载
+    gene = Genes.query.options(
+        undefer(Genes.sequence), selectinload(Genes.protein_list), selectinload(Genes.publications),
+        selectinload(Genes.experiment_list)
+    ).filter(Genes.gene_id == id).first_or_404()
+    proteins = gene.protein_list
     publications = gene.publications
-    experiments = gene.experimental_data.all()
+    experiments = gene.experiment_list
     return render_template('main/gene_detail.html', title=gene.gene_name, 
                            gene=gene, proteins=proteins, 
                            publications=publications, experiments=experiments)
@@ -132,7 +97,8 @@ def protein_list():
 
 @bp.route('/proteins/<int:id>')
 def protein_detail(id):
-    protein = Proteins.query.get_or_404(id)
+    protein = Proteins.query.options(undefer(Proteins.amino_acid_sequence)).filter(
+        Proteins.protein_id == id).first_or_404()
     return render_template('main/protein_detail.html', title=protein.protein_name, protein=protein)
 
 # 文献相关路由
@@ -145,9 +111,12 @@ def publication_list():
 
 @bp.route('/publications/<int:id>')
 def publication_detail(id):
-    publication = Publications.query.get_or_404(id)
-    genes = publication.genes
-    experiments = publication.experimental_data.all()
+    # 关联基因连同物种批量加载，模板中显示物种名不再逐个查询
+    publication = Publications.query.options(
+        selectinload(Publications.gene_list).joinedload(Genes.species), selectinload(Publications.experiment_list)
+    ).filter(Publications.publication_id == id).first_or_404()
+    genes = publication.gene_list
+    experiments = publication.experiment_list
     return render_template('main/publication_detail.html', title=publication.title, 
                            publication=publication, genes=genes, experiments=experiments)
 
@@ -82,11 +82,14 @@ class Species(db.Model):
     common_name = db.Column(db.String(100))
     taxonomy_id = db.Column(db.String(50))
     description = db.Column(db.Text)
+    gene_count = db.Column(db.Integer, nullable=False, server_default='0')  # 冗余计数，由触发器维护
     created_at = db.Column(db.TIMESTAMP, default=datetime.utcnow)
     updated_at = db.Column(db.TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # 关系定义
     genes = db.relationship('Genes', backref='species', lazy='dynamic')
+    # 只读的列表关系，供 selectinload 批量预加载（动态关系不支持预加载）
+    gene_list = db.relationship('Genes', viewonly=True)
 
 class Genes(db.Model):
     __tablename__ = 'Genes'
@@ -94,12 +97,15 @@ class Genes(db.Model):
     gene_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     gene_name = db.Column(db.String(100), nullable=False)
     gene_symbol = db.Column(db.String(50))
-    sequence = db.Column(db.Text, nullable=False)
+    sequence = db.deferred(db.Column(db.Text, nullable=False))  # 大字段延迟加载
     chromosome = db.Column(db.String(50))
     start_position = db.Column(db.Integer)
     end_position = db.Column(db.Integer)
     strand = db.Column(db.Enum('+', '-'))
+    bin = db.Column(db.Integer)  # UCSC 分箱号，由触发器按起止位置维护（见 app/regions.py）
     species_id = db.Column(db.Integer, db.ForeignKey('Species.species_id'))
+    protein_count = db.Column(db.Integer, nullable=False, server_default='0')      # 冗余计数，由触发器维护
+    publication_count = db.Column(db.Integer, nullable=False, server_default='0')  # 冗余计数，由触发器维护
     created_at = db.Column(db.TIMESTAMP, default=datetime.utcnow)
     updated_at = db.Column(db.TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -107,6 +113,9 @@ class Genes(db.Model):
     proteins = db.relationship('Proteins', backref='gene', lazy='dynamic')
     publications = db.relationship('Publications', secondary='Gene_Publications', backref=db.backref('genes', lazy='dynamic'))
     experimental_data = db.relationship('Experimental_Data', backref='gene', lazy='dynamic')
+    # 只读的列表关系，供 selectinload 批量预加载（动态关系不支持预加载）
+    protein_list = db.relationship('Proteins', viewonly=True)
+    experiment_list = db.relationship('Experimental_Data', viewonly=True)
 
 class Proteins(db.Model):
     __tablename__ = 'Proteins'
@@ -114,7 +123,7 @@ class Proteins(db.Model):
     protein_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     protein_name = db.Column(db.String(100), nullable=False)
     uniprot_id = db.Column(db.String(50))
-    amino_acid_sequence = db.Column(db.Text, nullable=False)
+    amino_acid_sequence = db.deferred(db.Column(db.Text, nullable=False))  # 大字段延迟加载
     gene_id = db.Column(db.Integer, db.ForeignKey('Genes.gene_id'))
     created_at = db.Column(db.TIMESTAMP, default=datetime.utcnow)
     updated_at = db.Column(db.TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -128,11 +137,15 @@ class Publications(db.Model):
     journal = db.Column(db.String(100))
     publication_year = db.Column(db.Integer)
     doi = db.Column(db.String(100))
+    gene_count = db.Column(db.Integer, nullable=False, server_default='0')  # 冗余计数，由触发器维护
     created_at = db.Column(db.TIMESTAMP, default=datetime.utcnow)
     updated_at = db.Column(db.TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # 关系定义
     experimental_data = db.relationship('Experimental_Data', backref='publication', lazy='dynamic')
+    # 只读的列表关系，供 selectinload 批量预加载（动态关系不支持预加载）
+    gene_list = db.relationship('Genes', secondary='Gene_Publications', viewonly=True)
+    experiment_list = db.relationship('Experimental_Data', viewonly=True)
 
 class Gene_Publications(db.Model):
     __tablename__ = 'Gene_Publications'
@@ -152,6 +165,18 @@ class Experimental_Data(db.Model):
     created_at = db.Column(db.TIMESTAMP, default=datetime.utcnow)
     updated_at = db.Column(db.TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+class Deleted_Records(db.Model):
+    """删除墓碑：由各实体表的 AFTER DELETE 触发器写入，供 /api/changes 向下游同步删除；
+    基因-文献关联的增删也记录在此（entity_id 为 gene_id，related_id 为 publication_id）"""
+    __tablename__ = 'Deleted_Records'
+    
+    tombstone_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    # species / genes / proteins / publications / experiments / gene_publications
+    entity_type = db.Column(db.String(32), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    related_id = db.Column(db.Integer)
+    deleted_at = db.Column(db.TIMESTAMP, nullable=False, default=datetime.utcnow)
+
 class UserRoleInfo(db.Model):
     __tablename__ = 'UserRoleInfo'
     __table_args__ = {'extend_existing': True}
@@ -0,0 +1,121 @@
+import re
+from sqlalchemy import select, or_, and_
+from sqlalchemy.exc import SQLAlchemyError
+from app import db
+from app.models import Genes
+
+# 基因组区间查询：UCSC 风格的分层分箱索引。
+# 基因按 [start, end] 落入能完整容纳它的最小箱：最细一层每箱 128 kb，往上每层放大 8 倍，共 5 层，
+# 顶层 0 号箱覆盖 512 Mb。与区间重叠的基因只可能在与该区间相交的各层箱中，
+# 查询时每层一段连续的箱号，配合 (species_id, chromosome, bin, start_position) 索引只读少量行。
+# 坐标按 1 起始闭区间处理；超出 512 Mb 的基因统一放入 0 号箱（查询总会检查 0 号箱，结果仍正确）。
+# bin 列由触发器维护：MySQL 见 sql/advanced_features.sql，SQLite 开发库启动时创建。
+
+BIN_FIRST_SHIFT = 17
+BIN_NEXT_SHIFT = 3
+# 各层起始箱号，从最细一层到顶层
+BIN_OFFSETS = [512 + 64 + 8 + 1, 64 + 8 + 1, 8 + 1, 1, 0]
+BIN_MAX_POSITION = 1 << (BIN_FIRST_SHIFT + BIN_NEXT_SHIFT * (len(BIN_OFFSETS) - 1))
+
+def bin_for(start, end):
+    """包含 [start, end]（1 起始闭区间）的最小箱号"""
+    start_bin = max(start - 1, 0)
+    end_bin = max(end - 1, 0)
+    if end_bin >= BIN_MAX_POSITION:
+        return 0
+    start_bin >>= BIN_FIRST_SHIFT
+    end_bin >>= BIN_FIRST_SHIFT
+    for offset in BIN_OFFSETS:
+        if start_bin == end_bin:
+            return offset + start_bin
+        start_bin >>= BIN_NEXT_SHIFT
+        end_bin >>= BIN_NEXT_SHIFT
+    return 0
+
+def overlapping_bins(start, end):
+    """可能含有与 [start, end] 重叠的基因的箱号，每层一段 (首箱, 末箱)"""
+    start_bin = max(start - 1, 0) >> BIN_FIRST_SHIFT
+    end_bin = max(end - 1, 0) >> BIN_FIRST_SHIFT
+    ranges = []
+    for level, offset in enumerate(BIN_OFFSETS):
+        # 每层的箱数为 8^(层数-1-level)，超出 512 Mb 的部分截断到该层最后一个箱
+        last = (1 << (BIN_NEXT_SHIFT * (len(BIN_OFFSETS) - 1 - level))) - 1
+        if start_bin <= last:
+            ranges.append((offset + start_bin, offset + min(end_bin, last)))
+        start_bin >>= BIN_NEXT_SHIFT
+        end_bin >>= BIN_NEXT_SHIFT
+    # 超出 512 Mb 的基因都在 0 号箱，区间完全超出时同样要检查
+    if (0, 0) not in ranges:
+        ranges.append((0, 0))
+    return ranges
+
+def bin_sql(start, end):
+    """与 bin_for 等价的 SQL 表达式（MySQL 与 SQLite 通用），用于触发器与回填"""
+    start0 = f'(CASE WHEN {start} > 1 THEN {start} - 1 ELSE 0 END)'
+    end0 = f'(CASE WHEN {end} > 1 THEN {end} - 1 ELSE 0 END)'
+    cases = [f'WHEN {start} IS NULL OR {end} IS NULL THEN NULL',
+             f'WHEN {end0} >= {BIN_MAX_POSITION} THEN 0']
+    shift = BIN_FIRST_SHIFT
+    for offset in BIN_OFFSETS:
+        cases.append(f'WHEN ({start0} >> {shift}) = ({end0} >> {shift}) THEN {offset} + ({start0} >> {shift})')
+        shift += BIN_NEXT_SHIFT
+    return 'CASE ' + ' '.join(cases) + ' ELSE 0 END'
+
+_REGION = re.compile(r'^\s*([^:\s]+)\s*:\s*([\d,]+)\s*-\s*([\d,]+)\s*$')
+
+def parse_region(text):
+    """解析 chr7:1,000,000-1,200,000 形式的区间，返回 (染色体, 起点, 终点)，格式不对返回 None"""
+    match = _REGION.match(text or '')
+    if not match:
+        return None
+    return match.group(1), int(match.group(2).replace(',', '')), int(match.group(3).replace(',', ''))
+
+def chromosome_names(chrom):
+    """染色体名同时匹配带与不带 chr 前缀的写法（chr7 / 7）"""
+    if chrom.lower().startswith('chr'):
+        return [chrom, chrom[3:]]
+    return [chrom, 'chr' + chrom]
+
+def _on_chromosome(species_id, chrom):
+    return and_(Genes.species_id == species_id, Genes.chromosome.in_(chromosome_names(chrom)))
+
+def overlapping_genes(columns, species_id, chrom, start, end, limit):
+    """与区间重叠的基因，按起点排序；每层箱号为一段范围，索引内按 (bin, start_position) 定位"""
+    bins = or_(*(Genes.bin.between(first, last) for first, last in overlapping_bins(start, end)))
+    return db.session.execute(select(*columns).where(
+        _on_chromosome(species_id, chrom), bins,
+        Genes.start_position <= end, Genes.end_position >= start
+    ).order_by(Genes.start_position, Genes.gene_id).limit(limit)).all()
+
+def upstream_genes(columns, species_id, chrom, start, limit):
+    """终点在区间起点之前的最近基因（走 (species_id, chromosome, end_position) 索引倒序）"""
+    return db.session.execute(select(*columns).where(
+        _on_chromosome(species_id, chrom), Genes.end_position < start
+    ).order_by(Genes.end_position.desc(), Genes.gene_id.desc()).limit(limit)).all()
+
+def downstream_genes(columns, species_id, chrom, end, limit):
+    """起点在区间终点之后的最近基因（走 (species_id, chromosome, start_position) 索引）"""
+    return db.session.execute(select(*columns).where(
+        _on_chromosome(species_id, chrom), Genes.start_position > end
+    ).order_by(Genes.start_position, Genes.gene_id).limit(limit)).all()
+
+def install_bin_triggers(app, db):
+    """SQLite 开发库：创建维护 bin 列的触发器，首次创建时回填已有基因；MySQL 的触发器随 SQL 脚本部署"""
+    with app.app_context():
+        if db.engine.dialect.name != 'sqlite':
+            return
+        new_bin = bin_sql('NEW.start_position', 'NEW.end_position')
+        try:
+            with db.engine.begin() as conn:
+                exists = conn.exec_driver_sql(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'genes_bin_ai'").first()
+                conn.exec_driver_sql(
+                    'CREATE TRIGGER IF NOT EXISTS genes_bin_ai AFTER INSERT ON Genes BEGIN '
+                    f'UPDATE Genes SET bin = {new_bin} WHERE gene_id = NEW.gene_id; END')
+                conn.exec_driver_sql(
+                    'CREATE TRIGGER IF NOT EXISTS genes_bin_au AFTER UPDATE OF start_position, end_position '
+                    f'ON Genes BEGIN UPDATE Genes SET bin = {new_bin} WHERE gene_id = NEW.gene_id; END')
+                if not exists:
+                    conn.exec_driver_sql(f"UPDATE Genes SET bin = {bin_sql('start_position', 'end_position')}")
+        except SQLAlchemyError as e:
+            app.logger.warning(f'区间分箱触发器创建失败（数据表可能尚未建立）: {e}')
@@ -0,0 +1,158 @@
+from flask import current_app
+from sqlalchemy import select, union_all, literal, case, or_, func, false
+from sqlalchemy.orm import joinedload
+from app import db
+from app.models import Species, Genes, Proteins, Publications
+from app.fulltext import publication_fulltext
+from app.trigram import name_index, INDEXED
+
+# 统一搜索：四个类别各生成一个带相关度的 SELECT，以 UNION ALL 合并后在 SQL 中排序分页。
+# 相关度：完全匹配 3 > 前缀匹配 2 > 子串匹配 1。每个类别最多取 category_limit 条参与排序，
+# 单字母之类的宽泛查询也不会把整库读进内存。
+# 文献类别改走全文索引（见 app/fulltext.py），同一相关度档位内按全文得分排序。
+# 基因、蛋白质先查进程内三元组索引（见 app/trigram.py）得到主键，SQL 只按主键取行；
+# 没有子串命中时改用相似度容错匹配，相关度记 0 并按相似度排序。
+
+CATEGORIES = ['gene', 'protein', 'species', 'publication']
+
+# 类别 -> (模型, 主键, 名称列, 参与完全/前缀匹配的列, 参与子串匹配的列)
+SEARCH_SPECS = {
+    'gene': (Genes, Genes.gene_id, Genes.gene_name,
+             [Genes.gene_symbol, Genes.gene_name],
+             [Genes.gene_name, Genes.gene_symbol]),
+    'protein': (Proteins, Proteins.protein_id, Proteins.protein_name,
+                [Proteins.uniprot_id, Proteins.protein_name],
+                [Proteins.protein_name, Proteins.uniprot_id]),
+    'species': (Species, Species.species_id, Species.scientific_name,
+                [Species.scientific_name, Species.common_name, Species.taxonomy_id],
+                [Species.scientific_name, Species.common_name, Species.taxonomy_id]),
+    'publication': (Publications, Publications.publication_id, Publications.title,
+                    [Publications.doi, Publications.title, Publications.journal],
+                    [Publications.title, Publications.authors, Publications.journal, Publications.doi])
+}
+
+def resolve_categories(category):
+    """'all' 展开为全部类别，未知类别返回空列表"""
+    if category == 'all':
+        return list(CATEGORIES)
+    return [category] if category in SEARCH_SPECS else []
+
+def _plan(category, query, category_limit):
+    """生成类别的 (匹配条件, 相关度, 同档位内的升序排序值)"""
+    _, key_column, _, _, contains_columns = SEARCH_SPECS[category]
+    if category in INDEXED and name_index.ready(db.session):
+        ids = name_index.substring(category, query)
+        if ids and len(ids) <= current_app.config.get('TRIGRAM_MAX_IDS', 5000):
+            return key_column.in_(sorted(ids)), _relevance(category, query), literal(0)
+        if not ids:
+            hits = name_index.fuzzy(category, query, limit=category_limit)
+            if not hits:
+                return false(), literal(0), literal(0)
+            ranks = {key: rank for rank, (key, _) in enumerate(hits)}
+            return key_column.in_(list(ranks)), literal(0), case(ranks, value=key_column)
+        # 命中过多（一两个字母之类的宽泛查询）时 IN 列表反而更慢，交回 SQL 子串匹配
+    if category == 'publication':
+        condition, score = publication_fulltext(query)
+        return condition, _relevance(category, query), -score
+    condition = or_(*[column.contains(query, autoescape=True) for column in contains_columns])
+    return condition, _relevance(category, query), literal(0)
+
+def _relevance(category, query):
+    _, _, _, key_columns, _ = SEARCH_SPECS[category]
+    return case(
+        (or_(*[column == query for column in key_columns]), 3),
+        (or_(*[column.startswith(query, autoescape=True) for column in key_columns]), 2),
+        else_=1
+    )
+
+def category_counts(plans):
+    """一条 SQL 统计各类别的匹配总数"""
+    if not plans:
+        return {}
+    categories = list(plans)
+    columns = []
+    for category in categories:
+        model = SEARCH_SPECS[category][0]
+        columns.append(select(func.count()).select_from(model).where(
+            plans[category][0]).scalar_subquery().label(category))
+    row = db.session.execute(select(*columns)).one()
+    return {category: row[i] for i, category in enumerate(categories)}
+
+def _ranked_page(plans, category_limit, offset, limit):
+    """UNION ALL 合并各类别（每类最多 category_limit 条），按相关度排序后取一页 (类别, 主键, 相关度)"""
+    branches = []
+    for order, (category, (condition, relevance, rank)) in enumerate(plans.items()):
+        _, key_column, name_column, _, _ = SEARCH_SPECS[category]
+        inner = select(
+            literal(category).label('type'),
+            key_column.label('id'),
+            name_column.label('name'),
+            relevance.label('score'),
+            rank.label('rank'),
+            literal(order).label('type_order')
+        ).where(condition).order_by(
+            relevance.desc(), rank, name_column, key_column
+        ).limit(category_limit).subquery()
+        branches.append(select(inner))
+    combined = union_all(*branches).subquery() if len(branches) > 1 else branches[0].subquery()
+    stmt = select(combined.c.type, combined.c.id, combined.c.score).order_by(
+        combined.c.score.desc(), combined.c.type_order, combined.c.rank, combined.c.name, combined.c.id
+    ).offset(offset).limit(limit)
+    return db.session.execute(stmt).all()
+
+def _load(category, ids):
+    """批量加载本页实体，每个类别一条 SQL，返回 {主键: (实体, 附加信息)}"""
+    model, key_column, _, _, _ = SEARCH_SPECS[category]
+    if category == 'gene':
+        rows = [(gene, None) for gene in
+                Genes.query.options(joinedload(Genes.species)).filter(key_column.in_(ids)).all()]
+    elif category == 'protein':
+        rows = [(protein, None) for protein in
+                Proteins.query.options(joinedload(Proteins.gene)).filter(key_column.in_(ids)).all()]
+    elif category == 'species':
+        # 读触发器维护的计数列，与列表、详情接口一致
+        rows = db.session.query(Species, Species.gene_count).filter(key_column.in_(ids)).all()
+    else:
+        rows = [(pub, None) for pub in Publications.query.filter(key_column.in_(ids)).all()]
+    return {getattr(obj, key_column.key): (obj, extra) for obj, extra in rows}
+
+def search(query, category='all', page=1, per_page=10, category_limit=100):
+    """执行统一搜索
+
+    返回 dict：results 为本页结果（每项含 type、score、data 实体，物种另含 gene_count），
+    counts 为各类别匹配总数，total 为参与分页的条数（各类别总数截断到 category_limit 后求和）。
+    """
+    plans = {name: _plan(name, query, category_limit) for name in resolve_categories(category)}
+    counts = category_counts(plans)
+    total = sum(min(count, category_limit) for count in counts.values())
+    page = max(page, 1)
+    pages = (total + per_page - 1) // per_page
+
+    hits = []
+    if total and (page - 1) * per_page < total:
+        hits = _ranked_page(plans, category_limit, (page - 1) * per_page, per_page)
+
+    ids_by_type = {}
+    for hit_type, hit_id, _ in hits:
+        ids_by_type.setdefault(hit_type, []).append(hit_id)
+    loaded = {hit_type: _load(hit_type, ids) for hit_type, ids in ids_by_type.items()}
+
+    results = []
+    for hit_type, hit_id, score in hits:
+        if hit_id not in loaded[hit_type]:
+            continue  # 两次查询之间被删除
+        obj, extra = loaded[hit_type][hit_id]
+        result = {'type': hit_type, 'score': int(score), 'data': obj}
+        if hit_type == 'species':
+            result['gene_count'] = extra
+        results.append(result)
+
+    return {
+        'results': results,
+        'counts': counts,
+        'total': total,
+        'page': page,
+        'per_page': per_page,
+        'pages': pages,
+        'category_limit': category_limit
+    }
@@ -0,0 +1,256 @@
+import heapq
+import threading
+import time
+from bisect import bisect_left, insort
+from sqlalchemy.exc import SQLAlchemyError
+from app.models import Species, Genes, Proteins, Publications
+from app.writes import write_tracker
+
+# 搜索框输入提示：每个类别把去重后的名称按小写排序存成有序数组，前缀补全用二分查找定位，
+# 请求路径上不访问数据库。逐行提交的增删改增量应用；批量写入与存储过程无法逐行追踪，
+# 把受影响的类别标记为过期，由一个请求重建，重建期间其他请求继续使用旧索引。
+
+# 类别 -> (主键, 提供补全文本的列)
+SOURCES = {
+    'gene': (Genes.gene_id, [Genes.gene_symbol]),
+    'species': (Species.species_id, [Species.scientific_name, Species.common_name]),
+    'protein': (Proteins.protein_id, [Proteins.protein_name]),
+    'journal': (Publications.publication_id, [Publications.journal])
+}
+
+SUGGEST_CATEGORIES = list(SOURCES)
+
+# 表 -> 对应的类别
+TABLE_CATEGORIES = {
+    Genes.__tablename__: 'gene',
+    Species.__tablename__: 'species',
+    Proteins.__tablename__: 'protein',
+    Publications.__tablename__: 'journal'
+}
+
+def _clean(value):
+    return ' '.join(value.split()) if value else ''
+
+def _upper_bound(prefix):
+    """以 prefix 开头的字符串都小于该值"""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+class _SortedIndex:
+    """有序数组：keys 为有序的小写名称，entries 为小写名称 -> [原始写法, 同名记录数]，
+    docs 为主键 -> 该记录提供的名称，用于更新和删除时扣减计数；
+    top 为不超过 prefix_length 个字符的前缀 -> 该前缀下排名前 top_size 的小写名称，
+    短前缀命中的名称很多，预先排好名次，补全时不必逐个比较"""
+
+    def __init__(self, rows=(), top_size=50, prefix_length=3):
+        self.entries = {}
+        self.docs = {}
+        self.top_size = top_size
+        self.prefix_length = prefix_length
+        for key, values in rows:
+            self._count(key, values)
+        self.keys = sorted(self.entries)
+        self.top = {}
+        for lower in sorted(self.entries, key=self._rank):
+            for prefix in self._prefixes(lower):
+                bucket = self.top.setdefault(prefix, [])
+                if len(bucket) < top_size:
+                    bucket.append(lower)
+
+    def _rank(self, lower):
+        """排名：记录数降序，同数按字典序"""
+        return -self.entries[lower][1], lower
+
+    def _prefixes(self, lower):
+        return [lower[:n] for n in range(1, min(len(lower), self.prefix_length) + 1)]
+
+    def _count(self, key, values):
+        """记录 key 的名称并累加计数，返回新出现的小写名称"""
+        values = tuple(value for value in (_clean(v) for v in values) if value)
+        if values:
+            self.docs[key] = values
+        added = []
+        for value in values:
+            entry = self.entries.get(value.lower())
+            if entry is None:
+                self.entries[value.lower()] = [value, 1]
+                added.append(value.lower())
+            else:
+                entry[1] += 1
+        return added
+
+    def _promote(self, lower):
+        """计数增加或新出现：只可能挤进各短前缀的前 top_size 名"""
+        for prefix in self._prefixes(lower):
+            bucket = self.top.setdefault(prefix, [])
+            if lower not in bucket:
+                if len(bucket) >= self.top_size and self._rank(lower) >= self._rank(bucket[-1]):
+                    continue
+                bucket.append(lower)
+            bucket.sort(key=self._rank)
+            del bucket[self.top_size:]
+
+    def _demote(self, lower):
+        """计数减少或已删除：桶已满时被截掉的名称可能补上来，按前缀重新扫描"""
+        for prefix in self._prefixes(lower):
+            bucket = self.top.get(prefix)
+            if bucket is None or lower not in bucket:
+                continue
+            if len(bucket) >= self.top_size:
+                self.top[prefix] = self._scan(prefix, self.top_size)
+            elif lower in self.entries:
+                bucket.sort(key=self._rank)
+            else:
+                # 桶未满即包含该前缀下的全部名称
+                bucket.remove(lower)
+            if not self.top[prefix]:
+                del self.top[prefix]
+
+    def add(self, key, values):
+        if self.docs.get(key) == tuple(value for value in (_clean(v) for v in values) if value):
+            return  # 名称未变（改的是其他列）
+        self.remove(key)
+        for lower in self._count(key, values):
+            insort(self.keys, lower)
+        for value in self.docs.get(key, ()):
+            self._promote(value.lower())
+
+    def remove(self, key):
+        for value in self.docs.pop(key, ()):
+            lower = value.lower()
+            entry = self.entries[lower]
+            entry[1] -= 1
+            if not entry[1]:
+                del self.entries[lower]
+                del self.keys[bisect_left(self.keys, lower)]
+            self._demote(lower)
+
+    def _scan(self, prefix, limit):
+        """二分定位以 prefix 开头的区间，按排名取前 limit 个小写名称"""
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, _upper_bound(prefix), lo)
+        return heapq.nsmallest(limit, self.keys[lo:hi], key=self._rank)
+
+    def complete(self, prefix, limit):
+        """以 prefix 开头的名称中记录数最多的 limit 个 (小写键, 文本, 记录数)，同数按字典序"""
+        if len(prefix) <= self.prefix_length and limit <= self.top_size:
+            lowers = self.top.get(prefix, [])[:limit]
+        else:
+            lowers = self._scan(prefix, limit)
+        return [(lower, *self.entries[lower]) for lower in lowers]
+
+    def __len__(self):
+        return len(self.keys)
+
+class SuggestIndex:
+    """前缀补全索引，供 /api/suggest 使用"""
+
+    def __init__(self):
+        self.refresh_interval = 0
+        self.top_size = 50
+        self.prefix_length = 3
+        self._indexes = {}
+        self._built_at = {}
+        self._stale = set(SUGGEST_CATEGORIES)
+        self._lock = threading.Lock()
+        # 每个类别同一时刻只有一个重建
+        self._rebuilding = {category: threading.Lock() for category in SUGGEST_CATEGORIES}
+
+    def init_app(self, app, session):
+        self.refresh_interval = app.config.get('SUGGEST_REFRESH_INTERVAL', self.refresh_interval)
+        self.top_size = app.config.get('SUGGEST_MAX_LIMIT', self.top_size)
+        self.prefix_length = app.config.get('SUGGEST_PREFIX_LENGTH', self.prefix_length)
+        for key_column, columns in SOURCES.values():
+            write_tracker.watch(key_column.class_, columns)
+        write_tracker.subscribe(self.apply_written)
+        # 启动时预加载；数据库暂不可用时推迟到首次请求
+        with app.app_context():
+            try:
+                for category in SUGGEST_CATEGORIES:
+                    self.rebuild(session, category)
+            except SQLAlchemyError as e:
+                session.rollback()
+                app.logger.warning(f'补全索引预加载失败，将在首次请求时重建: {e}')
+
+    def rebuild(self, session, category):
+        with self._rebuilding[category]:
+            self._build(session, category)
+
+    def _build(self, session, category):
+        # 先清除过期标记：重建期间提交的写入会重新标记，不会被这次重建吞掉
+        with self._lock:
+            self._stale.discard(category)
+        key_column, columns = SOURCES[category]
+        try:
+            rows = [(row[0], row[1:]) for row in session.query(key_column, *columns).yield_per(5000)]
+        except SQLAlchemyError:
+            self.mark_stale([category])
+            raise
+        index = _SortedIndex(rows, self.top_size, self.prefix_length)
+        with self._lock:
+            self._indexes[category] = index
+            self._built_at[category] = time.time()
+
+    def _outdated(self, category):
+        built_at = self._built_at.get(category)
+        expired = bool(self.refresh_interval and built_at and time.time() - built_at > self.refresh_interval)
+        return category in self._stale or category not in self._indexes or expired
+
+    def _refresh(self, session, category):
+        """过期时重建；已有旧索引时不等待其他请求正在进行的重建，直接使用旧索引"""
+        lock = self._rebuilding[category]
+        if not lock.acquire(blocking=category not in self._indexes):
+            return
+        try:
+            if self._outdated(category):
+                self._build(session, category)
+        finally:
+            lock.release()
+
+    def suggest(self, session, query, categories, limit):
+        """返回 [{'text', 'category', 'count'}]；多个类别时合并后按记录数降序、同数按字典序取前 limit 个"""
+        prefix = ' '.join(query.lower().split())
+        if not prefix:
+            return []
+        merged = []
+        for category in categories:
+            if self._outdated(category):
+                self._refresh(session, category)
+            with self._lock:
+                for key, text, count in self._indexes[category].complete(prefix, limit):
+                    merged.append((key, category, text, count))
+        merged.sort(key=lambda item: (-item[3], item[0], SUGGEST_CATEGORIES.index(item[1])))
+        return [{'text': text, 'category': category, 'count': count}
+                for _, category, text, count in merged[:limit]]
+
+    def apply_written(self, writes):
+        """写入追踪的回调：逐行变化增量应用，无法逐行追踪的表对应的类别标记为过期"""
+        stale = {TABLE_CATEGORIES[table] for table in writes.untracked if table in TABLE_CATEGORIES}
+        with self._lock:
+            for row in writes.rows:
+                category = TABLE_CATEGORIES.get(row.table)
+                if category is None or category in stale or category not in self._indexes:
+                    continue
+                if self._rebuilding[category].locked():
+                    # 正在重建的快照可能漏掉这次写入，重建完成后再建一次
+                    stale.add(category)
+                    continue
+                index = self._indexes[category]
+                if row.values is None:
+                    index.remove(row.key)
+                else:
+                    index.add(row.key, [row.values[column.key] for column in SOURCES[category][1]])
+            self._stale.update(stale)
+
+    def mark_stale(self, categories):
+        with self._lock:
+            self._stale.update(categories)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': {category: len(index) for category, index in self._indexes.items()},
+                'stale': sorted(self._stale),
+                'rebuilding': [category for category, lock in self._rebuilding.items() if lock.locked()]
+            }
+
+suggest_index = SuggestIndex()
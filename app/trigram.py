@@ -0,0 +1,202 @@
+import threading
+import time
+from collections import Counter
+from sqlalchemy.exc import SQLAlchemyError
+from app.models import Genes, Proteins
+from app.writes import write_tracker
+
+# 基因/蛋白质名称的进程内三元组（trigram）倒排索引。
+# LIKE '%x%' 无法使用 idx_genes_name 等 B-Tree 索引，只能全表扫描；这里把名称按三个字符切片建倒排表，
+# 子串查询取各切片倒排表的交集再校验，模糊查询按三元组 Jaccard 相似度排序（与 pg_trgm 思路相同）。
+# 启动时整体加载，会话提交后增量更新；存储过程、批量 INSERT/UPDATE/DELETE 无法逐行追踪，标记为过期后下次使用时重建。
+
+# 类别 -> (模型, 主键, 参与索引的列)
+INDEXED = {
+    'gene': (Genes, Genes.gene_id, [Genes.gene_name, Genes.gene_symbol]),
+    'protein': (Proteins, Proteins.protein_id, [Proteins.protein_name, Proteins.uniprot_id])
+}
+
+TABLE_CATEGORIES = {Genes.__tablename__: 'gene', Proteins.__tablename__: 'protein'}
+
+def normalize(value):
+    return ' '.join(value.lower().split()) if value else ''
+
+def trigrams(text, padded=True):
+    """切分三元组；padded 时首尾补空格，使词首词尾也能参与相似度计算"""
+    if padded:
+        text = '  ' + text + ' '
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def similarity(left, right):
+    """两个三元组集合的 Jaccard 相似度"""
+    if not left or not right:
+        return 0.0
+    shared = len(left & right)
+    return shared / (len(left) + len(right) - shared)
+
+class _CategoryIndex:
+    """单个类别的倒排表：docs 保存每条记录规范化后的字段值，postings 为三元组 -> 主键集合"""
+
+    def __init__(self):
+        self.docs = {}
+        self.postings = {}
+
+    def add(self, key, values):
+        self.remove(key)
+        values = tuple(value for value in (normalize(v) for v in values) if value)
+        if not values:
+            return
+        self.docs[key] = values
+        for gram in set().union(*(trigrams(value) for value in values)):
+            self.postings.setdefault(gram, set()).add(key)
+
+    def remove(self, key):
+        values = self.docs.pop(key, None)
+        if values is None:
+            return
+        for gram in set().union(*(trigrams(value) for value in values)):
+            keys = self.postings.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.postings[gram]
+
+    def substring(self, query):
+        """包含 query 的记录主键集合"""
+        grams = trigrams(query, padded=False)
+        if grams:
+            posting_lists = sorted((self.postings.get(gram, set()) for gram in grams), key=len)
+            candidates = set.intersection(*posting_lists) if posting_lists[0] else set()
+        else:
+            # 一两个字符的查询无法切出三元组，直接扫描内存中的名称
+            candidates = self.docs.keys()
+        return {key for key in candidates if any(query in value for value in self.docs[key])}
+
+    def fuzzy(self, query, threshold, limit):
+        """按相似度倒序返回 [(主键, 相似度)]，只计算与查询至少共享一个三元组的记录"""
+        query_grams = trigrams(query)
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(self.postings.get(gram, ()))
+        # 共享三元组数决定相似度上限，先粗筛再精算
+        min_shared = threshold * len(query_grams)
+        scored = []
+        for key, count in shared.items():
+            if count < min_shared:
+                continue
+            score = max(similarity(query_grams, trigrams(value)) for value in self.docs[key])
+            if score >= threshold:
+                scored.append((key, score))
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return scored[:limit]
+
+class TrigramIndex:
+    """基因与蛋白质名称索引，search 模块在拼 SQL 之前先查询它"""
+
+    def __init__(self):
+        self.enabled = False
+        self.threshold = 0.3
+        self.refresh_interval = 0
+        self._indexes = {}
+        self._built_at = None
+        self._stale = True
+        self._lock = threading.RLock()
+
+    def init_app(self, app, session):
+        self.enabled = app.config.get('TRIGRAM_INDEX_ENABLED', True)
+        self.threshold = app.config.get('TRIGRAM_FUZZY_THRESHOLD', self.threshold)
+        self.refresh_interval = app.config.get('TRIGRAM_REFRESH_INTERVAL', self.refresh_interval)
+        if not self.enabled:
+            return
+        for model, key_column, columns in INDEXED.values():
+            write_tracker.watch(model, columns)
+        write_tracker.subscribe(self.apply_written)
+        # 启动时预加载；数据库暂不可用（如初始化建库）时推迟到首次查询
+        with app.app_context():
+            try:
+                self.rebuild(session)
+            except SQLAlchemyError as e:
+                session.rollback()
+                app.logger.warning(f'名称索引预加载失败，将在首次查询时重建: {e}')
+
+    def rebuild(self, session):
+        """从数据库整体加载，构建完成后一次性替换，查询不会看到半成品"""
+        indexes = {}
+        for category, (model, key_column, columns) in INDEXED.items():
+            index = _CategoryIndex()
+            for row in session.query(key_column, *columns).yield_per(5000):
+                index.add(row[0], row[1:])
+            indexes[category] = index
+        with self._lock:
+            self._indexes = indexes
+            self._built_at = time.time()
+            self._stale = False
+
+    def _outdated(self):
+        # 多进程部署时其他进程的写入无法感知，按 TRIGRAM_REFRESH_INTERVAL 定期重建
+        expired = bool(self.refresh_interval and self._built_at
+                       and time.time() - self._built_at > self.refresh_interval)
+        return self._stale or expired
+
+    def ready(self, session):
+        """索引可用时返回 True；过期则先重建"""
+        if not self.enabled:
+            return False
+        if self._outdated():
+            with self._lock:
+                if self._outdated():
+                    self.rebuild(session)
+        return True
+
+    def substring(self, category, query):
+        query = normalize(query)
+        with self._lock:
+            return self._indexes[category].substring(query) if query else set()
+
+    def fuzzy(self, category, query, limit=100, threshold=None):
+        query = normalize(query)
+        with self._lock:
+            if not query:
+                return []
+            return self._indexes[category].fuzzy(
+                query, self.threshold if threshold is None else threshold, limit)
+
+    def apply(self, changes):
+        """应用一次提交中的增删改：changes 为 [(类别, 主键, 字段值或 None)]"""
+        with self._lock:
+            if self._stale or not self._indexes:
+                return
+            for category, key, values in changes:
+                if values is None:
+                    self._indexes[category].remove(key)
+                else:
+                    self._indexes[category].add(key, values)
+
+    def apply_written(self, writes):
+        """写入追踪的回调：逐行记录的变化增量应用，无法逐行追踪的写入标记为过期"""
+        if any(table in TABLE_CATEGORIES for table in writes.untracked):
+            self.mark_stale()
+            return
+        changes = []
+        for row in writes.rows:
+            category = TABLE_CATEGORIES.get(row.table)
+            if category:
+                values = None if row.values is None else [row.values[column.key] for column in INDEXED[category][2]]
+                changes.append((category, row.key, values))
+        if changes:
+            self.apply(changes)
+
+    def mark_stale(self):
+        self._stale = True
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'stale': self._stale,
+                'built_at': self._built_at,
+                'documents': {category: len(index.docs) for category, index in self._indexes.items()},
+                'trigrams': {category: len(index.postings) for category, index in self._indexes.items()}
+            }
+
+name_index = TrigramIndex()
@@ -0,0 +1,156 @@
+from collections import namedtuple
+from sqlalchemy import event, inspect
+from sqlalchemy.sql.elements import TextClause
+
+# 会话写入追踪：收集一次事务写入了哪些表、哪些行，最外层事务提交后统一交给订阅者
+# （响应缓存、名称索引、补全索引），回滚则丢弃。
+# ORM 增删改在 flush 后逐行记录（此时新记录已有主键）；批量 INSERT/UPDATE/DELETE 与存储过程
+# 无法逐行追踪，只记录涉及的表，由订阅者决定失效还是标记过期。
+# 写入按 SAVEPOINT 分层记录：释放时并入外层，回滚时只丢弃该层。
+
+ALL_TABLES = ('Species', 'Genes', 'Proteins', 'Publications', 'Gene_Publications', 'Experimental_Data')
+
+# 存储过程 -> 受影响的表（通过 db.session.execute(text('CALL ...')) 调用，不经过 flush）
+PROCEDURE_TABLES = {
+    'deletespecieswithrelateddata': ALL_TABLES,
+    'updategeneandproteininfo': ('Genes', 'Proteins'),
+    'updatespeciesinfo': ('Species',)
+}
+
+# 一行变化：values 为订阅者关注的列（列属性名 -> 值），删除时为 None
+RowChange = namedtuple('RowChange', 'table key values')
+
+# 一次提交的写入：tables 为涉及的全部表，rows 为逐行变化，untracked 为无法逐行追踪的表
+WriteSet = namedtuple('WriteSet', 'tables rows untracked')
+
+class WriteTracker:
+    """会话写入的收集与分发"""
+
+    def __init__(self):
+        self._columns = {}      # 表名 -> 需要逐行记录的列属性名
+        self._subscribers = []
+
+    def init_app(self, app, session):
+        if not getattr(session, '_genobase_write_events', False):
+            _register_session_events(session, self)
+            session._genobase_write_events = True
+
+    def watch(self, model, columns):
+        """登记需要逐行记录的表及列"""
+        self._columns.setdefault(model.__tablename__, set()).update(column.key for column in columns)
+
+    def subscribe(self, callback):
+        """callback(WriteSet) 在最外层事务提交后调用"""
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def watched(self, model):
+        """需要逐行记录的列属性名"""
+        return sorted(self._columns.get(model.__tablename__, ()))
+
+    def record(self, session, changes):
+        """补报 flush 无法捕获的逐行变化（如批量插入后读回的新行），归入当前事务层
+
+        对应的批量语句需带 execution_options(report_rows=True)，否则整张表仍按无法逐行追踪处理。
+        """
+        writes = _pending(session)
+        for change in changes:
+            writes.tables.add(change.table)
+            writes.rows.append(change)
+
+    def snapshot(self, obj, deleted=False):
+        """ORM 对象的一行变化；不属于已登记的表时返回 None"""
+        table = getattr(obj, '__tablename__', None)
+        columns = self._columns.get(table)
+        if columns is None:
+            return None
+        # flush 后新记录的主键已写回属性，但尚未进入 identity
+        key = inspect(obj).mapper.primary_key_from_instance(obj)[0]
+        values = None if deleted else {column: getattr(obj, column) for column in columns}
+        return RowChange(table, key, values)
+
+    def notify(self, writes):
+        for callback in self._subscribers:
+            callback(writes)
+
+def _empty():
+    return WriteSet(set(), [], set())
+
+def _merge(target, source):
+    target.tables.update(source.tables)
+    target.rows.extend(source.rows)
+    target.untracked.update(source.untracked)
+
+def _level(sess):
+    """当前写入所属的层：最内层 SAVEPOINT，没有时为根事务"""
+    return sess.get_nested_transaction() or sess.get_transaction()
+
+def _pending(sess):
+    return sess.info.setdefault('pending_writes', {}).setdefault(_level(sess), _empty())
+
+def _register_session_events(session, tracker):
+
+    @event.listens_for(session, 'after_flush')
+    def collect_flushed(sess, flush_context):
+        writes = _pending(sess)
+        for deleted, objects in ((False, list(sess.new) + list(sess.dirty)), (True, list(sess.deleted))):
+            for obj in objects:
+                table = getattr(obj, '__tablename__', None)
+                if table is None:
+                    continue
+                writes.tables.add(table)
+                change = tracker.snapshot(obj, deleted)
+                if change is not None:
+                    writes.rows.append(change)
+
+    @event.listens_for(session, 'do_orm_execute')
+    def collect_executed(orm_execute_state):
+        if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+            mapper = orm_execute_state.bind_mapper
+            if mapper is None:
+                return
+            tables = {mapper.local_table.name}
+        elif isinstance(orm_execute_state.statement, TextClause):
+            sql = orm_execute_state.statement.text.strip().lower()
+            if not sql.startswith('call '):
+                return
+            procedure = sql[5:].split('(', 1)[0].strip()
+            tables = set(PROCEDURE_TABLES.get(procedure, ALL_TABLES))
+        else:
+            return
+        writes = _pending(orm_execute_state.session)
+        writes.tables.update(tables)
+        # 调用方承诺通过 record 补报逐行变化的语句不算无法追踪
+        if not orm_execute_state.execution_options.get('report_rows'):
+            writes.untracked.update(tables)
+
+    @event.listens_for(session, 'after_commit')
+    def publish_committed(sess):
+        levels = sess.info.get('pending_writes', {})
+        nested = sess.get_nested_transaction()
+        if nested is not None:
+            # 释放 SAVEPOINT：并入外层
+            writes = levels.pop(nested, None)
+            if writes is not None:
+                parent = nested.parent
+                while parent.parent is not None and not parent.nested:
+                    parent = parent.parent
+                _merge(levels.setdefault(parent, _empty()), writes)
+            return
+        writes = _empty()
+        for level in list(levels.values()):
+            _merge(writes, level)
+        levels.clear()
+        if writes.tables:
+            tracker.notify(writes)
+
+    @event.listens_for(session, 'after_transaction_end')
+    def discard_ended(sess, transaction):
+        # 已提交的层在 after_commit 中取走；仍留下的是回滚的层
+        levels = sess.info.get('pending_writes')
+        if levels:
+            levels.pop(transaction, None)
+            if transaction.parent is None:
+                levels.clear()
+
+write_tracker = WriteTracker()
@@ -0,0 +1,4 @@
+from app.api.aio import create_async_app
+
+# 只读 API 的异步服务入口：uvicorn asgi:app --workers 4
+app = create_async_app()
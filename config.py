@@ -12,6 +12,91 @@ class Config:
     
     # 分页设置
     POSTS_PER_PAGE = 10
+    API_MAX_PER_PAGE = 100  # API 列表接口 per_page 上限
+    API_BATCH_MAX_KEYS = 5000  # 批量查询接口单次最多键数
+    API_BATCH_CHUNK_SIZE = 500  # 批量查询每条 IN (...) 语句的键数
+    API_BULK_MAX_ROWS = 5000  # 批量写入接口单次最多行数
+    API_BULK_CHUNK_SIZE = 500  # 批量写入每条多行 INSERT 的行数（每块一个 SAVEPOINT）
+    API_CHANGES_MAX_LIMIT = 1000  # 变更流单页最多条数
+    CHANGES_SETTLE_SECONDS = 5  # 变更流只返回早于该秒数的变更，给未提交的事务留出沉淀时间
+    # 删除墓碑保留天数，0 为永久保留；超出的由 scripts/reconcile_counters.py 清理，
+    # 游标停留超过该期限的客户端收到 410，需全量重新同步
+    CHANGES_TOMBSTONE_RETENTION_DAYS = int(os.environ.get('CHANGES_TOMBSTONE_RETENTION_DAYS') or 90)
+    API_REGION_MAX_GENES = 1000  # 区间查询最多返回的重叠基因数
+    API_REGION_MAX_NEIGHBORS = 50  # 区间查询上下游各最多返回的最近基因数
+    ANNOTATE_CHUNK_ROWS = 100000  # BED 注释每块向量化查询的行数
+    ANNOTATE_CACHE_SPECIES = 8  # 进程内最多缓存区间索引的物种数
+    MOTIF_INDEX_PATH = os.environ.get('MOTIF_INDEX_PATH')  # 基序 FM 索引目录，默认 instance/motif_index
+    MOTIF_MIN_LENGTH = 6  # 基序搜索的最短长度
+    API_MOTIF_MAX_HITS = 10000  # 基序搜索最多返回的命中位置数（计数始终精确）
+    SIMILARITY_INDEX_PATH = os.environ.get('SIMILARITY_INDEX_PATH')  # k-mer 矩阵目录，默认 instance/similarity_index
+    SIMILARITY_WORKERS = int(os.environ.get('SIMILARITY_WORKERS') or 0)  # 相似度扫描进程池大小，0 为在请求线程内扫描
+    SIMILARITY_SHARD_ROWS = 200000  # 启用进程池时每个分片的行数，行数不超过该值时不分片
+    API_SIMILAR_MAX_LIMIT = 100  # 相似度搜索最多返回的条数
+    # 比对进程池大小，0 为在请求线程内计算；池在每个 worker 进程内各建一个，多 worker 部署时保持为 0 或设小值
+    ALIGN_WORKERS = int(os.environ.get('ALIGN_WORKERS') or 0)
+    ALIGN_BATCH_SIZE = 32  # 每批同时比对的目标序列数（也是分发给进程池的单位）
+    ALIGN_PARALLEL_MIN_CELLS = 5_000_000  # 计算量（查询长度 × 目标总长）达到该值才分发到进程池
+    ALIGN_CACHE_SIZE = 100000  # 比对结果缓存条数，按 (打分方案, 查询哈希, 目标哈希) 缓存
+    ALIGN_MAX_QUERY_LENGTH = 10000  # 比对查询序列的最大长度
+    ALIGN_MAX_CANDIDATES = 1000  # 单次比对的最多候选序列数
+    # 单次比对的计算量上限（基因计入两条链）；NumPy 内核单进程约 6000 万单元/秒，默认约 5 秒内完成
+    ALIGN_MAX_CELLS = int(os.environ.get('ALIGN_MAX_CELLS') or 300_000_000)
+    FASTA_LINE_WIDTH = 60  # 序列下载 FASTA 每行字符数
+    SEARCH_CATEGORY_LIMIT = 100  # 搜索时每个类别最多参与排序的条数
+    
+    # API 密钥缓存
+    API_KEY_CACHE_SIZE = 1024
+    API_KEY_CACHE_TTL = 60  # 秒；多进程部署时即禁用/重置密钥在其他进程生效的最长延迟
+
+    # API 限流：每个密钥一个令牌桶（rate 为每秒补充令牌数，burst 为桶容量）加并发请求上限
+    # 后端 memory 为进程内计数；disk 为 SQLite 文件，多个 worker 共享；none 关闭限流
+    API_RATE_LIMIT_BACKEND = os.environ.get('API_RATE_LIMIT_BACKEND') or 'memory'
+    API_RATE_LIMIT_PATH = os.environ.get('API_RATE_LIMIT_PATH')  # 默认 instance/api_ratelimit.sqlite
+    API_RATE_LIMITS = {
+        'standard': {'rate': 5.0, 'burst': 20, 'concurrency': 4},
+        'premium': {'rate': 20.0, 'burst': 60, 'concurrency': 16}
+    }
+    # 较重的端点按多个令牌计费（端点名 -> 令牌数），未列出的为 1
+    API_RATE_LIMIT_COSTS = {
+        'api.search_api': 2,
+        'api.export_entity': 5,
+        'api.batch_lookup': 3,
+        'api.get_sequences': 3,
+        'api.bulk_insert': 10,
+        'api.annotate_bed': 10,
+        'api.search_motif': 2,
+        'api.similar_to_entity': 3,
+        'api.similar_to_sequence': 3,
+        'api.align_sequences': 10
+    }
+    
+    # API 响应缓存：memory（进程内 LRU）/ disk（本机多 worker 共享的 SQLite 文件）/ none
+    API_CACHE_BACKEND = os.environ.get('API_CACHE_BACKEND') or 'memory'
+    API_CACHE_PATH = os.environ.get('API_CACHE_PATH')  # 默认 instance/api_cache.sqlite
+    API_CACHE_SIZE = 2048
+    API_CACHE_TTL = 300  # 秒
+    
+    # 基因/蛋白质名称三元组索引（进程内）
+    TRIGRAM_INDEX_ENABLED = True
+    TRIGRAM_FUZZY_THRESHOLD = 0.3  # 容错匹配的最低相似度
+    TRIGRAM_MAX_IDS = 5000  # 子串命中超过该数量时改用 SQL 匹配
+    TRIGRAM_REFRESH_INTERVAL = 600  # 秒；多进程部署时其他进程写入的最长可见延迟，0 表示不定期重建
+    
+    # API 响应编码：auto 时安装了 orjson 就使用，否则用标准库 json
+    API_JSON_BACKEND = os.environ.get('API_JSON_BACKEND') or 'auto'
+    API_COMPRESS_MIN_SIZE = 1024  # 字节；超过该大小的响应按 Accept-Encoding 压缩
+    API_COMPRESS_LEVEL = 6
+    
+    # 搜索输入提示（/api/suggest）
+    SUGGEST_MAX_LIMIT = 50  # 也是短前缀预先排好的名次数
+    SUGGEST_PREFIX_LENGTH = 3  # 不超过该长度的前缀直接读预先排好的前 SUGGEST_MAX_LIMIT 名
+    SUGGEST_REFRESH_INTERVAL = 600  # 秒，含义同上
+    
+    # 异步只读 API（asgi.py）：未配置时由 SQLALCHEMY_DATABASE_URI 换成 aiomysql 驱动
+    ASYNC_DATABASE_URL = os.environ.get('ASYNC_DATABASE_URL')
+    ASYNC_POOL_SIZE = 20
+    ASYNC_MAX_OVERFLOW = 20
     
     # 上传文件配置
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB 
\ No newline at end of file
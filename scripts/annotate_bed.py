@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+用 GenoBase 基因注释 BED 文件（与 POST /api/annotate 相同的逻辑，直接连库，适合数百万行的离线任务）。
+
+每行追加重叠基因数、基因 ID 与符号；--nearest 时无重叠的行再追加最近基因及距离。
+输入可为 .gz 压缩文件，省略或为 - 时读取标准输入：
+    python scripts/annotate_bed.py --species-id 1 variants.bed -o variants.annotated.bed
+    zcat calls.bed.gz | python scripts/annotate_bed.py --species-id 1 --nearest > calls.annotated.bed
+"""
+
+import argparse
+import gzip
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.annotate import gene_intervals, annotate_lines, header
+
+def _open_input(path):
+    if path in (None, '-'):
+        return sys.stdin
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', errors='replace')
+    return open(path, encoding='utf-8', errors='replace')
+
+def main():
+    parser = argparse.ArgumentParser(description='用 GenoBase 基因注释 BED 文件')
+    parser.add_argument('input', nargs='?', help='BED 文件（.gz 自动解压），默认标准输入')
+    parser.add_argument('--species-id', type=int, required=True, help='基因所属物种 ID')
+    parser.add_argument('--nearest', action='store_true', help='无重叠时报告最近的基因')
+    parser.add_argument('-o', '--output', help='输出文件，默认标准输出')
+    parser.add_argument('--chunk-rows', type=int, help='每块向量化查询的行数，默认取 ANNOTATE_CHUNK_ROWS')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        started = time.time()
+        index = gene_intervals.get(db.session, args.species_id)
+        print(f'已载入 {len(index.ids)} 个基因（{len(index.chromosomes)} 条染色体），'
+              f'用时 {time.time() - started:.2f}s', file=sys.stderr)
+        chunk_rows = args.chunk_rows or app.config['ANNOTATE_CHUNK_ROWS']
+
+    started = time.time()
+    rows = 0
+    source = _open_input(args.input)
+    target = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        target.write(header(args.nearest) + '\n')
+        for line in annotate_lines(index, source, chunk_rows, args.nearest):
+            target.write(line + '\n')
+            rows += 1
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+    elapsed = time.time() - started
+    print(f'输出 {rows} 行，用时 {elapsed:.2f}s（{rows / elapsed if elapsed else 0:.0f} 行/秒）', file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Smith-Waterman 比对引擎（/api/align）的吞吐量基准，以每秒单元更新数（CUPS）计。
+
+用随机序列（或 --from-db 时取库中的蛋白质序列）作为目标集，分别测量：
+单批 NumPy 内核、按 ALIGN_BATCH_SIZE 分批串行、以及不同大小的进程池并行；每次运行前清空结果缓存。
+    python scripts/benchmark_align.py
+    python scripts/benchmark_align.py --entity genes --query-length 1000 --targets 500 --workers 1 2 4 8
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.api.align import AlignmentService, SCHEMES, encode, align_batch
+
+def _random_sequence(alphabet, length):
+    return ''.join(random.choice(alphabet) for _ in range(length))
+
+def _load_targets(count):
+    from sqlalchemy import select
+    from app import create_app, db
+    from app.models import Proteins
+    app = create_app()
+    with app.app_context():
+        rows = db.session.execute(select(Proteins.protein_id, Proteins.amino_acid_sequence).where(
+            Proteins.amino_acid_sequence.isnot(None)).limit(count)).all()
+    return [(key, sequence) for key, sequence in rows]
+
+def _report(label, cells, elapsed):
+    print(f'{label:<28} {elapsed:8.3f}s  {cells / elapsed / 1e6:10.1f} MCUPS')
+
+def main():
+    parser = argparse.ArgumentParser(description='Smith-Waterman 比对吞吐量基准（CUPS）')
+    parser.add_argument('--entity', choices=list(SCHEMES), default='proteins', help='打分方案')
+    parser.add_argument('--query-length', type=int, default=300)
+    parser.add_argument('--targets', type=int, default=1000, help='目标序列数')
+    parser.add_argument('--min-length', type=int, default=100)
+    parser.add_argument('--max-length', type=int, default=600)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, 4], help='进程池大小，可给多个')
+    parser.add_argument('--from-db', action='store_true', help='使用库中的蛋白质序列作为目标')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    scheme = SCHEMES[args.entity]
+    # 只用标准残基 / 碱基生成随机序列
+    letters = 'ACGT' if args.entity == 'genes' else scheme.alphabet[:20]
+    query = _random_sequence(letters, args.query_length)
+    if args.from_db:
+        targets = _load_targets(args.targets)
+    else:
+        targets = [(i, _random_sequence(letters, random.randint(args.min_length, args.max_length)))
+                   for i in range(args.targets)]
+    cells = len(query) * sum(len(sequence) for _, sequence in targets)
+    print(f'查询长度 {len(query)}，目标 {len(targets)} 条，共 {cells / 1e6:.1f} M 个单元')
+
+    # 单批内核：取前 batch_size 条，衡量向量化本身的效率
+    sample = targets[:args.batch_size]
+    sample_cells = len(query) * sum(len(sequence) for _, sequence in sample)
+    started = time.perf_counter()
+    align_batch(args.entity, encode(query, scheme), [encode(sequence, scheme) for _, sequence in sample])
+    _report(f'单批内核（{len(sample)} 条）', sample_cells, time.perf_counter() - started)
+
+    service = AlignmentService()
+    service.batch_size = args.batch_size
+    started = time.perf_counter()
+    service.align(args.entity, query, targets, parallel=False)
+    _report('分批串行', cells, time.perf_counter() - started)
+
+    started = time.perf_counter()
+    service.align(args.entity, query, targets)
+    print(f'{"缓存命中":<28} {time.perf_counter() - started:8.3f}s')
+
+    for workers in args.workers:
+        service = AlignmentService()
+        service.batch_size = args.batch_size
+        service.workers = workers
+        # 先预热进程池，排除进程启动开销
+        service._executor().submit(align_batch, args.entity, encode('A', scheme), []).result()
+        started = time.perf_counter()
+        service.align(args.entity, query, targets, parallel=True)
+        _report(f'进程池 {workers} 进程', cells, time.perf_counter() - started)
+        service._pool.shutdown()
+
+if __name__ == '__main__':
+    main()
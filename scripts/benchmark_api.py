@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+对比同步（Flask）与异步（asgi.py）只读 API 的吞吐量。
+
+先分别启动两个服务，并关闭限流与响应缓存（否则所有客户端共用一个密钥，测到的是 429 和缓存命中的速度），例如：
+    export API_RATE_LIMIT_BACKEND=none API_CACHE_BACKEND=none
+    gunicorn -w 4 -b 127.0.0.1:5000 run:app
+    uvicorn asgi:app --workers 4 --port 8000
+再运行：
+    python scripts/benchmark_api.py --api-key <密钥> \
+        --target sync=http://127.0.0.1:5000 --target async=http://127.0.0.1:8000
+
+每个并发级别下启动 N 个长连接客户端，在 --duration 秒内循环请求，统计 requests/sec 与延迟分位数。
+压测前逐个路径探测一次：返回非 200，或响应带 X-RateLimit-* / X-Cache 头（限流或缓存未关闭）时直接退出。
+429 与其他错误分开计数；某一级别非 200 响应超过 --max-error-rate 时以非零状态退出。
+客户端只用标准库 asyncio 实现 HTTP/1.1 keep-alive，不引入额外依赖；
+1000 并发需要足够的文件描述符（ulimit -n）。
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Dict, List, Tuple
+from urllib.parse import urlsplit
+
+DEFAULT_PATHS = [
+    '/api/genes?per_page=20',
+    '/api/species?per_page=20',
+    '/api/proteins?per_page=20',
+    '/api/publications?per_page=20',
+]
+
+class BenchmarkClient:
+    """单个长连接客户端，循环发送请求直到截止时间"""
+
+    def __init__(self, base_url: str, api_key: str, paths: List[str]):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.api_key = api_key
+        self.paths = paths
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.rate_limited = 0
+
+    async def _connect(self):
+        return await asyncio.open_connection(self.host, self.port)
+
+    async def _request(self, reader, writer, path: str) -> Tuple[int, Dict[str, str], bool]:
+        """发送一次请求并读完响应，返回 (状态码, 响应头, 连接是否可复用)"""
+        writer.write((
+            f'GET {path} HTTP/1.1\r\n'
+            f'Host: {self.host}:{self.port}\r\n'
+            f'X-API-KEY: {self.api_key}\r\n'
+            'Connection: keep-alive\r\n\r\n'
+        ).encode('ascii'))
+        await writer.drain()
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError('连接已关闭')
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if headers.get('transfer-encoding') == 'chunked':
+            while True:
+                size = int((await reader.readline()).strip(), 16)
+                await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        else:
+            await reader.readexactly(int(headers.get('content-length', 0)))
+        keep_alive = headers.get('connection', '').lower() != 'close' and b'HTTP/1.0' not in status_line
+        return status, headers, keep_alive
+
+    async def run(self, deadline: float):
+        reader = writer = None
+        i = 0
+        while time.perf_counter() < deadline:
+            if writer is None:
+                try:
+                    reader, writer = await self._connect()
+                except OSError:
+                    self.errors += 1
+                    await asyncio.sleep(0.05)
+                    continue
+            path = self.paths[i % len(self.paths)]
+            i += 1
+            started = time.perf_counter()
+            try:
+                status, _, keep_alive = await self._request(reader, writer, path)
+            except (ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+                # 连接中途断开：重连，本次计为错误
+                self.errors += 1
+                writer.close()
+                reader = writer = None
+                continue
+            if status == 200:
+                self.latencies.append(time.perf_counter() - started)
+            elif status == 429:
+                self.rate_limited += 1
+            else:
+                self.errors += 1
+            if not keep_alive:
+                writer.close()
+                reader = writer = None
+        if writer is not None:
+            writer.close()
+
+async def run_level(base_url: str, api_key: str, paths: List[str],
+                    concurrency: int, duration: float) -> Dict[str, float]:
+    """以给定并发数压测一个服务，返回吞吐量与延迟统计"""
+    clients = [BenchmarkClient(base_url, api_key, paths) for _ in range(concurrency)]
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(client.run(deadline) for client in clients))
+    elapsed = time.perf_counter() - started
+    latencies = sorted(latency for client in clients for latency in client.latencies)
+    errors = sum(client.errors for client in clients)
+    rate_limited = sum(client.rate_limited for client in clients)
+    if not latencies:
+        return {'rps': 0.0, 'p50': 0.0, 'p99': 0.0, 'mean': 0.0, 'errors': errors, 'rate_limited': rate_limited,
+                'requests': 0}
+    return {
+        'rps': len(latencies) / elapsed,
+        'p50': latencies[len(latencies) // 2] * 1000,
+        'p99': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        'mean': statistics.mean(latencies) * 1000,
+        'errors': errors,
+        'rate_limited': rate_limited,
+        'requests': len(latencies)
+    }
+
+async def probe(base_url: str, api_key: str, path: str) -> Tuple[int, Dict[str, str]]:
+    """单独请求一次，返回 (状态码, 响应头)"""
+    client = BenchmarkClient(base_url, api_key, [path])
+    reader, writer = await client._connect()
+    try:
+        status, headers, _ = await client._request(reader, writer, path)
+    finally:
+        writer.close()
+    return status, headers
+
+def check_target(name: str, url: str, api_key: str, paths: List[str]):
+    """确认服务可用且已关闭限流与响应缓存，否则直接退出"""
+    problems = []
+    for path in paths:
+        try:
+            status, headers = asyncio.run(probe(url, api_key, path))
+        except OSError as e:
+            raise SystemExit(f'{name}: 无法连接 {url}：{e}')
+        if status != 200:
+            problems.append(f'{path} 返回 {status}')
+        if any(header.startswith('x-ratelimit-') for header in headers):
+            problems.append(f'{path} 带有限流响应头，请以 API_RATE_LIMIT_BACKEND=none 启动')
+        if 'x-cache' in headers:
+            problems.append(f'{path} 带有 X-Cache 响应头，请以 API_CACHE_BACKEND=none 启动')
+    if problems:
+        raise SystemExit(f'{name} ({url}) 不适合压测：\n  ' + '\n  '.join(dict.fromkeys(problems)))
+
+def parse_targets(values: List[str]) -> List[Tuple[str, str]]:
+    targets = []
+    for value in values:
+        name, _, url = value.partition('=')
+        if not url:
+            raise SystemExit(f'--target 格式应为 名称=URL：{value}')
+        targets.append((name, url.rstrip('/')))
+    return targets
+
+def main():
+    parser = argparse.ArgumentParser(description='同步 / 异步只读 API 吞吐量对比')
+    parser.add_argument('--target', action='append', required=True,
+                        help='名称=基础URL，可重复，如 sync=http://127.0.0.1:5000')
+    parser.add_argument('--api-key', required=True, help='用于请求的 API 密钥')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[50, 200, 1000],
+                        help='并发客户端数（默认 50 200 1000）')
+    parser.add_argument('--duration', type=float, default=15.0, help='每个并发级别的压测秒数')
+    parser.add_argument('--warmup', type=float, default=3.0, help='每个服务正式压测前的预热秒数')
+    parser.add_argument('--path', action='append', help='请求路径，可重复；默认轮询四个列表接口')
+    parser.add_argument('--max-error-rate', type=float, default=0.5,
+                        help='单个并发级别允许的非 200 响应比例，超过则以非零状态退出（默认 0.5）')
+    args = parser.parse_args()
+
+    targets = parse_targets(args.target)
+    paths = args.path or DEFAULT_PATHS
+
+    for name, url in targets:
+        check_target(name, url, args.api_key, paths)
+
+    rows = []
+    for name, url in targets:
+        # 预热：填充连接池与 API 密钥缓存
+        asyncio.run(run_level(url, args.api_key, paths, 10, args.warmup))
+        for concurrency in args.concurrency:
+            result = asyncio.run(run_level(url, args.api_key, paths, concurrency, args.duration))
+            rows.append((name, concurrency, result))
+            print(f'{name:>8} c={concurrency:<5} {result["rps"]:>9.1f} req/s  '
+                  f'p50={result["p50"]:.1f}ms  p99={result["p99"]:.1f}ms  '
+                  f'429={result["rate_limited"]}  errors={result["errors"]}')
+            failed = result['errors'] + result['rate_limited']
+            total = failed + result['requests']
+            if total and failed > total * args.max_error_rate:
+                raise SystemExit(f'{name} c={concurrency}: {failed}/{total} 个响应不是 200'
+                                 f'（429: {result["rate_limited"]}），吞吐量没有意义，终止压测')
+
+    print('\n并发数     ' + ''.join(f'{name:>14}' for name, _ in targets) + '   (requests/sec)')
+    for concurrency in args.concurrency:
+        line = f'{concurrency:<10} '
+        for name, _ in targets:
+            result = next(r for n, c, r in rows if n == name and c == concurrency)
+            line += f'{result["rps"]:>14.1f}'
+        print(line)
+
+if __name__ == '__main__':
+    main()
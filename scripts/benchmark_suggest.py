@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+输入提示（/api/suggest）的补全延迟基准。
+
+用随机基因符号（或 --from-db 时取库中某一类别的名称）建立补全索引，对 1 至 4 个字符的前缀各查询若干次，
+输出 p50 / p99 延迟；同时给出不用预先排名、按前缀区间逐个比较的耗时作对照。
+短前缀（不超过 SUGGEST_PREFIX_LENGTH）命中的名称最多，应读预先排好的名次，与名称总数无关：
+    python scripts/benchmark_suggest.py
+    python scripts/benchmark_suggest.py --from-db --category gene
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.suggest import _SortedIndex, SOURCES
+
+def _load_rows(category):
+    from app import create_app, db
+    key_column, columns = SOURCES[category]
+    app = create_app()
+    with app.app_context():
+        return [(row[0], row[1:]) for row in db.session.query(key_column, *columns).yield_per(5000)]
+
+def _percentile(samples, q):
+    return sorted(samples)[min(len(samples) - 1, int(len(samples) * q))]
+
+def _measure(complete, prefix, limit, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        complete(prefix, limit)
+        samples.append(time.perf_counter() - started)
+    return _percentile(samples, 0.5), _percentile(samples, 0.99)
+
+def main():
+    parser = argparse.ArgumentParser(description='输入提示补全延迟基准')
+    parser.add_argument('--names', type=int, default=300000, help='随机名称数')
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--top-size', type=int, default=50, help='同 SUGGEST_MAX_LIMIT')
+    parser.add_argument('--prefix-length', type=int, default=3, help='同 SUGGEST_PREFIX_LENGTH')
+    parser.add_argument('--repeat', type=int, default=2000, help='每个前缀的查询次数')
+    parser.add_argument('--from-db', action='store_true', help='使用库中的名称')
+    parser.add_argument('--category', choices=list(SOURCES), default='gene')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    if args.from_db:
+        rows = _load_rows(args.category)
+    else:
+        letters = 'ABCDEFGHIKLMNPRSTZ0123456789'
+        rows = [(i, (''.join(random.choice(letters) for _ in range(random.randint(3, 8))),))
+                for i in range(args.names)]
+    started = time.perf_counter()
+    index = _SortedIndex(rows, args.top_size, args.prefix_length)
+    print(f'{len(index)} 个名称，建索引用时 {time.perf_counter() - started:.2f}s')
+
+    names = list(index.keys)
+    print(f'{"前缀":<10} {"命中":>8} {"p50":>10} {"p99":>10} {"逐个比较 p99":>14}')
+    for length in range(1, 5):
+        prefix = random.choice(names)[:length]
+        matches = sum(1 for name in names if name.startswith(prefix))
+        p50, p99 = _measure(index.complete, prefix, args.limit, args.repeat)
+        _, scan_p99 = _measure(index._scan, prefix, args.limit, max(1, args.repeat // 20))
+        print(f'{prefix:<10} {matches:>8} {p50 * 1e6:>8.1f}us {p99 * 1e6:>8.1f}us {scan_p99 * 1e6:>12.1f}us')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+重建基序搜索（/api/sequences/search）使用的 FM 索引。
+
+读取全部基因序列构建后缀数组、BWT 与 Occ 表，写入 MOTIF_INDEX_PATH 下的新版本目录后原子切换，
+各 worker 在下一次查询时自动改用新版本。构建之后新增或修改的基因由增量侧索引在查询时补充，
+侧索引变大（见 /api/status/details 中的 motif_index.side_genes）后再次运行本脚本即可，适合放入 cron：
+    python scripts/build_motif_index.py
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.api.motif import motif_index, build_index
+
+def main():
+    parser = argparse.ArgumentParser(description='重建基序搜索 FM 索引')
+    parser.add_argument('--path', help='索引目录，默认取 MOTIF_INDEX_PATH（instance/motif_index）')
+    args = parser.parse_args()
+
+    app = create_app()
+    path = args.path or motif_index.path
+    os.makedirs(path, exist_ok=True)
+    with app.app_context():
+        meta = build_index(db.session, path, app.config['CHANGES_SETTLE_SECONDS'], log=print)
+        db.session.rollback()
+    print(f'索引已写入 {path}：{meta["genes"]} 条基因，{meta["length"]} 字节，快照时间 {meta["snapshot_at"]}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+重建 k-mer 相似度搜索（/api/<genes|proteins>/<id>/similar）使用的稀疏矩阵。
+
+蛋白质按 3-mer、基因按 6-mer 计数，结果写入 SIMILARITY_INDEX_PATH/<实体>/ 下的新版本后原子切换，
+各 worker 在下一次查询时自动改用新版本。构建之后变化的序列在查询时重新计分，变化行数越多查询越慢，
+适合放入 cron 定期重建：
+    python scripts/build_similarity_index.py                    # 蛋白质与基因
+    python scripts/build_similarity_index.py --entity proteins
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.api.similarity import similarity_index, build_index, KMER_SPECS
+
+def main():
+    parser = argparse.ArgumentParser(description='重建 k-mer 相似度索引')
+    parser.add_argument('--entity', choices=list(KMER_SPECS), action='append',
+                        help='只重建指定实体，可重复；默认全部')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        for entity in args.entity or list(KMER_SPECS):
+            path = similarity_index.entity_path(entity)
+            meta = build_index(db.session, entity, path, log=print)
+            db.session.rollback()
+            print(f'{entity} 索引已写入 {path}：{meta["rows"]} 行，k={meta["k"]}')
+
+if __name__ == '__main__':
+    main()
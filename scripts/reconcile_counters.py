@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+校正冗余计数列（Species.gene_count、Genes.protein_count / publication_count、Publications.gene_count），
+并清理超出 CHANGES_TOMBSTONE_RETENTION_DAYS 的删除墓碑（Deleted_Records）。
+
+计数平时由触发器维护；绕过触发器的写入（如触发器部署前已有的数据、手工修改）会产生偏差，
+本脚本按子表实际行数批量修复，每个计数列一条 UPDATE，只改有偏差的行。可放入 cron 定期运行：
+    python scripts/reconcile_counters.py            # 修复并输出各列修复行数
+    python scripts/reconcile_counters.py --dry-run  # 只统计偏差与可清理的墓碑，不修改
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.counters import reconcile
+from app.changes import prune_tombstones
+
+def main():
+    parser = argparse.ArgumentParser(description='校正冗余计数列')
+    parser.add_argument('--dry-run', action='store_true', help='只统计偏差行数，不修改')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        drift = reconcile(db.session, dry_run=args.dry_run)
+        retention = app.config['CHANGES_TOMBSTONE_RETENTION_DAYS']
+        pruned = prune_tombstones(db.session, retention, dry_run=args.dry_run)
+        if args.dry_run:
+            db.session.rollback()
+        else:
+            db.session.commit()
+    for name, rows in drift.items():
+        print(f'{name:<32} {"偏差" if args.dry_run else "已修复"} {rows} 行')
+    if retention:
+        print(f'{"Deleted_Records":<32} {"可清理" if args.dry_run else "已清理"} {pruned} 行（保留 {retention} 天）')
+
+if __name__ == '__main__':
+    main()
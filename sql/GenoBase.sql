@@ -70,6 +70,7 @@ CREATE TABLE IF NOT EXISTS Species (
     common_name VARCHAR(100),
     taxonomy_id VARCHAR(50),
     description TEXT,
+    gene_count INT NOT NULL DEFAULT 0, -- 冗余计数，由触发器维护
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
 );
@@ -77,6 +78,7 @@ CREATE TABLE IF NOT EXISTS Species (
 -- 物种表索引
 CREATE INDEX  idx_species_name ON Species(scientific_name);
 CREATE INDEX  idx_species_taxonomy ON Species(taxonomy_id);
+CREATE INDEX  idx_species_updated ON Species(updated_at); -- 变更流，InnoDB 二级索引隐含主键即 (updated_at, species_id)
 
 -- 3. 基因表
 CREATE TABLE IF NOT EXISTS Genes (
@@ -88,7 +90,10 @@ CREATE TABLE IF NOT EXISTS Genes (
     start_position INT,
     end_position INT,
     strand ENUM('+', '-'),
+    bin INT, -- UCSC 分箱号，由触发器维护
     species_id INT,
+    protein_count INT NOT NULL DEFAULT 0, -- 冗余计数，由触发器维护
+    publication_count INT NOT NULL DEFAULT 0, -- 冗余计数，由触发器维护
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (species_id) REFERENCES Species(species_id)
@@ -99,6 +104,11 @@ CREATE INDEX  idx_genes_name ON Genes(gene_name);
 CREATE INDEX  idx_genes_symbol ON Genes(gene_symbol);
 CREATE INDEX  idx_genes_species ON Genes(species_id);
 CREATE INDEX  idx_genes_chromosome ON Genes(chromosome);
+CREATE INDEX  idx_genes_updated ON Genes(updated_at);
+-- 区间查询：重叠查询走分箱索引，最近邻查询分别按起点、终点有序扫描
+CREATE INDEX  idx_genes_region ON Genes(species_id, chromosome, bin, start_position);
+CREATE INDEX  idx_genes_region_start ON Genes(species_id, chromosome, start_position);
+CREATE INDEX  idx_genes_region_end ON Genes(species_id, chromosome, end_position);
 
 -- 4. 蛋白质表
 CREATE TABLE IF NOT EXISTS Proteins (
@@ -116,6 +126,7 @@ CREATE TABLE IF NOT EXISTS Proteins (
 CREATE INDEX  idx_proteins_name ON Proteins(protein_name);
 CREATE INDEX  idx_proteins_uniprot ON Proteins(uniprot_id);
 CREATE INDEX  idx_proteins_gene ON Proteins(gene_id);
+CREATE INDEX  idx_proteins_updated ON Proteins(updated_at);
 
 -- 5. 文献表
 CREATE TABLE IF NOT EXISTS Publications (
@@ -125,6 +136,7 @@ CREATE TABLE IF NOT EXISTS Publications (
     journal VARCHAR(100),
     publication_year INT,
     doi VARCHAR(100),
+    gene_count INT NOT NULL DEFAULT 0, -- 冗余计数，由触发器维护
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
 );
@@ -133,6 +145,10 @@ CREATE TABLE IF NOT EXISTS Publications (
 CREATE INDEX  idx_publications_title ON Publications(title);
 CREATE INDEX  idx_publications_doi ON Publications(doi);
 CREATE INDEX  idx_publications_year ON Publications(publication_year);
+CREATE INDEX  idx_publications_updated ON Publications(updated_at);
+-- 全文索引：标题/作者/期刊/DOI（/api/publications?q= 与统一搜索使用）
+-- 注意：InnoDB 默认 innodb_ft_min_token_size=3，更短的基因符号需调小该参数后重建索引
+CREATE FULLTEXT INDEX ft_publications ON Publications(title, authors, journal, doi);
 
 -- 6. 基因-文献关联表
 CREATE TABLE IF NOT EXISTS Gene_Publications (
@@ -160,6 +176,19 @@ CREATE TABLE IF NOT EXISTS Experimental_Data (
 -- 实验数据表索引
 CREATE INDEX  idx_experiments_gene ON Experimental_Data(gene_id);
 CREATE INDEX  idx_experiments_publication ON Experimental_Data(publication_id);
+CREATE INDEX  idx_experiments_updated ON Experimental_Data(updated_at);
+
+-- 8. 删除墓碑表（由 advanced_features.sql 中的 AFTER DELETE 触发器写入，/api/changes 使用）
+-- 基因-文献关联的增删也记录在此：entity_type = 'gene_publications'，entity_id 为 gene_id，related_id 为 publication_id
+CREATE TABLE IF NOT EXISTS Deleted_Records (
+    tombstone_id INT PRIMARY KEY AUTO_INCREMENT,
+    entity_type VARCHAR(32) NOT NULL,
+    entity_id INT NOT NULL,
+    related_id INT NULL,
+    deleted_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX  idx_deleted_records_time ON Deleted_Records(deleted_at);
 
 -- 添加注释
 ALTER TABLE Users COMMENT '用户信息表';
@@ -168,4 +197,5 @@ ALTER TABLE Genes COMMENT '基因信息表';
 ALTER TABLE Proteins COMMENT '蛋白质信息表';
 ALTER TABLE Publications COMMENT '文献信息表';
 ALTER TABLE Gene_Publications COMMENT '基因-文献关联表';
-ALTER TABLE Experimental_Data COMMENT '实验数据表'; 
\ No newline at end of file
+ALTER TABLE Experimental_Data COMMENT '实验数据表';
+ALTER TABLE Deleted_Records COMMENT '删除墓碑表'; 
\ No newline at end of file
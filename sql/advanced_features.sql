@@ -223,17 +223,25 @@ BEGIN
     ELSE
         START TRANSACTION;
         
+        -- 先取出该物种的基因ID：Proteins / Gene_Publications 上的计数触发器会更新 Genes，
+        -- 同一条语句不能再读取 Genes（MySQL 错误 1442），因此不在 DELETE 中直接子查询 Genes
+        DROP TEMPORARY TABLE IF EXISTS tmp_species_genes;
+        CREATE TEMPORARY TABLE tmp_species_genes (gene_id INT PRIMARY KEY)
+            SELECT gene_id FROM Genes WHERE species_id = p_species_id;
+        
         -- 删除该物种相关的实验数据
         DELETE FROM Experimental_Data 
-        WHERE gene_id IN (SELECT gene_id FROM Genes WHERE species_id = p_species_id);
+        WHERE gene_id IN (SELECT gene_id FROM tmp_species_genes);
         
         -- 删除该物种基因与文献的关联
         DELETE FROM Gene_Publications 
-        WHERE gene_id IN (SELECT gene_id FROM Genes WHERE species_id = p_species_id);
+        WHERE gene_id IN (SELECT gene_id FROM tmp_species_genes);
         
         -- 删除该物种相关的蛋白质
         DELETE FROM Proteins 
-        WHERE gene_id IN (SELECT gene_id FROM Genes WHERE species_id = p_species_id);
+        WHERE gene_id IN (SELECT gene_id FROM tmp_species_genes);
+        
+        DROP TEMPORARY TABLE tmp_species_genes;
         
         -- 删除该物种的基因
         DELETE FROM Genes WHERE species_id = p_species_id;
@@ -246,4 +254,252 @@ BEGIN
         SELECT 'Species and all related data deleted successfully' AS result;
     END IF;
 END$$
-DELIMITER ; 
\ No newline at end of file
+DELIMITER ; 
+
+-- =============================================
+-- 5. 冗余计数列：由触发器维护
+-- =============================================
+-- Species.gene_count、Genes.protein_count、Genes.publication_count、Publications.gene_count
+-- 随子表的插入、删除和外键修改增减，列表页和 API 直接读取，不再逐行 COUNT。
+-- 计数更新时显式保留 updated_at，避免 ON UPDATE CURRENT_TIMESTAMP 把计数变化当作实体修改。
+-- 触发器之外的写入造成的偏差用 python scripts/reconcile_counters.py 批量修复。
+--
+-- 已有数据库先补列（新建库由 GenoBase.sql 创建），建好触发器后运行一次校正脚本：
+-- ALTER TABLE Species ADD COLUMN gene_count INT NOT NULL DEFAULT 0;
+-- ALTER TABLE Genes ADD COLUMN protein_count INT NOT NULL DEFAULT 0,
+--                   ADD COLUMN publication_count INT NOT NULL DEFAULT 0;
+-- ALTER TABLE Publications ADD COLUMN gene_count INT NOT NULL DEFAULT 0;
+
+-- 5.1 基因 -> 物种的基因数
+DELIMITER $$
+CREATE TRIGGER after_gene_insert_count
+AFTER INSERT ON Genes
+FOR EACH ROW
+BEGIN
+    UPDATE Species SET gene_count = gene_count + 1, updated_at = updated_at
+    WHERE species_id = NEW.species_id;
+END$$
+
+CREATE TRIGGER after_gene_delete_count
+AFTER DELETE ON Genes
+FOR EACH ROW
+BEGIN
+    UPDATE Species SET gene_count = gene_count - 1, updated_at = updated_at
+    WHERE species_id = OLD.species_id;
+END$$
+
+CREATE TRIGGER after_gene_update_count
+AFTER UPDATE ON Genes
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.species_id <=> NEW.species_id) THEN
+        UPDATE Species SET gene_count = gene_count - 1, updated_at = updated_at
+        WHERE species_id = OLD.species_id;
+        UPDATE Species SET gene_count = gene_count + 1, updated_at = updated_at
+        WHERE species_id = NEW.species_id;
+    END IF;
+END$$
+DELIMITER ;
+
+-- 5.2 蛋白质 -> 基因的蛋白质数
+DELIMITER $$
+CREATE TRIGGER after_protein_insert_count
+AFTER INSERT ON Proteins
+FOR EACH ROW
+BEGIN
+    UPDATE Genes SET protein_count = protein_count + 1, updated_at = updated_at
+    WHERE gene_id = NEW.gene_id;
+END$$
+
+CREATE TRIGGER after_protein_delete_count
+AFTER DELETE ON Proteins
+FOR EACH ROW
+BEGIN
+    UPDATE Genes SET protein_count = protein_count - 1, updated_at = updated_at
+    WHERE gene_id = OLD.gene_id;
+END$$
+
+CREATE TRIGGER after_protein_update_count
+AFTER UPDATE ON Proteins
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.gene_id <=> NEW.gene_id) THEN
+        UPDATE Genes SET protein_count = protein_count - 1, updated_at = updated_at
+        WHERE gene_id = OLD.gene_id;
+        UPDATE Genes SET protein_count = protein_count + 1, updated_at = updated_at
+        WHERE gene_id = NEW.gene_id;
+    END IF;
+END$$
+DELIMITER ;
+
+-- 5.3 基因-文献关联 -> 基因的文献数、文献的基因数
+DELIMITER $$
+CREATE TRIGGER after_gene_publication_insert_count
+AFTER INSERT ON Gene_Publications
+FOR EACH ROW
+BEGIN
+    UPDATE Genes SET publication_count = publication_count + 1, updated_at = updated_at
+    WHERE gene_id = NEW.gene_id;
+    UPDATE Publications SET gene_count = gene_count + 1, updated_at = updated_at
+    WHERE publication_id = NEW.publication_id;
+END$$
+
+CREATE TRIGGER after_gene_publication_delete_count
+AFTER DELETE ON Gene_Publications
+FOR EACH ROW
+BEGIN
+    UPDATE Genes SET publication_count = publication_count - 1, updated_at = updated_at
+    WHERE gene_id = OLD.gene_id;
+    UPDATE Publications SET gene_count = gene_count - 1, updated_at = updated_at
+    WHERE publication_id = OLD.publication_id;
+END$$
+
+CREATE TRIGGER after_gene_publication_update_count
+AFTER UPDATE ON Gene_Publications
+FOR EACH ROW
+BEGIN
+    IF OLD.gene_id <> NEW.gene_id THEN
+        UPDATE Genes SET publication_count = publication_count - 1, updated_at = updated_at
+        WHERE gene_id = OLD.gene_id;
+        UPDATE Genes SET publication_count = publication_count + 1, updated_at = updated_at
+        WHERE gene_id = NEW.gene_id;
+    END IF;
+    IF OLD.publication_id <> NEW.publication_id THEN
+        UPDATE Publications SET gene_count = gene_count - 1, updated_at = updated_at
+        WHERE publication_id = OLD.publication_id;
+        UPDATE Publications SET gene_count = gene_count + 1, updated_at = updated_at
+        WHERE publication_id = NEW.publication_id;
+    END IF;
+END$$
+DELIMITER ;
+
+-- =============================================
+-- 6. 删除墓碑：供增量变更流 /api/changes 同步删除
+-- =============================================
+-- 各实体表删除一行时写入 Deleted_Records，存储过程（如 DeleteSpeciesWithRelatedData）与后台删除一视同仁。
+-- 时间使用 UTC_TIMESTAMP()，与应用写入 updated_at 的 UTC 时间一致。
+
+DELIMITER $$
+CREATE TRIGGER after_species_delete_tombstone
+AFTER DELETE ON Species
+FOR EACH ROW
+BEGIN
+    INSERT INTO Deleted_Records (entity_type, entity_id, deleted_at) VALUES ('species', OLD.species_id, UTC_TIMESTAMP());
+END$$
+
+CREATE TRIGGER after_gene_delete_tombstone
+AFTER DELETE ON Genes
+FOR EACH ROW
+BEGIN
+    INSERT INTO Deleted_Records (entity_type, entity_id, deleted_at) VALUES ('genes', OLD.gene_id, UTC_TIMESTAMP());
+END$$
+
+CREATE TRIGGER after_protein_delete_tombstone
+AFTER DELETE ON Proteins
+FOR EACH ROW
+BEGIN
+    INSERT INTO Deleted_Records (entity_type, entity_id, deleted_at) VALUES ('proteins', OLD.protein_id, UTC_TIMESTAMP());
+END$$
+
+CREATE TRIGGER after_publication_delete_tombstone
+AFTER DELETE ON Publications
+FOR EACH ROW
+BEGIN
+    INSERT INTO Deleted_Records (entity_type, entity_id, deleted_at) VALUES ('publications', OLD.publication_id, UTC_TIMESTAMP());
+END$$
+
+CREATE TRIGGER after_experiment_delete_tombstone
+AFTER DELETE ON Experimental_Data
+FOR EACH ROW
+BEGIN
+    INSERT INTO Deleted_Records (entity_type, entity_id, deleted_at) VALUES ('experiments', OLD.experiment_id, UTC_TIMESTAMP());
+END$$
+DELIMITER ;
+
+-- 基因-文献关联没有 updated_at，计数触发器也不改动两侧的 updated_at，关联的增删同样记入 Deleted_Records，
+-- /api/changes 读取时按关联当前是否存在输出 upsert 或 delete。
+-- 已有数据库先补列：
+-- ALTER TABLE Deleted_Records ADD COLUMN related_id INT NULL;
+DELIMITER $$
+CREATE TRIGGER after_gene_publication_insert_tombstone
+AFTER INSERT ON Gene_Publications
+FOR EACH ROW
+BEGIN
+    INSERT INTO Deleted_Records (entity_type, entity_id, related_id, deleted_at)
+    VALUES ('gene_publications', NEW.gene_id, NEW.publication_id, UTC_TIMESTAMP());
+END$$
+
+CREATE TRIGGER after_gene_publication_delete_tombstone
+AFTER DELETE ON Gene_Publications
+FOR EACH ROW
+BEGIN
+    INSERT INTO Deleted_Records (entity_type, entity_id, related_id, deleted_at)
+    VALUES ('gene_publications', OLD.gene_id, OLD.publication_id, UTC_TIMESTAMP());
+END$$
+
+CREATE TRIGGER after_gene_publication_update_tombstone
+AFTER UPDATE ON Gene_Publications
+FOR EACH ROW
+BEGIN
+    INSERT INTO Deleted_Records (entity_type, entity_id, related_id, deleted_at)
+    VALUES ('gene_publications', OLD.gene_id, OLD.publication_id, UTC_TIMESTAMP()),
+           ('gene_publications', NEW.gene_id, NEW.publication_id, UTC_TIMESTAMP());
+END$$
+DELIMITER ;
+
+-- =============================================
+-- 7. 基因区间分箱：维护 Genes.bin（/api/genes/region 使用）
+-- =============================================
+-- UCSC 分层分箱：最细一层每箱 128 kb，往上每层放大 8 倍，共 5 层；与 app/regions.py 中的 bin_for 一致。
+-- 已有数据库先补列与索引，再回填：
+-- ALTER TABLE Genes ADD COLUMN bin INT;
+-- CREATE INDEX idx_genes_region ON Genes(species_id, chromosome, bin, start_position);
+-- CREATE INDEX idx_genes_region_start ON Genes(species_id, chromosome, start_position);
+-- CREATE INDEX idx_genes_region_end ON Genes(species_id, chromosome, end_position);
+-- UPDATE Genes SET bin = ucsc_bin(start_position, end_position);
+
+DELIMITER $$
+CREATE FUNCTION ucsc_bin(p_start INT, p_end INT)
+RETURNS INT
+DETERMINISTIC NO SQL
+BEGIN
+    DECLARE start_bin INT;
+    DECLARE end_bin INT;
+    IF p_start IS NULL OR p_end IS NULL THEN
+        RETURN NULL;
+    END IF;
+    -- 坐标为 1 起始闭区间；超出 512 Mb 的基因统一放入 0 号箱
+    SET start_bin = GREATEST(p_start - 1, 0);
+    SET end_bin = GREATEST(p_end - 1, 0);
+    IF end_bin >= 536870912 THEN
+        RETURN 0;
+    END IF;
+    SET start_bin = start_bin >> 17;
+    SET end_bin = end_bin >> 17;
+    IF start_bin = end_bin THEN RETURN 585 + start_bin; END IF;
+    SET start_bin = start_bin >> 3;
+    SET end_bin = end_bin >> 3;
+    IF start_bin = end_bin THEN RETURN 73 + start_bin; END IF;
+    SET start_bin = start_bin >> 3;
+    SET end_bin = end_bin >> 3;
+    IF start_bin = end_bin THEN RETURN 9 + start_bin; END IF;
+    SET start_bin = start_bin >> 3;
+    SET end_bin = end_bin >> 3;
+    IF start_bin = end_bin THEN RETURN 1 + start_bin; END IF;
+    RETURN 0;
+END$$
+
+CREATE TRIGGER before_gene_insert_bin
+BEFORE INSERT ON Genes
+FOR EACH ROW
+BEGIN
+    SET NEW.bin = ucsc_bin(NEW.start_position, NEW.end_position);
+END$$
+
+CREATE TRIGGER before_gene_update_bin
+BEFORE UPDATE ON Genes
+FOR EACH ROW
+BEGIN
+    SET NEW.bin = ucsc_bin(NEW.start_position, NEW.end_position);
+END$$
+DELIMITER ;